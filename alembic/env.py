@@ -16,7 +16,7 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-from src.database.services import Base, db_url
+from src.database.services import Base, db_url, tenant_db_urls
 
 config.set_main_option("sqlalchemy.url", db_url)
 
@@ -40,22 +40,25 @@ def run_migrations_online():
     from sqlalchemy import engine_from_config
     from sqlalchemy import pool
 
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata,
-            compare_type=True,
-            render_as_batch=True,
+    # the primary, then every school with a database of its own (EDU_TENANT_DB_HOSTS)
+    for url in (db_url, *tenant_db_urls.values()):
+        config.set_main_option("sqlalchemy.url", url)
+        connectable = engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        with connectable.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                compare_type=True,
+                render_as_batch=True,
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
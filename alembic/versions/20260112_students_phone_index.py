@@ -0,0 +1,22 @@
+"""Add index on students.phone
+
+Revision ID: 20260112_students_phone_index
+Revises: 20251224_create_daily_analytics
+Create Date: 2026-01-12 00:00:00.000000
+
+Built CONCURRENTLY: students is large and must stay writable meanwhile.
+"""
+from src.database.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+revision = '20260112_students_phone_index'
+down_revision = '20251224_create_daily_analytics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_concurrently('idx_students_phone', 'students', ['phone'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('idx_students_phone')
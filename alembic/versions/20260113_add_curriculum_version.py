@@ -0,0 +1,54 @@
+"""Add curriculum content version bumped by triggers
+
+Revision ID: 20260113_add_curriculum_version
+Revises: 20260112_students_phone_index
+Create Date: 2026-01-13 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260113_add_curriculum_version'
+down_revision = '20260112_students_phone_index'
+branch_labels = None
+depends_on = None
+
+CURRICULUM_TABLES = ['chapters', 'topics', 'concepts', 'questions']
+
+
+def upgrade() -> None:
+    op.execute('CREATE SEQUENCE curriculum_version_seq')
+    op.create_table(
+        'curriculum_meta',
+        sa.Column('id', sa.SmallInteger(), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.CheckConstraint('id = 1', name='ck_curriculum_meta_single_row'),
+    )
+    op.execute("INSERT INTO curriculum_meta (id, version) VALUES (1, nextval('curriculum_version_seq'))")
+
+    op.execute(
+        """
+        CREATE FUNCTION bump_curriculum_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE curriculum_meta
+            SET version = nextval('curriculum_version_seq'), updated_at = CURRENT_TIMESTAMP
+            WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    for table in CURRICULUM_TABLES:
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_curriculum_version "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_curriculum_version()"
+        )
+
+
+def downgrade() -> None:
+    for table in CURRICULUM_TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS trg_{table}_curriculum_version ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS bump_curriculum_version()')
+    op.drop_table('curriculum_meta')
+    op.execute('DROP SEQUENCE IF EXISTS curriculum_version_seq')
@@ -0,0 +1,39 @@
+"""Add calibrated difficulty columns to questions and job_watermarks table
+
+Revision ID: 20260114_question_calibration
+Revises: 20260113_add_curriculum_version
+Create Date: 2026-01-14 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migration_helpers import lock_timeout
+
+revision = '20260114_question_calibration'
+down_revision = '20260113_add_curriculum_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # nullable columns without defaults are catalog-only changes, but still
+    # need a brief ACCESS EXCLUSIVE lock on questions
+    with lock_timeout():
+        op.add_column('questions', sa.Column('response_count', sa.Integer(), nullable=True))
+        op.add_column('questions', sa.Column('p_value', sa.Numeric(5, 4), nullable=True))
+        op.add_column('questions', sa.Column('irt_difficulty', sa.Float(), nullable=True))
+        op.add_column('questions', sa.Column('irt_discrimination', sa.Float(), nullable=True))
+        op.add_column('questions', sa.Column('calibrated_at', sa.TIMESTAMP(), nullable=True))
+
+    op.create_table(
+        'job_watermarks',
+        sa.Column('job_name', sa.String(length=100), primary_key=True),
+        sa.Column('last_run_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_watermarks')
+    for col in ['calibrated_at', 'irt_discrimination', 'irt_difficulty', 'p_value', 'response_count']:
+        op.drop_column('questions', col)
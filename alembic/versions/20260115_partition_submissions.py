@@ -0,0 +1,184 @@
+"""Partition quiz_submissions by month on submitted_at
+
+Revision ID: 20260115_partition_submissions
+Revises: 20260114_question_calibration
+Create Date: 2026-01-15 00:00:00.000000
+
+Rebuilds quiz_submissions as a RANGE partitioned table with one partition per
+calendar month plus a DEFAULT partition, and copies the existing rows across.
+The primary key becomes (id, submitted_at) because Postgres requires the
+partition key in every unique constraint; ids keep coming from the same
+sequence, so they stay unique. submitted_at becomes NOT NULL (rows without one
+get their copy time).
+
+The swap itself (renames, new table, partitions) commits under a lock
+timeout; existing rows are then copied across in committed batches while
+new submissions already go to the partitioned table, so history reads are
+incomplete until the copy finishes but writes are never blocked. Rerunning
+after an interruption resumes the copy.
+
+Future partitions are created by `src.database.partitions.ensure_future_partitions`
+(run at application startup) or by calling the SQL function
+`create_quiz_submission_partitions(months_ahead)` from a scheduler.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migration_helpers import estimated_rows, lock_timeout, run_in_batches
+
+revision = '20260115_partition_submissions'
+down_revision = '20260114_question_calibration'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+INDEXES = {
+    'idx_submissions_student': 'student_id',
+    'idx_submissions_question': 'question_id',
+    'idx_submissions_timestamp': 'submitted_at',
+}
+COLUMNS = 'id, student_id, question_id, selected_answer_index, is_correct, xp_earned, time_taken_seconds'
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _swap_to_partitioned(bind) -> None:
+    op.execute('ALTER TABLE quiz_submissions RENAME TO quiz_submissions_unpartitioned')
+    for name in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned')
+    op.execute('ALTER SEQUENCE quiz_submissions_id_seq OWNED BY NONE')
+
+    op.execute(
+        """
+        CREATE TABLE quiz_submissions (
+            id INTEGER NOT NULL DEFAULT nextval('quiz_submissions_id_seq'),
+            student_id INTEGER NOT NULL REFERENCES students (id) ON DELETE CASCADE,
+            question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+            selected_answer_index INTEGER NOT NULL,
+            is_correct BOOLEAN NOT NULL,
+            xp_earned INTEGER NOT NULL DEFAULT 0,
+            time_taken_seconds INTEGER,
+            submitted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, submitted_at)
+        ) PARTITION BY RANGE (submitted_at)
+        """
+    )
+    op.execute('ALTER SEQUENCE quiz_submissions_id_seq OWNED BY quiz_submissions.id')
+    for name, column in INDEXES.items():
+        op.create_index(name, 'quiz_submissions', [column], unique=False)
+
+    op.execute(
+        """
+        CREATE FUNCTION create_quiz_submission_partitions(months_ahead INTEGER) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            month_start DATE;
+        BEGIN
+            FOR i IN 0..months_ahead LOOP
+                month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date;
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF quiz_submissions FOR VALUES FROM (%L) TO (%L)',
+                    'quiz_submissions_' || to_char(month_start, '"y"YYYY"m"MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+            END LOOP;
+        END;
+        $$
+        """
+    )
+
+    oldest = bind.execute(sa.text('SELECT min(submitted_at) FROM quiz_submissions_unpartitioned')).scalar()
+    today = date.today().replace(day=1)
+    month = (oldest.date().replace(day=1) if oldest else today)
+    while month <= _add_months(today, MONTHS_AHEAD):
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE quiz_submissions_y{month.year}m{month.month:02d} PARTITION OF quiz_submissions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute('CREATE TABLE quiz_submissions_default PARTITION OF quiz_submissions DEFAULT')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # a rerun after an interrupted copy finds the swap already committed
+    if bind.execute(sa.text("SELECT to_regclass('quiz_submissions_unpartitioned')")).scalar() is None:
+        with lock_timeout():
+            _swap_to_partitioned(bind)
+    # batches commit in id order and new submissions get higher ids, so
+    # everything up to the highest copied id is already across
+    copied_up_to = bind.execute(
+        sa.text(
+            "SELECT COALESCE(max(id), 0) FROM quiz_submissions "
+            "WHERE id <= (SELECT max(id) FROM quiz_submissions_unpartitioned)"
+        )
+    ).scalar()
+
+    run_in_batches(
+        f"""
+        INSERT INTO quiz_submissions ({COLUMNS}, submitted_at)
+        SELECT {COLUMNS}, COALESCE(submitted_at, CURRENT_TIMESTAMP)
+        FROM quiz_submissions_unpartitioned
+        WHERE id > :after
+        ORDER BY id
+        LIMIT :batch_size
+        RETURNING id
+        """,
+        start=copied_up_to,
+        description='copy quiz_submissions into partitions',
+        estimated_rows=estimated_rows('quiz_submissions_unpartitioned'),
+    )
+    with lock_timeout():
+        op.drop_table('quiz_submissions_unpartitioned')
+
+
+def downgrade() -> None:
+    with lock_timeout():
+        op.execute('ALTER TABLE quiz_submissions RENAME TO quiz_submissions_partitioned')
+        op.execute('ALTER SEQUENCE quiz_submissions_id_seq OWNED BY NONE')
+        for name in INDEXES:
+            op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_partitioned')
+
+        op.execute(
+            """
+            CREATE TABLE quiz_submissions (
+                id INTEGER PRIMARY KEY DEFAULT nextval('quiz_submissions_id_seq'),
+                student_id INTEGER NOT NULL REFERENCES students (id) ON DELETE CASCADE,
+                question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+                selected_answer_index INTEGER NOT NULL,
+                is_correct BOOLEAN NOT NULL,
+                xp_earned INTEGER NOT NULL DEFAULT 0,
+                time_taken_seconds INTEGER,
+                submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        op.execute('ALTER SEQUENCE quiz_submissions_id_seq OWNED BY quiz_submissions.id')
+        for name, column in INDEXES.items():
+            op.create_index(name, 'quiz_submissions', [column], unique=False)
+
+    run_in_batches(
+        f"""
+        INSERT INTO quiz_submissions ({COLUMNS}, submitted_at)
+        SELECT {COLUMNS}, submitted_at
+        FROM quiz_submissions_partitioned
+        WHERE id > :after
+        ORDER BY id
+        LIMIT :batch_size
+        RETURNING id
+        """,
+        start=0,
+        description='copy quiz_submissions out of partitions',
+        estimated_rows=estimated_rows('quiz_submissions_partitioned'),
+    )
+    with lock_timeout():
+        op.execute('DROP TABLE quiz_submissions_partitioned CASCADE')
+        op.execute('DROP FUNCTION IF EXISTS create_quiz_submission_partitions(INTEGER)')
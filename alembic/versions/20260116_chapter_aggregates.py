@@ -0,0 +1,45 @@
+"""Create question_stats and chapter_stats aggregate tables
+
+Revision ID: 20260116_chapter_aggregates
+Revises: 20260115_partition_submissions
+Create Date: 2026-01-16 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260116_chapter_aggregates'
+down_revision = '20260115_partition_submissions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'question_stats',
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('chapter_id', sa.String(length=50), sa.ForeignKey('chapters.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('attempts', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('correct', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('timed_attempts', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('total_time_seconds', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('last_submission_at', sa.TIMESTAMP(), nullable=True),
+    )
+    op.create_index('idx_question_stats_chapter', 'question_stats', ['chapter_id'], unique=False)
+
+    op.create_table(
+        'chapter_stats',
+        sa.Column('chapter_id', sa.String(length=50), sa.ForeignKey('chapters.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('attempts', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('correct', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('timed_attempts', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('total_time_seconds', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('students', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('avg_mastery_score', sa.Numeric(5, 2), nullable=True),
+        sa.Column('last_submission_at', sa.TIMESTAMP(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chapter_stats')
+    op.drop_index('idx_question_stats_chapter', table_name='question_stats')
+    op.drop_table('question_stats')
@@ -0,0 +1,41 @@
+"""Create outbox table for deferred background work
+
+Revision ID: 20260117_outbox
+Revises: 20260116_chapter_aggregates
+Create Date: 2026-01-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '20260117_outbox'
+down_revision = '20260116_chapter_aggregates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('topic', sa.String(length=100), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('status', sa.String(length=20), server_default=sa.text("'pending'"), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    )
+    # Workers only ever look for due pending rows; keep that index tiny.
+    op.create_index(
+        'idx_outbox_pending',
+        'outbox',
+        ['available_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_outbox_pending', table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,26 @@
+"""Create edge_nodes table for edge node sync positions
+
+Revision ID: 20260118_edge_nodes
+Revises: 20260117_outbox
+Create Date: 2026-01-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260118_edge_nodes'
+down_revision = '20260117_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'edge_nodes',
+        sa.Column('node_id', sa.String(length=100), primary_key=True),
+        sa.Column('last_submission_id', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('last_synced_at', sa.TIMESTAMP(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('edge_nodes')
@@ -0,0 +1,80 @@
+"""Add curriculum change log fed by row triggers
+
+Revision ID: 20260119_curriculum_changes
+Revises: 20260118_edge_nodes
+Create Date: 2026-01-19 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migration_helpers import lock_timeout
+
+revision = '20260119_curriculum_changes'
+down_revision = '20260118_edge_nodes'
+branch_labels = None
+depends_on = None
+
+CURRICULUM_TABLES = ['chapters', 'topics', 'concepts', 'questions']
+
+
+def upgrade() -> None:
+    op.create_table(
+        'curriculum_changes',
+        sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('curriculum_version_seq')"), primary_key=True),
+        sa.Column('table_name', sa.String(length=30), nullable=False),
+        sa.Column('record_id', sa.String(length=50), nullable=True),
+        sa.Column('op', sa.String(length=1), nullable=False),
+        sa.Column('changed_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    )
+    op.create_index('idx_curriculum_changes_record', 'curriculum_changes', ['table_name', 'record_id'], unique=False)
+
+    # The advisory lock serialises curriculum writers from their first changed
+    # row until commit, so versions become visible in commit order and a
+    # client that has seen version N can never later miss a change below N.
+    op.execute(
+        """
+        CREATE FUNCTION log_curriculum_change() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('curriculum_changes'));
+            IF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO curriculum_changes (table_name, record_id, op) VALUES (TG_TABLE_NAME, NULL, 'T');
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO curriculum_changes (table_name, record_id, op) VALUES (TG_TABLE_NAME, OLD.id::text, 'D');
+            ELSE
+                IF TG_OP = 'UPDATE' AND OLD.id IS DISTINCT FROM NEW.id THEN
+                    INSERT INTO curriculum_changes (table_name, record_id, op) VALUES (TG_TABLE_NAME, OLD.id::text, 'D');
+                END IF;
+                INSERT INTO curriculum_changes (table_name, record_id, op)
+                VALUES (TG_TABLE_NAME, NEW.id::text, left(TG_OP, 1));
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """
+    )
+    with lock_timeout():
+        for table in CURRICULUM_TABLES:
+            # seed the log with the current catalog so a client can start from 0
+            op.execute(
+                f"INSERT INTO curriculum_changes (table_name, record_id, op) "
+                f"SELECT '{table}', id::text, 'I' FROM {table} ORDER BY id"
+            )
+            op.execute(
+                f"CREATE TRIGGER trg_{table}_change_log "
+                f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION log_curriculum_change()"
+            )
+            op.execute(
+                f"CREATE TRIGGER trg_{table}_change_log_truncate "
+                f"AFTER TRUNCATE ON {table} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION log_curriculum_change()"
+            )
+
+
+def downgrade() -> None:
+    for table in CURRICULUM_TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS trg_{table}_change_log_truncate ON {table}')
+        op.execute(f'DROP TRIGGER IF EXISTS trg_{table}_change_log ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS log_curriculum_change()')
+    op.drop_index('idx_curriculum_changes_record', table_name='curriculum_changes')
+    op.drop_table('curriculum_changes')
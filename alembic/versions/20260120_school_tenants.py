@@ -0,0 +1,98 @@
+"""Add schools and a school_id tenant key with school-leading indexes
+
+Revision ID: 20260120_school_tenants
+Revises: 20260119_curriculum_changes
+Create Date: 2026-01-20 00:00:00.000000
+
+Every existing row belongs to the default school (id 1). The columns are
+added with a constant default, which Postgres 11+ stores in the catalog
+without rewriting the tables; on quiz_submissions, student_progress and
+daily_analytics the default is then dropped so that a BEFORE INSERT trigger
+copies the school from the student whenever an insert leaves it out. The
+foreign key is validated without blocking writes and the indexes are built
+concurrently.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migration_helpers import create_index_concurrently, drop_index_concurrently, lock_timeout
+
+revision = '20260120_school_tenants'
+down_revision = '20260119_curriculum_changes'
+branch_labels = None
+depends_on = None
+
+DEFAULT_SCHOOL_ID = 1
+CHILD_TABLES = ['quiz_submissions', 'student_progress', 'daily_analytics']
+INDEXES = [
+    ('idx_students_school', 'students', ['school_id', 'id']),
+    ('idx_quiz_submissions_school_time', 'quiz_submissions', ['school_id', 'submitted_at']),
+    ('idx_student_progress_school_chapter', 'student_progress', ['school_id', 'chapter_id']),
+    ('idx_daily_analytics_school_date', 'daily_analytics', ['school_id', 'analytics_date']),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'schools',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    )
+    op.execute(f"INSERT INTO schools (id, name) VALUES ({DEFAULT_SCHOOL_ID}, 'Default school')")
+    op.execute("SELECT setval(pg_get_serial_sequence('schools', 'id'), (SELECT max(id) FROM schools))")
+
+    with lock_timeout():
+        op.add_column(
+            'students',
+            sa.Column('school_id', sa.Integer(), server_default=sa.text(str(DEFAULT_SCHOOL_ID)), nullable=False),
+        )
+        for table in CHILD_TABLES:
+            op.add_column(
+                table,
+                sa.Column('school_id', sa.Integer(), server_default=sa.text(str(DEFAULT_SCHOOL_ID)), nullable=False),
+            )
+            op.alter_column(table, 'school_id', server_default=None)
+        op.execute(
+            'ALTER TABLE students ADD CONSTRAINT fk_students_school '
+            'FOREIGN KEY (school_id) REFERENCES schools (id) NOT VALID'
+        )
+    op.execute('ALTER TABLE students VALIDATE CONSTRAINT fk_students_school')
+
+    # One primary key lookup per row, skipped when the writer sets school_id.
+    # NOT NULL is checked after BEFORE triggers, so a missing value is filled
+    # rather than rejected.
+    op.execute(
+        """
+        CREATE FUNCTION fill_school_id() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF NEW.school_id IS NULL THEN
+                SELECT school_id INTO NEW.school_id FROM students WHERE id = NEW.student_id;
+            END IF;
+            RETURN NEW;
+        END;
+        $$
+        """
+    )
+    with lock_timeout():
+        for table in CHILD_TABLES:
+            op.execute(
+                f'CREATE TRIGGER trg_{table}_school BEFORE INSERT ON {table} '
+                'FOR EACH ROW EXECUTE FUNCTION fill_school_id()'
+            )
+
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, _, _ in INDEXES:
+        drop_index_concurrently(name)
+    with lock_timeout():
+        for table in CHILD_TABLES:
+            op.execute(f'DROP TRIGGER IF EXISTS trg_{table}_school ON {table}')
+            op.drop_column(table, 'school_id')
+        op.drop_constraint('fk_students_school', 'students', type_='foreignkey')
+        op.drop_column('students', 'school_id')
+    op.execute('DROP FUNCTION IF EXISTS fill_school_id()')
+    op.drop_table('schools')
@@ -0,0 +1,71 @@
+"""Add quiz_submissions.received_at, the server-side ingest time
+
+Revision ID: 20260121_submission_received_at
+Revises: 20260120_school_tenants
+Create Date: 2026-01-21 00:00:00.000000
+
+submitted_at is when the student answered, which for edge node uploads can
+be days before the row reaches this database. The incremental jobs (the
+aggregates refresh and question calibration) now advance their watermarks
+over received_at instead, so late rows are still picked up.
+
+Existing rows get a constant epoch value (stored in the catalog, no table
+rewrite), which sorts before every watermark; only the rows the jobs have
+not reached yet -- submitted at or after the oldest of their watermarks --
+are set to their submitted_at, so the next runs still include them. That
+backfill runs in committed keyset batches and resumes where it left off if
+rerun. New rows default to LOCALTIMESTAMP.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migration_helpers import (
+    create_index_concurrently,
+    drop_index_concurrently,
+    estimated_rows,
+    lock_timeout,
+    run_in_batches,
+)
+
+revision = '20260121_submission_received_at'
+down_revision = '20260120_school_tenants'
+branch_labels = None
+depends_on = None
+
+WATERMARKED_JOBS = ('chapter_aggregates', 'question_calibration')
+
+
+def upgrade() -> None:
+    with lock_timeout():
+        op.add_column(
+            'quiz_submissions',
+            sa.Column('received_at', sa.TIMESTAMP(), server_default=sa.text("'1970-01-01'"), nullable=False),
+        )
+        op.alter_column('quiz_submissions', 'received_at', server_default=sa.text('LOCALTIMESTAMP'))
+    oldest_watermark = op.get_bind().execute(
+        sa.text(f"SELECT min(last_run_at) FROM job_watermarks WHERE job_name IN {WATERMARKED_JOBS}")
+    ).scalar()
+    if oldest_watermark is not None:
+        run_in_batches(
+            f"""
+            WITH batch AS (
+                SELECT id, submitted_at FROM quiz_submissions
+                WHERE id > :after AND submitted_at >= '{oldest_watermark.isoformat()}'
+                  AND received_at = '1970-01-01'
+                ORDER BY id LIMIT :batch_size
+            )
+            UPDATE quiz_submissions s SET received_at = s.submitted_at
+            FROM batch WHERE s.id = batch.id AND s.submitted_at = batch.submitted_at
+            RETURNING s.id
+            """,
+            start=0,
+            description='backfill quiz_submissions.received_at',
+            estimated_rows=estimated_rows('quiz_submissions'),
+        )
+    create_index_concurrently('idx_quiz_submissions_received', 'quiz_submissions', ['received_at'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('idx_quiz_submissions_received')
+    with lock_timeout():
+        op.drop_column('quiz_submissions', 'received_at')
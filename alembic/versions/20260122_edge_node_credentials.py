@@ -0,0 +1,41 @@
+"""Per-node edge sync credentials, instance ids and student assignments
+
+Revision ID: 20260122_edge_node_credentials
+Revises: 20260121_submission_received_at
+Create Date: 2026-01-22 00:00:00.000000
+
+Each edge node now authenticates with its own token (stored as a SHA-256
+hash) and is sent only the students assigned to it in edge_node_students.
+Nodes registered before this have no token and cannot sync until they are
+issued one with ``python -m src.edge.central <node_id> --new-token``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.migration_helpers import lock_timeout
+
+revision = '20260122_edge_node_credentials'
+down_revision = '20260121_submission_received_at'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with lock_timeout():
+        op.add_column('edge_nodes', sa.Column('token_hash', sa.String(length=64), nullable=True))
+        op.add_column('edge_nodes', sa.Column('instance_id', sa.String(length=36), nullable=True))
+    op.create_table(
+        'edge_node_students',
+        sa.Column(
+            'node_id', sa.String(length=100),
+            sa.ForeignKey('edge_nodes.node_id', ondelete='CASCADE'), primary_key=True,
+        ),
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('edge_node_students')
+    with lock_timeout():
+        op.drop_column('edge_nodes', 'instance_id')
+        op.drop_column('edge_nodes', 'token_hash')
@@ -0,0 +1,77 @@
+"""Ignore calibration columns in the questions curriculum triggers
+
+Revision ID: 20260123_content_triggers
+Revises: 20260122_edge_node_credentials
+Create Date: 2026-01-23 00:00:00.000000
+
+The calibration job (src/analytics/calibration.py) bulk updates
+response_count, p_value, irt_* and calibrated_at. Those are item statistics,
+not content, but the statement trigger bumped the curriculum version and
+the row trigger logged a change for every calibrated question, so each run
+invalidated every curriculum cache and ETag. UPDATEs now fire only for the
+content columns: the version bump when one of them is set, the change log
+when one of them actually changed.
+"""
+from alembic import op
+
+from src.database.migration_helpers import lock_timeout
+
+revision = '20260123_content_triggers'
+down_revision = '20260122_edge_node_credentials'
+branch_labels = None
+depends_on = None
+
+CONTENT_COLUMNS = [
+    'id', 'quiz_id', 'chapter_id', 'question_text', 'options', 'correct_answer_index', 'explanation',
+    'image_url', 'difficulty_level',
+]
+
+
+def _row(alias: str) -> str:
+    return '(' + ', '.join(f'{alias}.{column}' for column in CONTENT_COLUMNS) + ')'
+
+
+def upgrade() -> None:
+    columns = ', '.join(CONTENT_COLUMNS)
+    with lock_timeout():
+        op.execute('DROP TRIGGER trg_questions_curriculum_version ON questions')
+        op.execute(
+            "CREATE TRIGGER trg_questions_curriculum_version "
+            "AFTER INSERT OR DELETE OR TRUNCATE ON questions "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_curriculum_version()"
+        )
+        op.execute(
+            f"CREATE TRIGGER trg_questions_curriculum_version_update "
+            f"AFTER UPDATE OF {columns} ON questions "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_curriculum_version()"
+        )
+        op.execute('DROP TRIGGER trg_questions_change_log ON questions')
+        op.execute(
+            "CREATE TRIGGER trg_questions_change_log "
+            "AFTER INSERT OR DELETE ON questions "
+            "FOR EACH ROW EXECUTE FUNCTION log_curriculum_change()"
+        )
+        op.execute(
+            f"CREATE TRIGGER trg_questions_change_log_update "
+            f"AFTER UPDATE OF {columns} ON questions "
+            f"FOR EACH ROW WHEN ({_row('OLD')} IS DISTINCT FROM {_row('NEW')}) "
+            f"EXECUTE FUNCTION log_curriculum_change()"
+        )
+
+
+def downgrade() -> None:
+    with lock_timeout():
+        op.execute('DROP TRIGGER trg_questions_change_log_update ON questions')
+        op.execute('DROP TRIGGER trg_questions_change_log ON questions')
+        op.execute(
+            "CREATE TRIGGER trg_questions_change_log "
+            "AFTER INSERT OR UPDATE OR DELETE ON questions "
+            "FOR EACH ROW EXECUTE FUNCTION log_curriculum_change()"
+        )
+        op.execute('DROP TRIGGER trg_questions_curriculum_version_update ON questions')
+        op.execute('DROP TRIGGER trg_questions_curriculum_version ON questions')
+        op.execute(
+            "CREATE TRIGGER trg_questions_curriculum_version "
+            "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON questions "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_curriculum_version()"
+        )
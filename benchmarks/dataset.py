@@ -0,0 +1,472 @@
+"""Synthetic dataset for scale benchmarks, bulk loaded with COPY.
+
+Creates a bench curriculum (chapters -> topics -> concepts, questions per
+chapter) and a population of students with one parent each, their quiz
+submissions over the last `days` days, and the student_progress and
+daily_analytics rows derived from those submissions. Aggregates are
+refreshed at the end so the analytics endpoints see the data.
+
+Submissions are shaped like real usage rather than uniform noise:
+
+* activity per student is log-normal (a few very active students, a long
+  tail of occasional ones, ~10% who never answered);
+* answers come in sessions on a subset of days, mostly after school and
+  in the evening, with geometric gaps between active days so
+  daily_analytics has realistic streaks;
+* students work through chapters in order, so early chapters get the most
+  answers;
+* correctness follows a 3PL IRT model (student ability, question
+  difficulty and discrimination, 1-in-4 guessing) with ability improving
+  over the window -- about 65% correct overall;
+* answer time is log-normal, longer for hard questions and wrong answers,
+  and missing for a few percent (client did not send it);
+* students are spread over BENCH_SCHOOLS schools with Zipf-like sizes, a
+  few large schools and many small ones.
+
+Students are generated in blocks, each block loaded and committed in one
+transaction. Rerunning with a larger ``--students`` only adds the missing
+students, so a benchmark can grow the same database from 10k to 100k to
+1M. Bench rows are recognisable by the ``bench.invalid`` email domain and
+the ``bench-`` chapter, quiz and school names; ``--reset`` removes them first. Bench
+students cannot log in: their password hash is not a valid hash.
+
+Usage:
+    python -m benchmarks.dataset --students 100000 [--per-student 30] [--days 180] [--reset]
+"""
+import argparse
+import io
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg2.errors
+from sqlalchemy import text
+
+from src.analytics.aggregates import refresh_aggregates
+from src.analytics.mastery import compute_progress
+from src.core.constants import QUIZ_XP_PER_CORRECT
+from src.database.partitions import add_months, create_month_partition, ensure_future_partitions, month_floor
+from src.database.services import db_session, engine
+
+BENCH_DOMAIN = "bench.invalid"
+UNUSABLE_PASSWORD_HASH = "!"
+
+SUBJECTS = ("Mathematics", "Science", "English", "Social Studies")
+CHAPTERS = 24
+TOPICS_PER_CHAPTER = 4
+CONCEPTS_PER_TOPIC = 3
+QUESTIONS_PER_CHAPTER = 60
+CHAPTER_ORDER_OFFSET = 1000  # keeps bench chapters clear of real chapter numbers
+CURRICULUM_SEED = 20260101  # question parameters must not change between runs
+BENCH_SCHOOLS = 40
+
+BLOCK_STUDENTS = 25_000
+INACTIVE_SHARE = 0.1
+ANSWERS_PER_SESSION = 8
+SESSION_MINUTES = 40
+# relative likelihood of a session starting in each hour of the day (UTC)
+SESSION_HOURS = np.array(
+    [1, 0, 0, 0, 0, 1, 3, 5, 4, 2, 2, 2, 3, 4, 6, 9, 12, 14, 15, 14, 11, 7, 4, 2], dtype=np.float64
+)
+MISSING_TIME_SHARE = 0.03
+
+FIRST_NAMES = ("Aarav", "Diya", "Ishaan", "Ananya", "Kabir", "Meera", "Rohan", "Saanvi", "Vihaan", "Zara")
+LAST_NAMES = ("Sharma", "Patel", "Iyer", "Khan", "Singh", "Das", "Reddy", "Mehta", "Nair", "Gupta")
+
+NULL = r"\N"
+
+
+# ----------------------------------------------------------------------------
+# COPY helpers
+
+def _as_text(values) -> list:
+    if values.dtype == bool:
+        return np.where(values, "t", "f").tolist()
+    if values.dtype.kind == "M":
+        return np.datetime_as_string(values).tolist()
+    return values.astype(str).tolist()
+
+
+def _copy(cursor, table: str, columns: dict) -> int:
+    """COPY equal-length column arrays into `table` (text format; NULL is ``\\N``)."""
+    text_columns = [_as_text(np.asarray(values)) for values in columns.values()]
+    rows = len(text_columns[0])
+    if rows:
+        buffer = io.StringIO("\n".join(map("\t".join, zip(*text_columns))) + "\n")
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return rows
+
+
+def _reserve_ids(cursor, table: str, count: int) -> int:
+    """Take `count` consecutive ids from the table's sequence; returns the first."""
+    cursor.execute(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id'))")
+    first = cursor.fetchone()[0]
+    cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), %s)", (first + count - 1,))
+    return first
+
+
+# ----------------------------------------------------------------------------
+# curriculum
+
+def _question_parameters():
+    """Correct answer, IRT difficulty and discrimination of every bench question."""
+    rng = np.random.default_rng(CURRICULUM_SEED)
+    n = CHAPTERS * QUESTIONS_PER_CHAPTER
+    # later chapters are harder on average
+    chapter_shift = np.repeat(np.linspace(-0.6, 0.6, CHAPTERS), QUESTIONS_PER_CHAPTER)
+    return {
+        "correct": rng.integers(0, 4, n),
+        "difficulty": rng.normal(0.5, 1.0, n) + chapter_shift,
+        "discrimination": rng.lognormal(0.0, 0.3, n),
+    }
+
+
+def _chapter_id(c: int) -> str:
+    return f"bench-ch-{c + 1:03d}"
+
+
+def _create_curriculum(cursor) -> None:
+    chapter_ids = [_chapter_id(c) for c in range(CHAPTERS)]
+    _copy(
+        cursor,
+        "chapters",
+        {
+            "id": np.array(chapter_ids),
+            "name": np.array([f"{SUBJECTS[c % len(SUBJECTS)]} {c // len(SUBJECTS) + 1}" for c in range(CHAPTERS)]),
+            "description": np.array([f"Bench chapter {c + 1}" for c in range(CHAPTERS)]),
+            "subject": np.array([SUBJECTS[c % len(SUBJECTS)] for c in range(CHAPTERS)]),
+            '"order"': np.arange(CHAPTER_ORDER_OFFSET + 1, CHAPTER_ORDER_OFFSET + CHAPTERS + 1),
+            "is_locked": np.arange(CHAPTERS) > 0,
+            "unlock_xp_required": np.arange(CHAPTERS) * 200,
+        },
+    )
+
+    topics = CHAPTERS * TOPICS_PER_CHAPTER
+    first_topic = _reserve_ids(cursor, "topics", topics)
+    topic_ids = np.arange(first_topic, first_topic + topics)
+    _copy(
+        cursor,
+        "topics",
+        {
+            "id": topic_ids,
+            "chapter_id": np.repeat(chapter_ids, TOPICS_PER_CHAPTER),
+            "name": np.array([f"Topic {t % TOPICS_PER_CHAPTER + 1}" for t in range(topics)]),
+            "description": np.full(topics, NULL),
+        },
+    )
+
+    concepts = topics * CONCEPTS_PER_TOPIC
+    first_concept = _reserve_ids(cursor, "concepts", concepts)
+    _copy(
+        cursor,
+        "concepts",
+        {
+            "id": np.arange(first_concept, first_concept + concepts),
+            "topic_id": np.repeat(topic_ids, CONCEPTS_PER_TOPIC),
+            "name": np.array([f"Concept {k % CONCEPTS_PER_TOPIC + 1}" for k in range(concepts)]),
+            "misconception_guide": np.array(["Common mistakes for this concept"] * concepts),
+        },
+    )
+
+    params = _question_parameters()
+    n = CHAPTERS * QUESTIONS_PER_CHAPTER
+    chapter = np.repeat(np.arange(CHAPTERS), QUESTIONS_PER_CHAPTER)
+    number = np.tile(np.arange(1, QUESTIONS_PER_CHAPTER + 1), CHAPTERS)
+    options = json.dumps(["Option A", "Option B", "Option C", "Option D"])
+    _copy(
+        cursor,
+        "questions",
+        {
+            "quiz_id": np.array([f"bench-q-{c + 1:03d}-{q:03d}" for c, q in zip(chapter.tolist(), number.tolist())]),
+            "chapter_id": np.array(chapter_ids)[chapter],
+            "question_text": np.array([f"Bench question {q} of chapter {c + 1}" for c, q in zip(chapter, number)]),
+            "options": np.full(n, options),
+            "correct_answer_index": params["correct"],
+            "explanation": np.full(n, "Worked solution"),
+            "difficulty_level": np.select(
+                [params["difficulty"] < -0.5, params["difficulty"] > 0.5], ["easy", "hard"], "medium"
+            ),
+        },
+    )
+
+
+def _bench_schools(cursor) -> np.ndarray:
+    """Ids of the bench schools, created on first use."""
+    cursor.execute("SELECT id FROM schools WHERE name LIKE 'bench-school-%' ORDER BY name")
+    ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        cursor.execute(
+            "INSERT INTO schools (name) SELECT 'bench-school-' || lpad(n::text, 3, '0') "
+            "FROM generate_series(1, %s) n ORDER BY n RETURNING id",
+            (BENCH_SCHOOLS,),
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    return np.array(ids, dtype=np.int64)
+
+
+def _question_ids(cursor) -> np.ndarray:
+    """Database ids of the bench questions, in generation order."""
+    cursor.execute("SELECT id FROM questions WHERE quiz_id LIKE 'bench-q-%' ORDER BY quiz_id")
+    return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+
+# ----------------------------------------------------------------------------
+# students and their activity
+
+def _block(rng, first_number: int, n: int, first_id: int, per_student: float, days: int, window_end, questions, schools):
+    """Column arrays for `n` students numbered from `first_number`, and everything derived from them."""
+    student_ids = np.arange(first_id, first_id + n, dtype=np.int64)
+    number = np.arange(first_number, first_number + n)
+    age = rng.integers(6, 18, n)
+    first_names = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)]
+    last_names = np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), n)]
+    window_start = window_end - np.timedelta64(days, "D")
+    school_weights = 1.0 / np.arange(1, len(schools) + 1)
+    school_ids = rng.choice(schools, n, p=school_weights / school_weights.sum())
+
+    students = {
+        "id": student_ids,
+        "first_name": first_names,
+        "last_name": last_names,
+        "age": age,
+        "phone": np.char.zfill((9_000_000_000 + number).astype(str), 10),
+        "email": np.char.add(np.char.add("student", number.astype(str)), f"@{BENCH_DOMAIN}"),
+        "gender": np.array(["M", "F"])[rng.integers(0, 2, n)],
+        "standard": np.clip(age - 5, 1, 12).astype(str),
+        "enrollment_date": window_start - rng.integers(0, 365 * 86_400, n).astype("timedelta64[s]"),
+        "school_id": school_ids,
+    }
+    parents = {
+        "name": np.char.add(np.char.add(np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)], " "), last_names),
+        "phone": np.char.zfill((8_000_000_000 + number).astype(str), 10),
+        "email": np.char.add(np.char.add("parent", number.astype(str)), f"@{BENCH_DOMAIN}"),
+        "student_id": student_ids,
+    }
+
+    # answers per student: log-normal with the requested mean, some never active
+    sigma = 1.0
+    counts = np.rint(rng.lognormal(np.log(per_student) - sigma ** 2 / 2, sigma, n)).astype(np.int64)
+    counts[rng.random(n) < INACTIVE_SHARE] = 0
+    counts = np.minimum(counts, int(per_student * 50))
+    student = np.repeat(np.arange(n), counts)
+    total = len(student)
+
+    # sessions: one per active day, spread from the day the student joined to
+    # the end of the window with geometric gaps (the more sessions, the more
+    # consecutive days), starting mostly after school
+    sessions = np.maximum(1, np.ceil(counts / ANSWERS_PER_SESSION)).astype(np.int64)
+    sessions[counts == 0] = 0
+    session_owner = np.repeat(np.arange(n), sessions)
+    session_offset = np.concatenate(([0], np.cumsum(sessions)[:-1]))
+    joined = rng.integers(0, days, n)  # first active day in the window
+    mean_gap = np.maximum(1.0, (days - joined) / np.maximum(sessions, 1))
+    gaps = np.cumsum(rng.geometric(1 / mean_gap[session_owner]))
+    before_owner = np.concatenate(([0], gaps))[session_offset]
+    session_day = np.minimum(joined[session_owner] + gaps - before_owner[session_owner] - 1, days - 1)
+    session_hour = rng.choice(24, len(session_owner), p=SESSION_HOURS / SESSION_HOURS.sum())
+    session = session_offset[student] + (rng.random(total) * sessions[student]).astype(np.int64)
+    seconds = (
+        session_day[session] * 86_400
+        + session_hour[session] * 3_600
+        + rng.integers(0, SESSION_MINUTES * 60, total)
+    )
+    seconds = np.minimum(seconds, days * 86_400 - 1)
+    submitted_at = (window_start + seconds.astype("timedelta64[s]")).astype("datetime64[us]")
+
+    # students work through chapters in order
+    reach = 1 + np.floor(CHAPTERS * rng.beta(2.0, 3.0, n)).astype(np.int64)
+    chapter = np.floor(rng.random(total) * reach[student]).astype(np.int64)
+    question = chapter * QUESTIONS_PER_CHAPTER + rng.integers(0, QUESTIONS_PER_CHAPTER, total)
+
+    # 3PL IRT with 1-in-4 guessing, ability improving over the window
+    ability = rng.normal(0.0, 1.0, n)[student] + 0.5 * seconds / (days * 86_400)
+    difficulty = questions["difficulty"][question]
+    p_correct = 0.25 + 0.75 / (1 + np.exp(-1.7 * questions["discrimination"][question] * (ability - difficulty)))
+    is_correct = rng.random(total) < p_correct
+    correct_answer = questions["correct"][question]
+    selected = np.where(is_correct, correct_answer, (correct_answer + rng.integers(1, 4, total)) % 4)
+
+    time_taken = rng.lognormal(np.log(25.0) + 0.3 * difficulty + 0.25 * ~is_correct, 0.6)
+    time_taken = np.clip(np.rint(time_taken), 2, 600).astype(np.int64)
+    time_missing = rng.random(total) < MISSING_TIME_SHARE
+    order = np.argsort(submitted_at, kind="stable")  # append order, as in production
+    # only a student's first answer to a question earns XP (see src/analytics/mastery.py)
+    first_attempt = np.zeros(total, dtype=bool)
+    _, first_index = np.unique(student[order] * len(questions["id"]) + question[order], return_index=True)
+    first_attempt[order[first_index]] = True
+    xp = np.where(is_correct & first_attempt, QUIZ_XP_PER_CORRECT, 0)
+
+    submissions = {
+        "student_id": student_ids[student][order],
+        "question_id": questions["id"][question][order],
+        "selected_answer_index": selected[order],
+        "is_correct": is_correct[order],
+        "xp_earned": xp[order],
+        "time_taken_seconds": np.where(time_missing, NULL, time_taken.astype(str))[order],
+        "submitted_at": submitted_at[order],
+        "school_id": school_ids[student][order],
+    }
+
+    progress = compute_progress(
+        {
+            "id": np.arange(total),
+            "student_id": submissions["student_id"],
+            "question_id": submissions["question_id"],
+            "chapter": chapter[order],
+            "is_correct": submissions["is_correct"],
+            "submitted_at": submissions["submitted_at"],
+            "chapter_ids": np.array([_chapter_id(c) for c in range(CHAPTERS)], dtype=object),
+        }
+    )
+    progress = {
+        name: np.array([row[name] for row in progress])
+        for name in (
+            "student_id", "chapter_id", "mastery_score", "questions_completed", "questions_correct", "last_answered_at"
+        )
+    }
+    progress["school_id"] = school_ids[progress["student_id"] - first_id] if len(progress["student_id"]) else []
+
+    daily = _daily(student_ids, school_ids, student, submitted_at, is_correct, xp, time_taken, time_missing)
+    return students, parents, submissions, progress, daily
+
+
+def _daily(student_ids, school_ids, student, submitted_at, is_correct, xp, time_taken, time_missing) -> dict:
+    """daily_analytics rows: per student and day totals, with the streak of consecutive active days."""
+    day = submitted_at.astype("datetime64[D]")
+    first_day = day.min() if len(day) else np.datetime64("today")
+    span = int((day.max() - first_day).astype(np.int64)) + 1 if len(day) else 1
+    key = student.astype(np.int64) * span + (day - first_day).astype(np.int64)
+    keys, group = np.unique(key, return_inverse=True)
+    n = len(keys)
+    seconds = np.where(time_missing, 0, time_taken)
+
+    owner, offset = np.divmod(keys, span)
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = (owner[1:] != owner[:-1]) | (offset[1:] != offset[:-1] + 1)
+    run_start = np.maximum.accumulate(np.where(new_run, np.arange(n), 0))
+
+    return {
+        "student_id": student_ids[owner],
+        "analytics_date": first_day + offset.astype("timedelta64[D]"),
+        "questions_answered": np.bincount(group, minlength=n),
+        "questions_correct": np.bincount(group, weights=is_correct, minlength=n).astype(np.int64),
+        "xp_earned": np.bincount(group, weights=xp, minlength=n).astype(np.int64),
+        "time_spent_minutes": np.ceil(np.bincount(group, weights=seconds, minlength=n) / 60).astype(np.int64),
+        "streak_count": np.arange(n) - run_start + 1,
+        "school_id": school_ids[owner],
+    }
+
+
+# ----------------------------------------------------------------------------
+
+def reset() -> None:
+    """Remove every bench row (children first, so no cascade runs row by row)."""
+    with db_session() as db:
+        bench = f"SELECT id FROM students WHERE email LIKE '%@{BENCH_DOMAIN}'"
+        for table in ("quiz_submissions", "student_progress", "daily_analytics", "parents"):
+            db.execute(text(f"DELETE FROM {table} WHERE student_id IN ({bench})"))
+        db.execute(text(f"DELETE FROM students WHERE email LIKE '%@{BENCH_DOMAIN}'"))
+        db.execute(text("DELETE FROM schools WHERE name LIKE 'bench-school-%'"))
+        db.execute(text("DELETE FROM quiz_submissions WHERE question_id IN "
+                        "(SELECT id FROM questions WHERE quiz_id LIKE 'bench-q-%')"))
+        db.execute(text("DELETE FROM chapters WHERE id LIKE 'bench-ch-%'"))
+        db.commit()
+
+
+def bench_students() -> int:
+    with db_session() as db:
+        return db.execute(
+            text("SELECT count(*) FROM students WHERE email LIKE :pattern"), {"pattern": f"%@{BENCH_DOMAIN}"}
+        ).scalar()
+
+
+def generate(students: int, per_student: float = 30, days: int = 180, seed: int = 7) -> dict:
+    """Add bench students (and their activity) until there are `students` of them."""
+    existing = bench_students()
+    if existing >= students:
+        return {"students": existing, "added": 0}
+
+    window_end = np.datetime64(datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1), "s")
+    with db_session() as db:
+        month = month_floor(datetime.utcnow() - timedelta(days=days))
+        while month <= month_floor(datetime.utcnow()):
+            create_month_partition(db, month)
+            month = add_months(month, 1)
+        db.commit()
+        ensure_future_partitions(db)
+
+    connection = engine.raw_connection()
+    totals = {"students": 0, "submissions": 0, "progress": 0, "daily": 0}
+    started = time.perf_counter()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT count(*) FROM chapters WHERE id LIKE 'bench-ch-%'")
+        if not cursor.fetchone()[0]:
+            _create_curriculum(cursor)
+            connection.commit()
+        questions = _question_parameters()
+        questions["id"] = _question_ids(cursor)
+        schools = _bench_schools(cursor)
+        connection.commit()
+
+        # Foreign keys are checked by per-row triggers, which cost more than the
+        # COPY itself; the generated rows are consistent, so skip them when the
+        # role may (superuser). Other roles just load more slowly.
+        try:
+            cursor.execute("SET session_replication_role = replica")
+        except psycopg2.errors.InsufficientPrivilege:
+            connection.rollback()
+
+        for first in range(existing + 1, students + 1, BLOCK_STUDENTS):
+            n = min(BLOCK_STUDENTS, students + 1 - first)
+            rng = np.random.default_rng([seed, first])
+            first_id = _reserve_ids(cursor, "students", n)
+            block_students, parents, submissions, progress, daily = _block(
+                rng, first, n, first_id, per_student, days, window_end, questions, schools
+            )
+            block_students["password_hash"] = np.full(n, UNUSABLE_PASSWORD_HASH)
+            totals["students"] += _copy(cursor, "students", block_students)
+            _copy(cursor, "parents", parents)
+            totals["submissions"] += _copy(cursor, "quiz_submissions", submissions)
+            totals["progress"] += _copy(cursor, "student_progress", progress)
+            totals["daily"] += _copy(cursor, "daily_analytics", daily)
+            connection.commit()
+            print(
+                f"  students {first + n - 1:,}/{students:,}  submissions +{len(submissions['student_id']):,}  "
+                f"{time.perf_counter() - started:.0f}s",
+                flush=True,
+            )
+        cursor.close()
+    finally:
+        # the connection goes back to the pool, where nothing may skip foreign keys
+        try:
+            connection.rollback()
+            cursor = connection.cursor()
+            cursor.execute("RESET session_replication_role")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.invalidate()
+        connection.close()
+
+    with db_session() as db:
+        for table in ("students", "parents", "questions", "quiz_submissions", "student_progress", "daily_analytics"):
+            db.execute(text(f"ANALYZE {table}"))
+        db.commit()
+        refresh_aggregates(db, rebuild=True)
+    totals["seconds"] = round(time.perf_counter() - started, 1)
+    return {"students": students, "added": totals}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--per-student", type=float, default=30, help="mean submissions per student")
+    parser.add_argument("--days", type=int, default=180, help="submissions cover this many days up to now")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--reset", action="store_true", help="remove existing bench data first")
+    args = parser.parse_args()
+    if args.reset:
+        reset()
+    print(generate(args.students, args.per_student, args.days, args.seed))
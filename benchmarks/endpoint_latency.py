@@ -0,0 +1,124 @@
+"""Endpoint latency at 10k, 100k and 1M students.
+
+Grows the synthetic dataset (benchmarks/dataset.py) to each size in turn and
+times the main read and write endpoints through the full ASGI stack
+(middleware, validation, serialization) with an in-process client, one
+request at a time, so the numbers show how each endpoint scales with the
+data rather than with concurrency. Requests rotate over a random sample of
+bench students so per-student caches are mostly cold. Quiz answers are
+really written, adding to the bench data.
+
+Usage:
+    python -m benchmarks.endpoint_latency [--sizes 10000 100000 1000000] [--repeat 100]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from itertools import cycle
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from benchmarks.dataset import BENCH_DOMAIN, CHAPTER_ORDER_OFFSET, CHAPTERS, generate
+from main import app
+from src.auth.auth_bearer import create_student_token
+from src.database.services import db_session
+
+
+def _sample(size: int) -> dict:
+    with db_session() as db:
+        students = db.execute(
+            text(
+                "SELECT id, email, phone, standard FROM students WHERE email LIKE :pattern "
+                "ORDER BY random() LIMIT :size"
+            ),
+            {"pattern": f"%@{BENCH_DOMAIN}", "size": size},
+        ).all()
+        questions = db.execute(
+            text("SELECT id, correct_answer_index FROM questions WHERE quiz_id LIKE 'bench-q-%'")
+        ).all()
+    return {
+        "students": students,
+        "tokens": {s.id: {"Authorization": f"Bearer {create_student_token(s)}"} for s in students},
+        "questions": questions,
+    }
+
+
+def _requests(sample: dict) -> dict:
+    students, tokens, questions = sample["students"], sample["tokens"], sample["questions"]
+    next_student = cycle(students).__next__
+    today = date.today()
+
+    def answer():
+        s, q = next_student(), random.choice(questions)
+        selected = q.correct_answer_index if random.random() < 0.65 else (q.correct_answer_index + 1) % 4
+        payload = {"question_id": q.id, "selected_answer_index": selected, "time_taken_seconds": 20}
+        return "POST", "/edu/v1/quiz/answer", {"json": payload, "headers": tokens[s.id]}
+
+    def lookup(key):
+        return lambda: ("GET", "/edu/v1/storefront/get_students", {"params": {key: getattr(next_student(), key)}})
+
+    return {
+        "get_students (email)": lookup("email"),
+        "get_students (phone)": lookup("phone"),
+        "get_students/batch (100)": lambda: (
+            "POST",
+            "/edu/v1/storefront/get_students/batch",
+            {"json": {"student_ids": [s.id for s in random.sample(students, min(100, len(students)))]}},
+        ),
+        "chapters/{n}": lambda: (
+            "GET", f"/edu/v1/storefront/chapters/{CHAPTER_ORDER_OFFSET + random.randint(1, CHAPTERS)}", {}
+        ),
+        "parent/dashboard": lambda: ("GET", "/edu/v1/parent/dashboard", {"headers": tokens[next_student().id]}),
+        "students/timeseries (50, 90d)": lambda: (
+            "GET",
+            "/edu/v1/analytics/students/timeseries",
+            {
+                "params": {
+                    "student_ids": [s.id for s in random.sample(students, min(50, len(students)))],
+                    "start": (today - timedelta(days=90)).isoformat(),
+                    "end": today.isoformat(),
+                }
+            },
+        ),
+        "chapters/stats": lambda: ("GET", "/edu/v1/analytics/chapters/stats", {}),
+        "quiz/answer": answer,
+    }
+
+
+def _report(label: str, samples: list, errors: int) -> None:
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    failed = f"  errors={errors}" if errors else ""
+    print(f"  {label:<32} p50={statistics.median(samples):8.2f}ms  p95={p95:8.2f}ms  max={samples[-1]:8.2f}ms{failed}")
+
+
+def run(sizes: list, repeat: int, per_student: float) -> None:
+    client = TestClient(app)  # not entered: no lifespan, so no background workers
+    for size in sizes:
+        started = time.perf_counter()
+        generate(size, per_student=per_student)
+        print(f"students={size:,} (dataset ready in {time.perf_counter() - started:.0f}s)")
+        for label, build in _requests(_sample(max(repeat, 100))).items():
+            samples, errors = [], 0
+            for i in range(repeat + 5):
+                method, url, kwargs = build()
+                request_started = time.perf_counter()
+                response = client.request(method, url, **kwargs)
+                elapsed = (time.perf_counter() - request_started) * 1000
+                if i < 5:
+                    continue  # warm-up
+                samples.append(elapsed)
+                errors += response.status_code >= 400
+            _report(label, samples, errors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--per-student", type=float, default=30, help="mean submissions per student")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.per_student)
@@ -0,0 +1,64 @@
+"""Per-call overhead of the ORM lookups against the pre-built Core statements.
+
+Times the three hot single-row lookups both ways on one open session, so the
+numbers are dominated by statement construction, compilation and result
+handling rather than connection checkout. Needs at least one student and a
+chapter with ``order`` set in the configured database.
+
+Usage:
+    python -m benchmarks.fast_queries [--calls 5000]
+"""
+import argparse
+import time
+
+from src.database.fast_queries import chapter_by_order, student_for_token, student_summary
+from src.database.repository import Chapter, Student
+from src.database.services import READ, db_session
+
+
+def _per_call_us(fn, calls: int) -> float:
+    for _ in range(min(calls, 200)):
+        fn()  # warm the statement caches
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def run(calls: int) -> None:
+    with db_session(READ) as db:
+        student = db.query(Student.id, Student.email).first()
+        order = db.query(Chapter.order).filter(Chapter.order.isnot(None)).limit(1).scalar()
+        if student is None or order is None:
+            raise SystemExit("Seed at least one student and one ordered chapter first")
+
+        cases = {
+            "verify_student_token": (
+                lambda: db.query(Student).filter(Student.id == student.id, Student.email == student.email).first(),
+                lambda: student_for_token(db, student.id, student.email),
+            ),
+            "get_student (by email)": (
+                lambda: db.query(Student.email, Student.phone, Student.id, Student.first_name, Student.standard)
+                .filter(Student.email == student.email)
+                .first(),
+                lambda: student_summary(db, email=student.email),
+            ),
+            "get_chapter_by_number": (
+                lambda: db.query(Chapter).filter(Chapter.order == order).first(),
+                lambda: chapter_by_order(db, order),
+            ),
+        }
+
+        print(f"calls={calls:,}")
+        for label, (orm, core) in cases.items():
+            orm_us = _per_call_us(orm, calls)
+            db.expunge_all()
+            core_us = _per_call_us(core, calls)
+            print(f"  {label:<24} orm={orm_us:8.1f}us  core={core_us:8.1f}us  saved={orm_us - core_us:7.1f}us/call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5_000)
+    args = parser.parse_args()
+    run(args.calls)
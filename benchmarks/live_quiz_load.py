@@ -0,0 +1,285 @@
+"""Load test for live quiz sessions over WebSockets.
+
+Opens ``--sessions`` live sessions on a running server, each with one host
+and ``--students`` student sockets (bench students of ``--school`` from
+benchmarks/dataset.py), and plays ``--questions`` questions: the host opens
+each question, every student answers after a random think time, and the
+host reveals once everyone has answered (or after ``--question-timeout``).
+Then it checks that:
+
+* every socket connected and every answer was acknowledged;
+* hosts received throttled tallies -- a handful per question, not one per
+  answer -- and the last tally of each question counted every answer;
+* every answer reached quiz_submissions (batched by the server).
+
+Start the server with a single worker, since sessions live in one
+process's memory, and raise the open file limit for thousands of sockets.
+Sessions are created with the admin token, so set EDU_ADMIN_TOKEN for both:
+
+    ulimit -n 65536
+    EDU_ADMIN_TOKEN=... uvicorn main:app --port 8000 --workers 1
+    python -m benchmarks.live_quiz_load [--url http://127.0.0.1:8000] [--sessions 50] [--students 40]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from sqlalchemy import text
+from websockets.asyncio.client import connect
+
+from benchmarks.dataset import BENCH_DOMAIN
+from src.auth.auth_bearer import create_student_token
+from src.core.constants import ADMIN_TOKEN, LIVE_FLUSH_INTERVAL
+from src.database.services import db_session
+
+
+def _largest_school() -> int:
+    with db_session() as db:
+        return db.execute(
+            text(
+                "SELECT school_id FROM students WHERE email LIKE :pattern "
+                "GROUP BY school_id ORDER BY count(*) DESC LIMIT 1"
+            ),
+            {"pattern": f"%@{BENCH_DOMAIN}"},
+        ).scalar()
+
+
+def _students(count: int, school_id: int) -> list:
+    with db_session() as db:
+        rows = db.execute(
+            text(
+                "SELECT id, email, standard, school_id FROM students WHERE email LIKE :pattern "
+                "AND school_id = :school_id ORDER BY random() LIMIT :count"
+            ),
+            {"pattern": f"%@{BENCH_DOMAIN}", "school_id": school_id, "count": count},
+        ).all()
+    if len(rows) < count:
+        raise SystemExit(f"Need {count} bench students, found {len(rows)}; run benchmarks.dataset first")
+    return [(row.id, create_student_token(row)) for row in rows]
+
+
+def _percentiles(samples: list) -> str:
+    if not samples:
+        return "n/a"
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    return f"p50={statistics.median(samples):.1f}ms p95={p95:.1f}ms max={samples[-1]:.1f}ms"
+
+
+class Stats:
+    def __init__(self):
+        self.connect_ms = []
+        self.ack_ms = []
+        self.connect_failures = 0
+        self.answers_sent = 0
+        self.answers_acked = 0
+        self.tallies = []  # per session and question: tallies received
+        self.incomplete_tallies = 0  # questions whose last tally missed answers
+        self.ended = 0
+
+
+async def _student(ws_url: str, code: str, token: str, think: float, stats: Stats):
+    started = time.perf_counter()
+    try:
+        socket = await connect(f"{ws_url}/sessions/{code}/student?token={token}", open_timeout=30)
+    except Exception:
+        stats.connect_failures += 1
+        return
+    stats.connect_ms.append((time.perf_counter() - started) * 1000)
+    sent_at = {}
+    async with socket:
+        async for raw in socket:
+            message = json.loads(raw)
+            if message["type"] == "question":
+                await asyncio.sleep(random.uniform(0, think))
+                question = message["question"]
+                sent_at[question["question_id"]] = time.perf_counter()
+                await socket.send(
+                    json.dumps(
+                        {
+                            "type": "answer",
+                            "question_id": question["question_id"],
+                            "selected_answer_index": random.randrange(len(question["options"])),
+                            "time_taken_seconds": random.randint(3, 30),
+                        }
+                    )
+                )
+                stats.answers_sent += 1
+            elif message["type"] == "answer_received":
+                stats.ack_ms.append((time.perf_counter() - sent_at[message["question_id"]]) * 1000)
+                stats.answers_acked += 1
+            elif message["type"] == "ended":
+                stats.ended += 1
+                break
+
+
+async def _host(
+    ws_url: str, code: str, key: str, students: int, question_timeout: float, stats: Stats, ready: asyncio.Event
+):
+    async with connect(f"{ws_url}/sessions/{code}/host?key={key}", open_timeout=30) as socket:
+        await ready.wait()  # every student socket is open (or failed to open)
+        # sockets open before the server has authenticated them; wait until they have joined
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                message = json.loads(await asyncio.wait_for(socket.recv(), 0.5))
+            except asyncio.TimeoutError:
+                continue
+            if message["type"] == "tally" and message["connected"] >= students:
+                break
+
+        index = 0
+        while True:
+            await socket.send(json.dumps({"type": "next"}))
+            tallies, complete, finished = 0, False, False
+            deadline = time.monotonic() + question_timeout
+            while time.monotonic() < deadline:
+                try:
+                    message = json.loads(await asyncio.wait_for(socket.recv(), 0.5))
+                except asyncio.TimeoutError:
+                    continue
+                if message["type"] == "error":  # no more questions
+                    finished = True
+                    break
+                # tallies still in flight from the previous question are skipped
+                if message["type"] == "tally" and message["open"] and message["question_index"] == index:
+                    tallies += 1
+                    if message["answered"] >= message["connected"]:
+                        complete = True
+                        break
+            if finished:
+                break
+            stats.tallies.append(tallies)
+            stats.incomplete_tallies += not complete
+            await socket.send(json.dumps({"type": "reveal"}))
+            index += 1
+
+        await socket.send(json.dumps({"type": "end"}))
+        async for raw in socket:
+            if json.loads(raw)["type"] == "ended":
+                break
+
+
+async def run(
+    url: str,
+    sessions: int,
+    students: int,
+    questions: int,
+    think: float,
+    question_timeout: float,
+    school_id: Optional[int] = None,
+) -> int:
+    ws_url = url.replace("http", "ws", 1) + "/edu/v1/live"
+    # sessions belong to one school, and only its students can join
+    school_id = school_id or _largest_school()
+    population = _students(sessions * students, school_id)
+    with db_session() as db:
+        question_ids = db.execute(
+            text("SELECT id FROM questions WHERE chapter_id = 'bench-ch-001' ORDER BY id LIMIT :n"), {"n": questions}
+        ).scalars().all()
+    started_at = datetime.utcnow()
+
+    headers = {"X-Admin-Token": ADMIN_TOKEN, "X-School-Id": str(school_id)}
+    async with httpx.AsyncClient(base_url=url, timeout=30, headers=headers) as client:
+        created = []
+        for _ in range(sessions):
+            response = await client.post(
+                "/edu/v1/live/sessions", json={"chapter_id": "bench-ch-001", "question_ids": question_ids}
+            )
+            response.raise_for_status()
+            created.append(response.json()["data"])
+
+    stats = Stats()
+    ready = asyncio.Event()
+    started = time.perf_counter()
+    student_tasks = [
+        asyncio.create_task(_student(ws_url, session["code"], token, think, stats))
+        for i, session in enumerate(created)
+        for _, token in population[i * students:(i + 1) * students]
+    ]
+    host_tasks = [
+        asyncio.create_task(
+            _host(ws_url, session["code"], session["host_key"], students, question_timeout, stats, ready)
+        )
+        for session in created
+    ]
+    while len(stats.connect_ms) + stats.connect_failures < len(student_tasks):
+        await asyncio.sleep(0.1)
+    connected_in = time.perf_counter() - started
+    ready.set()
+    await asyncio.gather(*host_tasks)
+    await asyncio.wait_for(asyncio.gather(*student_tasks), 60)
+    elapsed = time.perf_counter() - started
+
+    # the server writes answers in batches; give it a few flush intervals
+    student_ids = [student_id for student_id, _ in population]
+    stored = 0
+    for _ in range(20):
+        await asyncio.sleep(LIVE_FLUSH_INTERVAL)
+        with db_session() as db:
+            stored = db.execute(
+                text(
+                    "SELECT count(*) FROM quiz_submissions WHERE submitted_at >= :since "
+                    "AND student_id = ANY(:students) AND question_id = ANY(:questions)"
+                ),
+                {"since": started_at, "students": student_ids, "questions": list(question_ids)},
+            ).scalar()
+        if stored >= stats.answers_acked:
+            break
+
+    sockets = len(student_tasks) + len(host_tasks)
+    print(f"{sessions} sessions x {students} students, {len(question_ids)} questions: {sockets} sockets")
+    print(f"  connected in {connected_in:.1f}s ({stats.connect_failures} failed)  connect {_percentiles(stats.connect_ms)}")
+    print(f"  answers sent={stats.answers_sent} acknowledged={stats.answers_acked}  ack {_percentiles(stats.ack_ms)}")
+    if stats.tallies:
+        print(
+            f"  tallies per question: mean={statistics.mean(stats.tallies):.1f} max={max(stats.tallies)} "
+            f"(answers per question: {students}); incomplete={stats.incomplete_tallies}"
+        )
+    print(f"  quiz_submissions rows written: {stored}  sessions ended: {stats.ended}/{len(student_tasks)} students")
+    print(f"  total {elapsed:.1f}s")
+
+    failures = []
+    if stats.connect_failures:
+        failures.append(f"{stats.connect_failures} sockets failed to connect")
+    if stats.answers_acked != stats.answers_sent:
+        failures.append(f"{stats.answers_sent - stats.answers_acked} answers not acknowledged")
+    if stats.incomplete_tallies:
+        failures.append(f"{stats.incomplete_tallies} questions whose last tally missed answers")
+    if stored != stats.answers_acked:
+        failures.append(f"{stored} of {stats.answers_acked} answers in quiz_submissions")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--students", type=int, default=40, help="per session")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--think", type=float, default=3.0, help="max seconds a student takes to answer")
+    parser.add_argument("--question-timeout", type=float, default=30.0)
+    parser.add_argument("--school", type=int, help="school whose students join; the largest bench school by default")
+    args = parser.parse_args()
+    sys.exit(
+        asyncio.run(
+            run(
+                args.url,
+                args.sessions,
+                args.students,
+                args.questions,
+                args.think,
+                args.question_timeout,
+                args.school,
+            )
+        )
+    )
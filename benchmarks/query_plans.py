@@ -0,0 +1,348 @@
+"""Query-plan regression check for the queries behind the API.
+
+Runs each case -- the real endpoint or repository function, against the
+configured database -- while recording every statement it sends, then
+EXPLAINs those statements with their parameters and checks that:
+
+* no large table (LARGE_TABLES, once it holds LARGE_TABLE_MIN_ROWS rows)
+  is read with a sequential scan;
+* the number of statements and the access paths of each plan (the tables
+  it reads and, for large tables, whether by index or by scan; monthly
+  partitions folded into their parent) match the committed baseline.
+
+Join strategies and bitmap vs plain index scans are not compared: the
+planner flips between them on statistics alone, between two ANALYZE runs
+over the same data. A changed plan is printed in full for context.
+
+Write paths are run in a transaction that is rolled back. The planner only
+behaves like production on production-like volumes, so ``--seed`` first
+grows the synthetic dataset (benchmarks/dataset.py) to ``--students``.
+Exits non-zero on any regression; after an intended change, rerun with
+``--update-baseline`` and commit the new baseline.
+
+Usage:
+    python -m benchmarks.query_plans [--seed] [--students 100000] [--update-baseline]
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import event, text
+
+from benchmarks.dataset import BENCH_DOMAIN, generate
+from src.analytics.mastery import update_mastery
+from src.analytics.parent_dashboard import load_parent_dashboard
+from src.auth.auth_bearer import create_student_token, verify_student_token
+from src.background.outbox import claim_batch
+from src.database.curriculum_changes import read_changes
+from src.database.models import StudentBatchLookupRequest, StudentLoginRequest
+from src.database.repository import Student
+from src.database.services import db_session, engine
+from src.endpoints.v1 import analytics, storefront
+
+BASELINE = Path(__file__).with_name("query_plans_baseline.json")
+
+# Tables that grow with the number of students; small catalog tables
+# (chapters, questions, ...) may be scanned.
+LARGE_TABLES = {"students", "parents", "quiz_submissions", "student_progress", "daily_analytics"}
+LARGE_TABLE_MIN_ROWS = 10_000
+
+_PARTITION_SUFFIX = re.compile(r"_(?:y\d{4}m\d{2}|default)(?=_|$)")
+_EXPLAINABLE = re.compile(r"^\s*(?:SELECT|WITH|UPDATE|DELETE)\b|^\s*INSERT\b.*\bSELECT\b", re.IGNORECASE | re.DOTALL)
+
+
+# ----------------------------------------------------------------------------
+# capturing and explaining
+
+class _Recorder:
+    """Statements sent by the current thread while a case runs."""
+
+    def __init__(self):
+        self.thread = None
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread:
+            self.statements.append((statement, parameters, executemany))
+
+    def record(self, fn):
+        self.thread, self.statements = threading.get_ident(), []
+        try:
+            fn()
+        finally:
+            self.thread = None
+        return self.statements
+
+
+def _explain(statement: str, parameters):
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0][0]["Plan"]
+        cursor.close()
+        return plan
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def _fold(name: str) -> str:
+    return _PARTITION_SUFFIX.sub("", name)
+
+
+def plan_shape(node: dict, depth: int = 0) -> list:
+    """One line per plan node; identical partition children are listed once."""
+    label = node["Node Type"]
+    if "Relation Name" in node:
+        label += f" on {_fold(node['Relation Name'])}"
+    if "Index Name" in node:
+        label += f" using {_fold(node['Index Name'])}"
+    lines = ["  " * depth + label]
+    seen = set()
+    for child in node.get("Plans", []):
+        child_lines = plan_shape(child, depth + 1)
+        key = tuple(child_lines)
+        if node["Node Type"] in ("Append", "Merge Append") and key in seen:
+            continue
+        seen.add(key)
+        lines.extend(child_lines)
+    return lines
+
+
+_INDEX_ACCESS = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+
+def access_paths(node: dict) -> list:
+    """Sorted ``table`` / ``table (index|seq)`` entries; access kind only for LARGE_TABLES."""
+    found = set()
+
+    def walk(n):
+        # ModifyTable names the written table; how it is read shows in the scan below it
+        if "Relation Name" in n and n["Node Type"] != "ModifyTable":
+            table = _fold(n["Relation Name"])
+            if table in LARGE_TABLES:
+                table += " (index)" if n["Node Type"] in _INDEX_ACCESS else " (seq)"
+            found.add(table)
+        for child in n.get("Plans", []):
+            walk(child)
+
+    walk(node)
+    return sorted(found)
+
+
+def _seq_scans(node: dict) -> list:
+    found = []
+    if node["Node Type"] == "Seq Scan":
+        found.append(_fold(node["Relation Name"]))
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def _large_tables() -> set:
+    with db_session() as db:
+        rows = db.execute(
+            text(
+                "SELECT c.relname, c.reltuples FROM pg_class c "
+                "WHERE c.relkind IN ('r', 'p') AND c.relname = ANY(:tables)"
+            ),
+            {"tables": list(LARGE_TABLES)},
+        ).all()
+        partitioned = db.execute(
+            text(
+                "SELECT COALESCE(sum(GREATEST(c.reltuples, 0)), 0) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'quiz_submissions'::regclass"
+            )
+        ).scalar()
+    sizes = {name: max(rows_, 0) for name, rows_ in rows}
+    sizes["quiz_submissions"] = max(sizes.get("quiz_submissions", 0), partitioned)
+    return {name for name, size in sizes.items() if size >= LARGE_TABLE_MIN_ROWS}
+
+
+# ----------------------------------------------------------------------------
+# cases
+
+def _fixture() -> dict:
+    with db_session() as db:
+        student = db.execute(
+            text(
+                "SELECT s.id, s.email, s.phone, s.school_id FROM students s "
+                "WHERE s.email LIKE :pattern AND EXISTS (SELECT 1 FROM student_progress p WHERE p.student_id = s.id) "
+                "ORDER BY s.id LIMIT 1"
+            ),
+            {"pattern": f"%@{BENCH_DOMAIN}"},
+        ).first()
+        if student is None:
+            raise SystemExit("No seeded students with progress; run with --seed first")
+        # the student's schoolmates, whom the analytics routes let the student read
+        others = db.execute(
+            text(
+                "SELECT id, email, phone FROM students WHERE email LIKE :pattern AND school_id = :school "
+                "ORDER BY id DESC LIMIT 50"
+            ),
+            {"pattern": f"%@{BENCH_DOMAIN}", "school": student.school_id},
+        ).all()
+        chapter = db.execute(text("SELECT id, \"order\" FROM chapters WHERE id = 'bench-ch-001'")).first()
+        token = create_student_token(db.get(Student, student.id))
+    return {"student": student, "others": others, "chapter": chapter, "token": token}
+
+
+def _rolled_back(fn):
+    """Run `fn` with a session whose work is always rolled back, even where `fn` commits."""
+
+    def run():
+        with db_session() as db:
+            # claim_batch commits its lease; here that only flushes
+            db.commit = db.flush
+            try:
+                fn(db)
+                db.flush()
+            finally:
+                db.rollback()
+
+    return run
+
+
+def cases(fx: dict) -> dict:
+    student, others, chapter = fx["student"], fx["others"], fx["chapter"]
+    today = date.today()
+
+    def with_session(fn):
+        def run():
+            with db_session() as db:
+                fn(db)
+
+        return run
+
+    return {
+        "get_student by id": with_session(
+            lambda db: storefront.get_student(db, student_id=student.id, email=None, phone=None)
+        ),
+        "get_student by email": with_session(
+            lambda db: storefront.get_student(db, student_id=None, email=student.email, phone=None)
+        ),
+        "get_student by phone": with_session(
+            lambda db: storefront.get_student(db, student_id=None, email=None, phone=student.phone)
+        ),
+        "get_students_batch": with_session(
+            lambda db: storefront.get_students_batch(
+                StudentBatchLookupRequest(
+                    student_ids=[s.id for s in others[:20]],
+                    emails=[s.email for s in others[20:35]],
+                    phones=[s.phone for s in others[35:]],
+                ),
+                db,
+                caller=student,
+            )
+        ),
+        "login_student": with_session(
+            lambda db: storefront.login_student(
+                # model_construct: the bench.invalid domain does not pass EmailStr
+                StudentLoginRequest.model_construct(email=student.email, password="not-the-password"),
+                db,
+            )
+        ),
+        "verify_student_token": with_session(lambda db: verify_student_token(fx["token"], db)),
+        "all_chapters": storefront._load_all_chapters,
+        "chapter_by_number": lambda: storefront._load_chapter_by_number(chapter.order),
+        "curriculum sync": with_session(lambda db: read_changes(db, 0, 500)),
+        "parent dashboard": with_session(lambda db: load_parent_dashboard(db, student.id)),
+        "students timeseries": with_session(
+            lambda db: analytics.get_students_timeseries(
+                db, student_ids=[s.id for s in others], start=today - timedelta(days=90), end=today, bucket=None,
+                student=student,
+            )
+        ),
+        "school timeseries": with_session(
+            lambda db: analytics.get_school_timeseries(
+                student.school_id, db, start=today - timedelta(days=90), end=today, bucket=None, student=student
+            )
+        ),
+        "chapters stats": with_session(lambda db: analytics.get_chapters_stats(db, student)),
+        "chapter stats": with_session(lambda db: analytics.get_chapter_stats(chapter.id, db, student)),
+        "quiz answer (mastery update)": _rolled_back(
+            lambda db: update_mastery(db, student.id, chapter.id, True)
+        ),
+        "outbox claim": _rolled_back(lambda db: claim_batch(db, 50)),
+    }
+
+
+def run_case(recorder: _Recorder, fn) -> dict:
+    statements = recorder.record(fn)
+    plans = []
+    for statement, parameters, executemany in statements:
+        if executemany or not _EXPLAINABLE.match(statement):
+            continue
+        plan = _explain(statement, parameters)
+        plans.append({"statement": " ".join(statement.split())[:200], "plan": plan})
+    return {"queries": len(statements), "plans": plans}
+
+
+def check(update_baseline: bool) -> int:
+    recorder = _Recorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+    large = _large_tables()
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    if not baseline and not update_baseline:
+        print(f"No baseline at {BASELINE}; rerun with --update-baseline")
+        return 1
+    missing = LARGE_TABLES - large
+    if missing:
+        print(f"note: {', '.join(sorted(missing))} below {LARGE_TABLE_MIN_ROWS:,} rows, seq scans not checked")
+
+    current, failures = {}, []
+    for name, fn in cases(_fixture()).items():
+        try:
+            result = run_case(recorder, fn)
+        except Exception as e:
+            failures.append(f"{name}: raised {type(e).__name__}: {e}")
+            continue
+        paths = [access_paths(p["plan"]) for p in result["plans"]]
+        current[name] = {"queries": result["queries"], "plans": paths}
+
+        for p in result["plans"]:
+            scanned = sorted(set(_seq_scans(p["plan"])) & large)
+            if scanned:
+                failures.append(f"{name}: seq scan on {', '.join(scanned)} in: {p['statement']}")
+
+        expected = baseline.get(name)
+        if expected is None or update_baseline:
+            continue
+        if expected["queries"] != result["queries"]:
+            failures.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+        elif expected["plans"] != paths:
+            for i, (was, now) in enumerate(zip(expected["plans"], paths)):
+                if was != now:
+                    failures.append(
+                        f"{name}: plan {i + 1} reads {', '.join(now)}, baseline {', '.join(was)}\n    "
+                        + result["plans"][i]["statement"]
+                        + "\n      "
+                        + "\n      ".join(plan_shape(result["plans"][i]["plan"]))
+                    )
+        print(f"  {name:<30} {result['queries']} queries")
+
+    event.remove(engine, "before_cursor_execute", recorder)
+    if update_baseline:
+        BASELINE.write_text(json.dumps(current, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {BASELINE} ({len(current)} cases)")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print(f"ok: {len(current)} cases")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", action="store_true", help="grow the synthetic dataset to --students first")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    if args.seed:
+        generate(args.students)
+    sys.exit(check(args.update_baseline))
@@ -0,0 +1,77 @@
+"""Student lookup latency at 10k and 1M students.
+
+Grows the synthetic dataset (benchmarks/dataset.py) to each size in the
+configured database, then times the single-row ``/get_students`` query
+against the batch ``= ANY(...)`` query used by ``/get_students/batch``.
+
+Usage:
+    python -m benchmarks.student_lookup [--sizes 10000 1000000] [--batch 100]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import Integer, String, any_, bindparam, or_, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from benchmarks.dataset import BENCH_DOMAIN, generate
+from src.database.repository import Student
+from src.database.services import db_session
+
+def _timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<32} p50={statistics.median(samples):8.3f}ms  p95={p95:8.3f}ms")
+
+
+def run(sizes: list, batch: int, repeat: int) -> None:
+    columns = (Student.email, Student.phone, Student.id, Student.first_name, Student.standard)
+    for size in sizes:
+        generate(size)
+        with db_session() as db:
+            ids = db.execute(
+                text("SELECT id FROM students WHERE email LIKE :pattern"),
+                {"pattern": f"%@{BENCH_DOMAIN}"},
+            ).scalars().all()
+            rows = db.query(Student.id, Student.email, Student.phone).filter(
+                Student.id == any_(bindparam("ids", random.sample(ids, batch), type_=ARRAY(Integer)))
+            ).all()
+            sample_ids = [r.id for r in rows]
+            sample_emails = [r.email for r in rows]
+            sample_phones = [r.phone for r in rows]
+
+            def single_by_phone():
+                for phone in sample_phones:
+                    db.query(*columns).filter(Student.phone == phone).first()
+
+            def batch_lookup():
+                db.query(*columns).filter(
+                    or_(
+                        Student.id == any_(bindparam("ids", sample_ids, type_=ARRAY(Integer))),
+                        Student.email == any_(bindparam("emails", sample_emails, type_=ARRAY(String))),
+                        Student.phone == any_(bindparam("phones", sample_phones, type_=ARRAY(String))),
+                    )
+                ).all()
+
+            print(f"students={size:,} batch={batch}")
+            _report(f"{batch} single phone lookups", _timed(single_by_phone, repeat))
+            _report(f"1 batch lookup ({3 * batch} keys)", _timed(batch_lookup, repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.batch, args.repeat)
@@ -1,8 +1,118 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 # from fastapi_profiler.profiler_middleware import PyInstrumentProfilerMiddleware
+from src.analytics.aggregates import refresh_aggregates
+from src.analytics.daily import refresh_daily_analytics
+from src.background import handlers  # noqa: F401  (registers outbox handlers)
+from src.background.worker import OutboxWorkerPool
+from src.core.configurations import logger
+from src.core.constants import (
+    AGGREGATE_REFRESH_INTERVAL,
+    EDGE_SYNC_INTERVAL,
+    PARTITION_CHECK_INTERVAL,
+    TENANT_CURRICULUM_SYNC_INTERVAL,
+)
+from src.database.partitions import ensure_future_partitions
+from src.database.services import IS_EDGE, db_session, tenant_engines
+from src.database.tenants import mirror_all_curricula
+from src.edge.node import init_edge_database, sync_once
 from src.endpoints.router_v1 import api_v1_router
+from src.live.sessions import live_sessions
+from src.middlewares.access_control_middleware import AdmissionControlMiddleware
+from src.middlewares.request_context_middleware import RequestContextMiddleware
+
+
+# the shared primary, then every school with a database of its own
+DATABASES = (None, *tenant_engines)
+
+
+def _prepare_partitions():
+    for school_id in DATABASES:
+        try:
+            with db_session(school_id=school_id) as db:
+                ensure_future_partitions(db)
+        except Exception as e:
+            # retried on the next check; the DEFAULT partition catches rows meanwhile
+            logger.error(f"Could not create quiz_submissions partitions (school {school_id}): {e}")
+
+
+async def _prepare_partitions_periodically():
+    # after the startup run
+    while True:
+        await asyncio.sleep(PARTITION_CHECK_INTERVAL)
+        await run_in_threadpool(_prepare_partitions)
+
+
+def _refresh_aggregates():
+    for school_id in DATABASES:
+        with db_session(school_id=school_id) as db:
+            refresh_aggregates(db)
+            refresh_daily_analytics(db)
+
+
+async def _refresh_aggregates_periodically():
+    while True:
+        try:
+            await run_in_threadpool(_refresh_aggregates)
+        except Exception as e:
+            logger.error(f"Aggregate refresh failed: {e}")
+        await asyncio.sleep(AGGREGATE_REFRESH_INTERVAL)
+
+
+async def _mirror_curricula_periodically():
+    while True:
+        try:
+            await run_in_threadpool(mirror_all_curricula)
+        except Exception as e:
+            logger.error(f"Curriculum copy to school databases failed: {e}")
+        await asyncio.sleep(TENANT_CURRICULUM_SYNC_INTERVAL)
+
+
+async def _sync_edge_periodically():
+    while True:
+        try:
+            await run_in_threadpool(sync_once)
+        except Exception as e:
+            # expected while the school is offline; retried next tick
+            logger.warning(f"Edge sync failed: {e}")
+        await asyncio.sleep(EDGE_SYNC_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if IS_EDGE:
+        # local SQLite: no partitions, aggregates or outbox workers
+        await run_in_threadpool(init_edge_database)
+        syncer = asyncio.create_task(_sync_edge_periodically())
+        live_sessions.start()
+        yield
+        syncer.cancel()
+        await live_sessions.stop()
+        return
+
+    # the first run completes before requests are served
+    await run_in_threadpool(_prepare_partitions)
+    partitions = asyncio.create_task(_prepare_partitions_periodically())
+    refresher = asyncio.create_task(_refresh_aggregates_periodically())
+    mirror = asyncio.create_task(_mirror_curricula_periodically()) if tenant_engines else None
+    outbox_pools = [OutboxWorkerPool(school_id=school_id) for school_id in DATABASES]
+    for pool in outbox_pools:
+        pool.start()
+    live_sessions.start()
+    yield
+    partitions.cancel()
+    refresher.cancel()
+    if mirror is not None:
+        mirror.cancel()
+    # ends open live sessions and writes their queued answers
+    await live_sessions.stop()
+    for pool in outbox_pools:
+        await pool.stop()
 
 
 # main
@@ -10,7 +120,7 @@ def get_application():
     """
     Get FastAPI Application for service.
     """
-    app = FastAPI(title="EDU-TECH service", version="001")
+    app = FastAPI(title="EDU-TECH service", version="001", lifespan=lifespan)
 
     ALLOWED_HOSTS = ["*"]
 
@@ -21,6 +131,8 @@ def get_application():
         allow_headers=["*"],
         allow_credentials=True,
     )
+    app.add_middleware(RequestContextMiddleware)
+    app.add_middleware(AdmissionControlMiddleware)
 
     app.include_router(api_v1_router, prefix="/edu/v1")
     return app
@@ -0,0 +1,181 @@
+"""Maintained per-question and per-chapter aggregates over quiz_submissions.
+
+question_stats keeps running totals (attempts, correct answers, answer time)
+per question. Each refresh folds in only the submissions received in
+[watermark, now - AGGREGATE_REFRESH_LAG) -- a range scan of
+idx_quiz_submissions_received, on `received_at` rather than `submitted_at` so
+that edge node uploads answered days ago are still counted -- and moves the
+`job_watermarks` entry forward in the same transaction, so a window is never
+counted twice. chapter_stats is then re-rolled for the chapters that changed,
+adding student counts and average mastery from student_progress.
+
+The first refresh (no watermark yet) rebuilds everything, including months
+already moved to the cold archive.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.core.configurations import logger
+from src.core.constants import AGGREGATE_REFRESH_LAG
+from src.database.archive import NULL_TIME_TAKEN, scan_archive
+from src.database.repository import Question, QuestionStats
+from src.database.services import database_key
+from src.database.watermarks import get_watermark, set_watermark
+
+JOB_NAME = "chapter_aggregates"
+
+_FOLD_SUBMISSIONS = """
+    INSERT INTO question_stats AS qs (
+        question_id, chapter_id, attempts, correct, timed_attempts, total_time_seconds, last_submission_at
+    )
+    SELECT s.question_id, q.chapter_id, count(*), count(*) FILTER (WHERE s.is_correct),
+           count(s.time_taken_seconds), coalesce(sum(s.time_taken_seconds), 0), max(s.submitted_at)
+    FROM quiz_submissions s
+    JOIN questions q ON q.id = s.question_id
+    WHERE s.received_at < :until {since_clause}
+    GROUP BY s.question_id, q.chapter_id
+    ON CONFLICT (question_id) DO UPDATE SET
+        attempts = qs.attempts + EXCLUDED.attempts,
+        correct = qs.correct + EXCLUDED.correct,
+        timed_attempts = qs.timed_attempts + EXCLUDED.timed_attempts,
+        total_time_seconds = qs.total_time_seconds + EXCLUDED.total_time_seconds,
+        last_submission_at = GREATEST(qs.last_submission_at, EXCLUDED.last_submission_at)
+    RETURNING qs.chapter_id
+"""
+
+_ROLL_UP_CHAPTERS = """
+    INSERT INTO chapter_stats AS cs (
+        chapter_id, attempts, correct, timed_attempts, total_time_seconds,
+        last_submission_at, students, avg_mastery_score
+    )
+    SELECT c.id, coalesce(q.attempts, 0), coalesce(q.correct, 0), coalesce(q.timed_attempts, 0),
+           coalesce(q.total_time_seconds, 0), q.last_submission_at,
+           coalesce(p.students, 0), p.avg_mastery_score
+    FROM chapters c
+    LEFT JOIN (
+        SELECT chapter_id, sum(attempts) AS attempts, sum(correct) AS correct,
+               sum(timed_attempts) AS timed_attempts, sum(total_time_seconds) AS total_time_seconds,
+               max(last_submission_at) AS last_submission_at
+        FROM question_stats
+        WHERE chapter_id = ANY(:chapter_ids)
+        GROUP BY chapter_id
+    ) q ON q.chapter_id = c.id
+    LEFT JOIN (
+        SELECT chapter_id, count(*) AS students, round(avg(mastery_score), 2) AS avg_mastery_score
+        FROM student_progress
+        WHERE chapter_id = ANY(:chapter_ids)
+        GROUP BY chapter_id
+    ) p ON p.chapter_id = c.id
+    WHERE c.id = ANY(:chapter_ids)
+    ON CONFLICT (chapter_id) DO UPDATE SET
+        attempts = EXCLUDED.attempts,
+        correct = EXCLUDED.correct,
+        timed_attempts = EXCLUDED.timed_attempts,
+        total_time_seconds = EXCLUDED.total_time_seconds,
+        last_submission_at = EXCLUDED.last_submission_at,
+        students = EXCLUDED.students,
+        avg_mastery_score = EXCLUDED.avg_mastery_score
+"""
+
+
+def _fold_archive(db: Session) -> set:
+    """Add archived submissions to question_stats (full rebuild only)."""
+    question_chapter = dict(db.execute(select(Question.id, Question.chapter_id)).all())
+    totals = {}
+    for archived in scan_archive(
+        columns=["question_id", "is_correct", "time_taken_seconds", "submitted_at"], database=database_key(db.get_bind())
+    ):
+        questions, inverse = np.unique(archived["question_id"], return_inverse=True)
+        timed = archived["time_taken_seconds"] != NULL_TIME_TAKEN
+        attempts = np.bincount(inverse)
+        correct = np.bincount(inverse, weights=archived["is_correct"].astype(np.float64))
+        timed_attempts = np.bincount(inverse, weights=timed.astype(np.float64))
+        total_time = np.bincount(inverse, weights=np.where(timed, archived["time_taken_seconds"], 0))
+        last = np.full(len(questions), np.datetime64("NaT"), dtype="datetime64[us]")
+        np.fmax.at(last, inverse, archived["submitted_at"])
+        for i, question_id in enumerate(questions.tolist()):
+            if question_id not in question_chapter:
+                continue
+            row = totals.setdefault(
+                question_id,
+                {
+                    "question_id": question_id,
+                    "chapter_id": question_chapter[question_id],
+                    "attempts": 0,
+                    "correct": 0,
+                    "timed_attempts": 0,
+                    "total_time_seconds": 0,
+                    "last_submission_at": None,
+                },
+            )
+            row["attempts"] += int(attempts[i])
+            row["correct"] += int(correct[i])
+            row["timed_attempts"] += int(timed_attempts[i])
+            row["total_time_seconds"] += int(total_time[i])
+            row["last_submission_at"] = max(filter(None, (row["last_submission_at"], last[i].item())), default=None)
+
+    if totals:
+        stmt = insert(QuestionStats.__table__)
+        table = QuestionStats.__table__
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["question_id"],
+                set_={
+                    "attempts": table.c.attempts + stmt.excluded.attempts,
+                    "correct": table.c.correct + stmt.excluded.correct,
+                    "timed_attempts": table.c.timed_attempts + stmt.excluded.timed_attempts,
+                    "total_time_seconds": table.c.total_time_seconds + stmt.excluded.total_time_seconds,
+                    "last_submission_at": stmt.excluded.last_submission_at,
+                },
+            ),
+            list(totals.values()),
+        )
+    return {row["chapter_id"] for row in totals.values()}
+
+
+def refresh_aggregates(db: Session, rebuild: bool = False) -> dict:
+    """Fold new submissions into question_stats / chapter_stats. Returns what was refreshed."""
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:job))"), {"job": JOB_NAME})
+    now = db.execute(text("SELECT LOCALTIMESTAMP")).scalar()
+    until = now - timedelta(seconds=AGGREGATE_REFRESH_LAG)
+    since = None if rebuild else get_watermark(db, JOB_NAME)
+
+    changed = set()
+    if since is None:
+        db.execute(text("TRUNCATE question_stats, chapter_stats"))
+        changed |= _fold_archive(db)
+        since_clause, params = "", {"until": until}
+        changed |= set(db.execute(select(Question.chapter_id).distinct()).scalars().all())
+    else:
+        since_clause, params = "AND s.received_at >= :since", {"until": until, "since": since}
+
+    changed |= set(db.execute(text(_FOLD_SUBMISSIONS.format(since_clause=since_clause)), params).scalars().all())
+    if changed:
+        db.execute(text(_ROLL_UP_CHAPTERS), {"chapter_ids": sorted(changed)})
+    set_watermark(db, JOB_NAME, until)
+    db.commit()
+    logger.info(f"Aggregates refreshed up to {until} for {len(changed)} chapters (since={since})")
+    return {"since": since, "until": until, "chapters": sorted(changed)}
+
+
+def aggregates_as_of(db: Session) -> Optional[datetime]:
+    """Submissions received before this are covered by the aggregates; None before the first refresh."""
+    return get_watermark(db, JOB_NAME)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.services import db_session
+
+    parser = argparse.ArgumentParser(description="Refresh chapter and question aggregates")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from scratch, including the archive")
+    args = parser.parse_args()
+    with db_session() as db:
+        result = refresh_aggregates(db, rebuild=args.rebuild)
+        print(f"refreshed {len(result['chapters'])} chapters up to {result['until']}")
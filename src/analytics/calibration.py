@@ -0,0 +1,192 @@
+"""Empirical question difficulty and discrimination from quiz_submissions.
+
+For every question with submissions received since the previous run the job
+re-aggregates its full submission history and writes back:
+
+* p_value: share of correct answers (classical item difficulty)
+* irt_discrimination: point-biserial correlation between answering the item
+  correctly and the student's overall accuracy, mapped to the logistic IRT
+  `a` parameter (1.702 * r / sqrt(1 - r^2))
+* irt_difficulty: logit of the error rate, the Rasch-style `b` parameter
+* difficulty_level: easy / medium / hard from p_value, once a question has
+  MIN_RESPONSES answers
+
+Student accuracy comes from student_progress, so the job never scans a
+student's whole history. Submissions are read through
+idx_submissions_question in chunks and folded into additive sufficient
+statistics with NumPy, so memory stays bounded by the number of questions.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, any_, bindparam, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from src.core.configurations import logger
+from src.core.constants import CALIBRATION_LAG
+from src.database.archive import scan_archive
+from src.database.partitions import submitted_at_bounds
+from src.database.repository import Question, QuizSubmission, StudentProgress
+from src.database.services import database_key, db_session
+from src.database.watermarks import get_watermark, set_watermark
+
+JOB_NAME = "question_calibration"
+QUESTIONS_PER_QUERY = 1_000
+STREAM_CHUNK_ROWS = 100_000
+MIN_RESPONSES = 30
+EASY_P_VALUE = 0.7
+HARD_P_VALUE = 0.4
+MAX_DISCRIMINATION = 4.0
+MAX_DIFFICULTY = 4.0
+
+
+def _student_accuracy(db: Session):
+    """Sorted student ids and their overall accuracy, from student_progress."""
+    rows = db.execute(
+        select(
+            StudentProgress.student_id,
+            func.sum(StudentProgress.questions_correct),
+            func.sum(StudentProgress.questions_completed),
+        ).group_by(StudentProgress.student_id).order_by(StudentProgress.student_id)
+    ).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ids, correct, completed = (np.array(col, dtype=np.float64) for col in zip(*rows))
+    return ids.astype(np.int64), np.divide(correct, completed, out=np.zeros_like(correct), where=completed > 0)
+
+
+def _changed_questions(db: Session, since, until) -> list:
+    """Questions with submissions received in [since, until); edge uploads arrive with old submitted_at."""
+    query = (
+        select(QuizSubmission.question_id)
+        .distinct()
+        .where(*submitted_at_bounds(QuizSubmission.received_at, since, until))
+    )
+    return sorted(db.execute(query).scalars().all())
+
+
+def _current_levels(db: Session, question_ids: list) -> dict:
+    levels = {}
+    for start in range(0, len(question_ids), QUESTIONS_PER_QUERY):
+        batch = question_ids[start:start + QUESTIONS_PER_QUERY]
+        stmt = select(Question.id, Question.difficulty_level).where(
+            Question.id == any_(bindparam("question_ids", batch, type_=ARRAY(Integer)))
+        )
+        levels.update(db.execute(stmt).all())
+    return levels
+
+
+def _lookup_accuracy(student_ids, accuracy, students) -> np.ndarray:
+    """Accuracy per submitting student; students without progress get the mean."""
+    if len(student_ids) == 0:
+        return np.zeros(len(students))
+    pos = np.minimum(np.searchsorted(student_ids, students), len(student_ids) - 1)
+    return np.where(student_ids[pos] == students, accuracy[pos], accuracy.mean())
+
+
+def _accumulate(db: Session, question_ids: list, student_ids, accuracy) -> np.ndarray:
+    """Per question: [n, sum correct, sum ability, sum ability^2, sum ability*correct].
+
+    Covers hot rows and the cold archive, so archiving does not change results.
+    """
+    question_index = np.asarray(question_ids, dtype=np.int64)
+    stats = np.zeros((len(question_ids), 5), dtype=np.float64)
+
+    def fold(questions, students, correct):
+        q = np.searchsorted(question_index, np.asarray(questions, dtype=np.int64))
+        ability = _lookup_accuracy(student_ids, accuracy, np.asarray(students, dtype=np.int64))
+        y = np.asarray(correct, dtype=np.float64)
+        for column, values in enumerate((np.ones_like(y), y, ability, ability * ability, ability * y)):
+            stats[:, column] += np.bincount(q, weights=values, minlength=len(question_ids))
+
+    for start in range(0, len(question_ids), QUESTIONS_PER_QUERY):
+        batch = question_ids[start:start + QUESTIONS_PER_QUERY]
+        stmt = (
+            select(QuizSubmission.question_id, QuizSubmission.student_id, QuizSubmission.is_correct)
+            .where(QuizSubmission.question_id == any_(bindparam("question_ids", batch, type_=ARRAY(Integer))))
+            .execution_options(stream_results=True, yield_per=STREAM_CHUNK_ROWS)
+        )
+        for rows in db.execute(stmt).partitions():
+            fold(*zip(*rows))
+
+    for archived in scan_archive(
+        question_ids=question_ids,
+        columns=["question_id", "student_id", "is_correct"],
+        database=database_key(db.get_bind()),
+    ):
+        fold(archived["question_id"], archived["student_id"], archived["is_correct"])
+    return stats
+
+
+def calibrate(stats: np.ndarray) -> dict:
+    """Turn sufficient statistics into item parameters (one entry per row)."""
+    n, sum_y, sum_x, sum_xx, sum_xy = stats.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = np.where(n > 0, sum_y / n, np.nan)
+        cov = n * sum_xy - sum_x * sum_y
+        var = (n * sum_xx - sum_x ** 2) * (n * sum_y - sum_y ** 2)
+        r = np.where(var > 0, cov / np.sqrt(var), 0.0)
+        r = np.clip(r, -0.99, 0.99)
+        a = np.clip(1.702 * r / np.sqrt(1 - r ** 2), 0.0, MAX_DISCRIMINATION)
+        p_clipped = np.clip(p, 0.01, 0.99)
+        b = np.clip(np.log((1 - p_clipped) / p_clipped), -MAX_DIFFICULTY, MAX_DIFFICULTY)
+    level = np.where(p >= EASY_P_VALUE, "easy", np.where(p >= HARD_P_VALUE, "medium", "hard"))
+    return {"n": n.astype(np.int64), "p": p, "a": a, "b": b, "level": level}
+
+
+def run_calibration(db: Session, full: bool = False) -> int:
+    """Calibrate questions with submissions since the last run. Returns questions updated."""
+    # received_at is the inserting transaction's start time, so a submission
+    # committed after this run started can carry an older one; stopping
+    # CALIBRATION_LAG short leaves it for the next run
+    until = db.execute(text("SELECT LOCALTIMESTAMP")).scalar() - timedelta(seconds=CALIBRATION_LAG)
+    since = None if full else get_watermark(db, JOB_NAME)
+    question_ids = _changed_questions(db, since, until)
+    if not question_ids:
+        set_watermark(db, JOB_NAME, until)
+        db.commit()
+        return 0
+
+    student_ids, accuracy = _student_accuracy(db)
+    params = calibrate(_accumulate(db, question_ids, student_ids, accuracy))
+
+    levels = _current_levels(db, question_ids)
+    calibrated_at = datetime.utcnow()
+    rows = []
+    for i, question_id in enumerate(question_ids):
+        row = {
+            "id": question_id,
+            "response_count": int(params["n"][i]),
+            "p_value": round(float(params["p"][i]), 4),
+            "irt_difficulty": float(params["b"][i]),
+            "irt_discrimination": float(params["a"][i]),
+            "calibrated_at": calibrated_at,
+        }
+        level = str(params["level"][i])
+        if params["n"][i] >= MIN_RESPONSES and level != levels.get(question_id):
+            row["difficulty_level"] = level
+        rows.append(row)
+
+    # ORM bulk UPDATE by primary key; rows with and without difficulty_level
+    # are sent as separate executemany batches. difficulty_level is content
+    # served to clients, so it is only set where it changed: setting it fires
+    # the curriculum version trigger, the other columns do not.
+    for with_level in (True, False):
+        batch = [row for row in rows if ("difficulty_level" in row) is with_level]
+        if batch:
+            db.execute(update(Question), batch)
+    set_watermark(db, JOB_NAME, until)
+    db.commit()
+    logger.info(f"Calibrated {len(rows)} questions (since={since})")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate question difficulty from submissions")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and recalibrate every question")
+    args = parser.parse_args()
+    with db_session() as db:
+        print(f"calibrated {run_calibration(db, full=args.full)} questions")
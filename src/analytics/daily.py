@@ -0,0 +1,156 @@
+"""daily_analytics: per student and day totals, rolled up from quiz_submissions.
+
+The parent dashboard and the analytics timeseries read these rows. Each
+refresh finds the (student, day) pairs with submissions received in
+[watermark, now - AGGREGATE_REFRESH_LAG) and recomputes those days in full
+from quiz_submissions, so a day is always exact however its answers
+arrived (HTTP, live sessions, late edge node uploads) and a window read
+twice changes nothing. The watermark moves in the same transaction.
+Streaks -- consecutive active days ending at a row -- are then recomputed
+for the students touched, which also covers a late upload filling a gap.
+
+A day in a month already moved to the cold archive has its archived
+answers added back from the archive. Edge nodes do not run the rollup;
+their answers are rolled up centrally once pushed.
+"""
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.analytics.parent_dashboard import clear_parent_dashboards, invalidate_parent_dashboards
+from src.core.configurations import logger
+from src.core.constants import AGGREGATE_REFRESH_LAG
+from src.database.archive import NULL_TIME_TAKEN, archived_months, scan_archive
+from src.database.partitions import month_floor
+from src.database.services import database_key
+from src.database.watermarks import get_watermark, set_watermark
+
+JOB_NAME = "daily_analytics"
+
+_ROLL_UP_DAYS = """
+    WITH touched AS (
+        SELECT DISTINCT student_id, submitted_at::date AS day
+        FROM quiz_submissions
+        WHERE received_at < :until {since_clause}
+    )
+    INSERT INTO daily_analytics AS d (
+        student_id, analytics_date, questions_answered, questions_correct, xp_earned, time_spent_minutes, school_id
+    )
+    SELECT t.student_id, t.day, count(*), count(*) FILTER (WHERE s.is_correct), sum(s.xp_earned),
+           ceil(coalesce(sum(s.time_taken_seconds), 0) / 60.0), min(s.school_id)
+    FROM touched t
+    JOIN quiz_submissions s
+      ON s.student_id = t.student_id AND s.submitted_at >= t.day AND s.submitted_at < t.day + 1
+    GROUP BY t.student_id, t.day
+    ON CONFLICT (student_id, analytics_date) DO UPDATE SET
+        questions_answered = EXCLUDED.questions_answered,
+        questions_correct = EXCLUDED.questions_correct,
+        xp_earned = EXCLUDED.xp_earned,
+        time_spent_minutes = EXCLUDED.time_spent_minutes,
+        school_id = EXCLUDED.school_id
+    RETURNING d.student_id, d.analytics_date
+"""
+
+_ADD_ARCHIVED = """
+    UPDATE daily_analytics SET
+        questions_answered = questions_answered + :answered,
+        questions_correct = questions_correct + :correct,
+        xp_earned = xp_earned + :xp,
+        time_spent_minutes = time_spent_minutes + :minutes
+    WHERE student_id = :student_id AND analytics_date = :day
+"""
+
+# gaps and islands: within a run of consecutive days, date - row_number() is constant
+_STREAKS = """
+    UPDATE daily_analytics d SET streak_count = r.streak
+    FROM (
+        SELECT id, row_number() OVER (PARTITION BY student_id, island ORDER BY analytics_date) AS streak
+        FROM (
+            SELECT id, student_id, analytics_date,
+                   analytics_date - (row_number() OVER (PARTITION BY student_id ORDER BY analytics_date))::int AS island
+            FROM daily_analytics
+            WHERE student_id = ANY(:student_ids)
+        ) days
+    ) r
+    WHERE d.id = r.id AND d.streak_count <> r.streak
+"""
+
+
+def _add_archived(db: Session, touched: set) -> None:
+    """Add archived answers to touched days whose month is in the archive (late edge uploads)."""
+    archived = set(archived_months(database_key(db.get_bind())))
+    late = {(student_id, day) for student_id, day in touched if month_floor(day) in archived}
+    if not late:
+        return
+    totals = {}
+    days = [day for _, day in late]
+    for part in scan_archive(
+        min(days),
+        max(days) + timedelta(days=1),
+        student_ids={student_id for student_id, _ in late},
+        columns=["student_id", "submitted_at", "is_correct", "xp_earned", "time_taken_seconds"],
+        database=database_key(db.get_bind()),
+    ):
+        seconds = np.where(part["time_taken_seconds"] == NULL_TIME_TAKEN, 0, part["time_taken_seconds"])
+        answered_on = part["submitted_at"].astype("datetime64[D]").tolist()
+        for student_id, day, correct, xp, taken in zip(
+            part["student_id"].tolist(), answered_on, part["is_correct"].tolist(), part["xp_earned"].tolist(),
+            seconds.tolist(),
+        ):
+            if (student_id, day) in late:
+                row = totals.setdefault((student_id, day), [0, 0, 0, 0])
+                row[0] += 1
+                row[1] += correct
+                row[2] += xp
+                row[3] += taken
+    if totals:
+        db.execute(
+            text(_ADD_ARCHIVED),
+            [
+                {"student_id": student_id, "day": day, "answered": a, "correct": c, "xp": x, "minutes": -(-s // 60)}
+                for (student_id, day), (a, c, x, s) in totals.items()
+            ],
+        )
+
+
+def refresh_daily_analytics(db: Session, rebuild: bool = False) -> dict:
+    """Recompute the days that received submissions since the last refresh. Returns what was refreshed."""
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:job))"), {"job": JOB_NAME})
+    now = db.execute(text("SELECT LOCALTIMESTAMP")).scalar()
+    until = now - timedelta(seconds=AGGREGATE_REFRESH_LAG)
+    since = None if rebuild else get_watermark(db, JOB_NAME)
+    if since is None:
+        since_clause, params = "", {"until": until}
+    else:
+        since_clause, params = "AND received_at >= :since", {"until": until, "since": since}
+
+    touched = set(db.execute(text(_ROLL_UP_DAYS.format(since_clause=since_clause)), params).tuples().all())
+    _add_archived(db, touched)
+    students = sorted({student_id for student_id, _ in touched})
+    if students:
+        db.execute(text(_STREAKS), {"student_ids": students})
+    set_watermark(db, JOB_NAME, until)
+    db.commit()
+
+    # this worker's cached dashboards; other workers' expire with the TTL
+    if since is None:
+        clear_parent_dashboards()
+    else:
+        invalidate_parent_dashboards(database_key(db.get_bind()), students)
+    logger.info(f"Daily analytics refreshed up to {until}: {len(touched)} days of {len(students)} students")
+    return {"since": since, "until": until, "days": len(touched), "students": len(students)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.services import db_session
+
+    parser = argparse.ArgumentParser(description="Roll quiz_submissions up into daily_analytics")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every day with submissions")
+    args = parser.parse_args()
+    with db_session() as db:
+        result = refresh_daily_analytics(db, rebuild=args.rebuild)
+        print(f"refreshed {result['days']} days of {result['students']} students up to {result['until']}")
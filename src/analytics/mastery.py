@@ -0,0 +1,381 @@
+"""Bayesian Knowledge Tracing (BKT) mastery over quiz submissions.
+
+Every (student, chapter) pair is one knowledge component. Each answer updates
+P(mastered) with the standard BKT posterior followed by a learning
+transition; `student_progress.mastery_score` stores that probability as a
+percentage.
+
+Two entry points share the same update rule (`bkt_step`):
+
+* `update_mastery` applies one new answer to a stored progress row (online);
+  `update_mastery_many` applies a whole answer sheet with one row lookup.
+* `recompute_mastery` replays every submission, hot and archived, as a
+  vectorized NumPy batch and bulk-upserts the result (full recompute).
+  Online answer writes wait while it runs.
+
+Only a student's first answer to a question counts. The online paths hold
+the progress row lock (`lock_progress`, `lock_progress_many`) while they
+check `answered_pairs` and insert, so the first recorded submission (the
+lowest id) is the one that counted; the batch path keeps exactly that one.
+"""
+import time
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.analytics.parent_dashboard import clear_parent_dashboards, invalidate_parent_dashboard
+from src.background.outbox import PENDING
+from src.core.configurations import logger
+from src.database.archive import scan_archive
+from src.database.dialects import in_values, insert_or_ignore
+from src.database.partitions import submitted_at_bounds
+from src.database.repository import OutboxEvent, Question, QuizSubmission, StudentProgress
+from src.database.services import database_key
+
+STREAM_CHUNK_ROWS = 100_000
+UPSERT_CHUNK_ROWS = 10_000
+
+
+class BKTParams(NamedTuple):
+    p_init: float = 0.2  # P(L0): mastered before the first answer
+    p_transit: float = 0.1  # P(T): learns after an opportunity
+    p_slip: float = 0.1  # P(S): wrong answer although mastered
+    p_guess: float = 0.25  # P(G): right answer although not mastered (4 options)
+
+
+DEFAULT_PARAMS = BKTParams()
+
+
+def bkt_step(p_mastered, is_correct, params: BKTParams = DEFAULT_PARAMS):
+    """One BKT update. Works element-wise on NumPy arrays as well as on floats."""
+    p_mastered = np.asarray(p_mastered, dtype=np.float64)
+    is_correct = np.asarray(is_correct, dtype=bool)
+    correct_num = p_mastered * (1 - params.p_slip)
+    correct_den = correct_num + (1 - p_mastered) * params.p_guess
+    wrong_num = p_mastered * params.p_slip
+    wrong_den = wrong_num + (1 - p_mastered) * (1 - params.p_guess)
+    posterior = np.where(is_correct, correct_num / correct_den, wrong_num / wrong_den)
+    return posterior + (1 - posterior) * params.p_transit
+
+
+def to_score(p_mastered) -> np.ndarray:
+    """Probability -> mastery_score percentage, rounded like Numeric(5, 2)."""
+    return np.round(np.asarray(p_mastered, dtype=np.float64) * 100, 2)
+
+
+def from_score(score) -> float:
+    return float(score) / 100
+
+
+def bkt_batch(group, order_key, is_correct, n_groups: int, params: BKTParams = DEFAULT_PARAMS):
+    """Replay all answers of every group in order.
+
+    group:     int array, group index (0..n_groups-1) of each answer
+    order_key: sortable array giving the answer order inside a group
+    is_correct: bool array
+
+    Returns the final P(mastered) per group. Answers are bucketed by their
+    position inside their group, so step k updates the k-th answer of every
+    group at once: the Python loop runs max(group length) times, not once per
+    answer.
+    """
+    p = np.full(n_groups, params.p_init, dtype=np.float64)
+    if len(group) == 0:
+        return p
+
+    order = np.lexsort((order_key, group))
+    sorted_group = group[order]
+    sorted_correct = is_correct[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+    lengths = np.diff(np.r_[starts, len(sorted_group)])
+    position = np.arange(len(sorted_group)) - np.repeat(starts, lengths)
+
+    by_position = np.argsort(position, kind="stable")
+    step_sizes = np.bincount(position)
+    offset = 0
+    for size in step_sizes:
+        idx = by_position[offset:offset + size]
+        offset += size
+        g = sorted_group[idx]
+        p[g] = bkt_step(p[g], sorted_correct[idx], params)
+    return p
+
+
+def _question_chapters(db: Session):
+    """Sorted question ids, the chapter code of each, and the chapter id of each code."""
+    rows = db.execute(select(Question.id, Question.chapter_id).order_by(Question.id)).all()
+    chapter_codes = {}
+    question_ids = np.array([row.id for row in rows], dtype=np.int64)
+    question_chapter = np.array(
+        [chapter_codes.setdefault(row.chapter_id, len(chapter_codes)) for row in rows], dtype=np.int32
+    )
+    return question_ids, question_chapter, np.array(list(chapter_codes), dtype=object)
+
+
+def load_submissions(
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archive: bool = True,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+) -> dict:
+    """Stream submissions in [since, until) into column arrays, tagged with their chapter.
+
+    Bounds are applied on submitted_at so only the matching monthly
+    partitions are scanned. Archived months are read from the cold archive
+    unless `include_archive` is False. Submissions whose question no longer
+    exists are dropped.
+    """
+    names = ("id", "student_id", "question_id", "is_correct", "submitted_at")
+    dtypes = (np.int64, np.int64, np.int64, bool, "datetime64[us]")
+    parts = {name: [] for name in names}
+
+    stmt = (
+        select(*(getattr(QuizSubmission, name) for name in names))
+        .where(*submitted_at_bounds(QuizSubmission.submitted_at, since, until))
+        .execution_options(stream_results=True, yield_per=chunk_rows)
+    )
+    for rows in db.execute(stmt).partitions():
+        for name, dtype, values in zip(names, dtypes, zip(*rows)):
+            parts[name].append(np.array(values, dtype=dtype))
+    if include_archive:
+        for archived in scan_archive(since, until, columns=names, database=database_key(db.get_bind())):
+            for name in names:
+                parts[name].append(archived[name])
+
+    arrays = {
+        name: np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+        for name, dtype in zip(names, dtypes)
+    }
+
+    question_ids, question_chapter, chapter_ids = _question_chapters(db)
+    position = np.minimum(np.searchsorted(question_ids, arrays["question_id"]), max(len(question_ids) - 1, 0))
+    known = question_ids[position] == arrays["question_id"] if len(question_ids) else np.zeros(len(position), bool)
+    arrays = {name: values[known] for name, values in arrays.items()}
+    arrays["chapter"] = question_chapter[position[known]]
+    arrays["chapter_ids"] = chapter_ids
+    return arrays
+
+
+def first_attempts(columns: dict) -> dict:
+    """Keep each student's first recorded submission (lowest id) per question, as the online paths count."""
+    order = np.lexsort((columns["id"], columns["question_id"], columns["student_id"]))
+    student_ids = columns["student_id"][order]
+    question_ids = columns["question_id"][order]
+    first = np.r_[True, (student_ids[1:] != student_ids[:-1]) | (question_ids[1:] != question_ids[:-1])]
+    keep = np.sort(order[first])
+    return {name: values if name == "chapter_ids" else values[keep] for name, values in columns.items()}
+
+
+def compute_progress(columns: dict, params: BKTParams = DEFAULT_PARAMS) -> list:
+    """Aggregate submission columns into student_progress rows, counting first attempts only."""
+    if len(columns["id"]) == 0:
+        return []
+    columns = first_attempts(columns)
+    n_chapters = len(columns["chapter_ids"])
+    pair_key = columns["student_id"].astype(np.int64) * n_chapters + columns["chapter"]
+    keys, group = np.unique(pair_key, return_inverse=True)
+    group = group.ravel()
+    n_groups = len(keys)
+    key_students, key_chapters = np.divmod(keys, n_chapters)
+
+    # order answers by time, breaking ties by submission id
+    order_key = np.lexsort((columns["id"], columns["submitted_at"]))
+    rank = np.empty_like(order_key)
+    rank[order_key] = np.arange(len(order_key))
+
+    p = bkt_batch(group, rank, columns["is_correct"], n_groups, params)
+    completed = np.bincount(group, minlength=n_groups)
+    correct = np.bincount(group, weights=columns["is_correct"].astype(np.float64), minlength=n_groups)
+    # fmax skips NaT (submitted_at is nullable), maximum would propagate it
+    last_answered = np.full(n_groups, np.datetime64("NaT"), dtype="datetime64[us]")
+    np.fmax.at(last_answered, group, columns["submitted_at"])
+
+    return [
+        {
+            "student_id": student_id,
+            "chapter_id": chapter_id,
+            "mastery_score": score,
+            "questions_completed": n_completed,
+            "questions_correct": n_correct,
+            "last_answered_at": answered_at,
+        }
+        for student_id, chapter_id, score, n_completed, n_correct, answered_at in zip(
+            key_students.tolist(),
+            columns["chapter_ids"][key_chapters].tolist(),
+            to_score(p).tolist(),
+            completed.tolist(),
+            correct.astype(np.int64).tolist(),
+            last_answered.tolist(),
+        )
+    ]
+
+
+def upsert_progress(db: Session, rows: list, chunk_rows: int = UPSERT_CHUNK_ROWS) -> None:
+    stmt = insert(StudentProgress.__table__)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_student_chapter",
+        set_={
+            "mastery_score": stmt.excluded.mastery_score,
+            "questions_completed": stmt.excluded.questions_completed,
+            "questions_correct": stmt.excluded.questions_correct,
+            "last_answered_at": stmt.excluded.last_answered_at,
+        },
+    )
+    for start in range(0, len(rows), chunk_rows):
+        db.execute(stmt, rows[start:start + chunk_rows])
+
+
+class MasteryUpdatesPending(Exception):
+    pass
+
+
+def recompute_mastery(db: Session, params: BKTParams = DEFAULT_PARAMS) -> int:
+    """Full recompute of student_progress from quiz_submissions. Returns rows written.
+
+    student_progress is locked in EXCLUSIVE mode (reads go on) before the
+    submissions are read, and every online write locks its progress rows
+    before inserting, so the replay sees every committed answer and no
+    answer can commit until the result has. Answers whose `mastery.update`
+    events are still queued would be counted twice, here and again by the
+    outbox worker, so the recompute refuses to start while any are pending
+    (MasteryUpdatesPending); retry once the outbox has drained.
+    """
+    # handlers imports this module
+    from src.background.handlers import MASTERY_UPDATE
+
+    started = time.perf_counter()
+    db.execute(text("LOCK TABLE student_progress IN EXCLUSIVE MODE"))
+    pending = db.execute(
+        select(func.count()).where(OutboxEvent.topic == MASTERY_UPDATE, OutboxEvent.status == PENDING)
+    ).scalar()
+    if pending:
+        db.rollback()
+        raise MasteryUpdatesPending(f"{pending} {MASTERY_UPDATE} events are still queued")
+    columns = load_submissions(db)
+    loaded = time.perf_counter()
+    rows = compute_progress(columns, params)
+    computed = time.perf_counter()
+    upsert_progress(db, rows)
+    db.commit()
+    clear_parent_dashboards()
+    logger.info(
+        f"Mastery recompute: {len(columns['id'])} submissions -> {len(rows)} progress rows "
+        f"(load {loaded - started:.1f}s, compute {computed - loaded:.1f}s, "
+        f"write {time.perf_counter() - computed:.1f}s)"
+    )
+    return len(rows)
+
+
+def update_mastery(
+    db: Session,
+    student_id: int,
+    chapter_id: str,
+    is_correct: bool,
+    answered_at: Optional[datetime] = None,
+    params: BKTParams = DEFAULT_PARAMS,
+) -> StudentProgress:
+    """Apply one new answer to the student's progress row. The caller commits."""
+    return update_mastery_many(db, student_id, chapter_id, [is_correct], answered_at, params)
+
+
+def lock_progress(db: Session, student_id: int, chapter_id: str) -> StudentProgress:
+    """The student's progress row for the chapter, locked until the caller commits.
+
+    The row is created first if missing, so that the lock always has a row
+    to hold: two first answers for the same chapter then serialize instead
+    of both inserting and one failing on uq_student_chapter.
+    """
+    db.execute(
+        insert_or_ignore(StudentProgress).values(
+            student_id=student_id, chapter_id=chapter_id, questions_completed=0, questions_correct=0
+        )
+    )
+    return (
+        db.query(StudentProgress)
+        .filter(StudentProgress.student_id == student_id, StudentProgress.chapter_id == chapter_id)
+        .with_for_update()
+        .one()
+    )
+
+
+def lock_progress_many(db: Session, keys: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], StudentProgress]:
+    """`lock_progress` for many (student_id, chapter_id) pairs with two statements.
+
+    Rows are locked in key order, so two callers with overlapping keys
+    cannot deadlock.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return {}
+    db.execute(
+        insert_or_ignore(StudentProgress).values(
+            [
+                {"student_id": student_id, "chapter_id": chapter_id, "questions_completed": 0, "questions_correct": 0}
+                for student_id, chapter_id in keys
+            ]
+        )
+    )
+    rows = (
+        db.query(StudentProgress)
+        .filter(tuple_(StudentProgress.student_id, StudentProgress.chapter_id).in_(keys))
+        .order_by(StudentProgress.student_id, StudentProgress.chapter_id)
+        .with_for_update()
+        .all()
+    )
+    return {(row.student_id, row.chapter_id): row for row in rows}
+
+
+def answered_pairs(db: Session, pairs: Iterable[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+    """The (student_id, question_id) pairs among `pairs` that already have a submission.
+
+    Call it with the pairs' progress rows locked, before inserting the new
+    submissions, so that concurrent answers to the same question cannot
+    both be first.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    student_ids = sorted({student_id for student_id, _ in pairs})
+    question_ids = sorted({question_id for _, question_id in pairs})
+    query = db.query(QuizSubmission.student_id, QuizSubmission.question_id).filter(
+        in_values(QuizSubmission.student_id, "student_ids", student_ids, Integer),
+        in_values(QuizSubmission.question_id, "question_ids", question_ids, Integer),
+    )
+    return {(student_id, question_id) for student_id, question_id in query.distinct()} & pairs
+
+
+def apply_answers(
+    db: Session,
+    progress: StudentProgress,
+    answers: Sequence[bool],
+    answered_at: Optional[datetime] = None,
+    params: BKTParams = DEFAULT_PARAMS,
+) -> StudentProgress:
+    """Apply answers in order (is_correct each) to a row from `lock_progress`. The caller commits."""
+    p_mastered = from_score(progress.mastery_score) if progress.questions_completed else params.p_init
+    for is_correct in answers:
+        p_mastered = bkt_step(p_mastered, is_correct, params)
+    progress.mastery_score = float(to_score(p_mastered))
+    progress.questions_completed += len(answers)
+    progress.questions_correct += sum(bool(is_correct) for is_correct in answers)
+    progress.last_answered_at = answered_at or datetime.utcnow()
+    invalidate_parent_dashboard(progress.student_id, db)
+    return progress
+
+
+def update_mastery_many(
+    db: Session,
+    student_id: int,
+    chapter_id: str,
+    answers: Sequence[bool],
+    answered_at: Optional[datetime] = None,
+    params: BKTParams = DEFAULT_PARAMS,
+) -> StudentProgress:
+    """Apply several answers in order (is_correct each) with one lookup of the progress row. The caller commits."""
+    return apply_answers(db, lock_progress(db, student_id, chapter_id), answers, answered_at, params)
@@ -0,0 +1,130 @@
+"""Parent dashboard: a student's chapter progress, daily activity and recent XP.
+
+Built from two indexed queries however many chapters there are -- chapters
+outer-joined to the student's student_progress rows, and the student's last
+PARENT_DASHBOARD_DAYS rows of daily_analytics -- and cached per student
+(and database: schools with a database of their own reuse student ids).
+Code that records new answers calls `invalidate_parent_dashboard`, so a
+parent sees a submission's progress on their next load; its daily rows
+follow once the periodic rollup (src/analytics/daily.py) has folded it in,
+which drops the dashboards it changed. The TTL bounds staleness for writes
+made by other worker processes.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, event
+from sqlalchemy.orm import Session
+
+from src.common.single_flight import single_flight
+from src.common.ttl_cache import TTLCache
+from src.core.constants import PARENT_DASHBOARD_CACHE_SIZE, PARENT_DASHBOARD_DAYS, PARENT_DASHBOARD_TTL
+from src.database.repository import Chapter, DailyAnalytics, StudentProgress
+from src.database.services import READ, database_key, db_session
+
+_cache = TTLCache("parent_dashboard", PARENT_DASHBOARD_TTL, PARENT_DASHBOARD_CACHE_SIZE)
+
+
+def load_parent_dashboard(db: Session, student_id: int, today: Optional[date] = None) -> dict:
+    today = today or date.today()
+    first_day = today - timedelta(days=PARENT_DASHBOARD_DAYS - 1)
+
+    chapters = (
+        db.query(
+            Chapter.id,
+            Chapter.name,
+            Chapter.order,
+            StudentProgress.mastery_score,
+            StudentProgress.questions_completed,
+            StudentProgress.questions_correct,
+            StudentProgress.last_answered_at,
+        )
+        .outerjoin(
+            StudentProgress,
+            and_(StudentProgress.chapter_id == Chapter.id, StudentProgress.student_id == student_id),
+        )
+        .order_by(Chapter.order, Chapter.id)
+        .all()
+    )
+    days = (
+        db.query(DailyAnalytics)
+        .filter(DailyAnalytics.student_id == student_id, DailyAnalytics.analytics_date >= first_day)
+        .order_by(DailyAnalytics.analytics_date)
+        .all()
+    )
+
+    week_start = today - timedelta(days=6)
+    latest = days[-1] if days else None
+    streak = latest.streak_count if latest and latest.analytics_date >= today - timedelta(days=1) else 0
+    return {
+        "student_id": student_id,
+        "chapters": [
+            {
+                "chapter_id": row.id,
+                "name": row.name,
+                "order": row.order,
+                "started": row.questions_completed is not None,
+                "mastery_score": float(row.mastery_score) if row.mastery_score is not None else 0.0,
+                "questions_completed": row.questions_completed or 0,
+                "questions_correct": row.questions_correct or 0,
+                "last_answered_at": row.last_answered_at.isoformat() if row.last_answered_at else None,
+            }
+            for row in chapters
+        ],
+        "daily": [
+            {
+                "date": day.analytics_date.isoformat(),
+                "questions_answered": day.questions_answered,
+                "questions_correct": day.questions_correct,
+                "xp_earned": day.xp_earned,
+                "time_spent_minutes": day.time_spent_minutes,
+            }
+            for day in days
+        ],
+        "recent_xp": {
+            "today": sum(day.xp_earned for day in days if day.analytics_date == today),
+            "last_7_days": sum(day.xp_earned for day in days if day.analytics_date >= week_start),
+            f"last_{PARENT_DASHBOARD_DAYS}_days": sum(day.xp_earned for day in days),
+        },
+        "streak": streak,
+    }
+
+
+@single_flight("parent_dashboard", key=lambda student_id, db=None: (database_key(), student_id))
+def _load(student_id: int, db: Optional[Session] = None) -> dict:
+    loaded_at = _cache.now()
+    key = (database_key(), student_id)
+    if db is not None:
+        dashboard = load_parent_dashboard(db, student_id)
+    else:
+        with db_session(READ) as db:
+            dashboard = load_parent_dashboard(db, student_id)
+    _cache.set(key, dashboard, loaded_at=loaded_at)
+    return dashboard
+
+
+def get_parent_dashboard(student_id: int, db: Optional[Session] = None) -> dict:
+    """Cached dashboard; on a miss it is loaded with `db` (e.g. the request's session) if given."""
+    dashboard = _cache.get((database_key(), student_id))
+    if dashboard is None:
+        dashboard = _load(student_id, db=db)
+    return dashboard
+
+
+def invalidate_parent_dashboard(student_id: int, db: Optional[Session] = None) -> None:
+    """Drop the cached dashboard; with `db`, once that session commits."""
+    key = (database_key(), student_id)
+    if db is None:
+        _cache.invalidate(key)
+    else:
+        event.listen(db, "after_commit", lambda session: _cache.invalidate(key), once=True)
+
+
+def invalidate_parent_dashboards(database: str, student_ids) -> None:
+    """Drop the cached dashboards of `student_ids` in `database` (a `database_key`)."""
+    for student_id in student_ids:
+        _cache.invalidate((database, student_id))
+
+
+def clear_parent_dashboards() -> None:
+    _cache.clear()
@@ -4,9 +4,11 @@ from typing import Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 import hashlib
 
+from src.database.fast_queries import student_for_token
 from src.database.repository import Student
 from src.database.services import db_session
 
@@ -40,13 +42,24 @@ def create_student_token(student: Student) -> str:
         "student_id": student.id,
         "email": student.email,
         "Class": student.standard,
+        "school_id": student.school_id,
         "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def verify_student_token(token: str, db: Session) -> Student:
-    """Verify JWT token and return Student object"""
+def school_from_token(token: str) -> Optional[int]:
+    """The school_id claim of a valid token, without touching the database; None otherwise."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    school_id = payload.get("school_id")
+    return school_id if isinstance(school_id, int) else None
+
+
+def verify_student_token(token: str, db: Session) -> Row:
+    """Verify JWT token and return the student's columns (without password_hash) as a read-only row"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
@@ -65,13 +78,11 @@ def verify_student_token(token: str, db: Session) -> Student:
             detail="Invalid or expired token",
         )
 
-    student = (
-        db.query(Student)
-        .filter(Student.id == student_id, Student.email == email)
-        .first()
-    )
+    student = student_for_token(db, student_id, email)
+    school_id = payload.get("school_id")
 
-    if not student:
+    # tokens issued before schools existed carry no school_id
+    if not student or (school_id is not None and student.school_id != school_id):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Student not found",
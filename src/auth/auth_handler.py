@@ -1,14 +1,26 @@
-from fastapi import Depends
+import hmac
+
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
-from src.database.services import db_session
+from src.core.constants import ADMIN_TOKEN
+from src.database.services import RequestSession
 from src.auth.auth_bearer import verify_student_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/students/login")
 
 
 def get_current_student(
+    db: RequestSession,
     token: str = Depends(oauth2_scheme)):
-    
-    with db_session() as db:
-        return verify_student_token(token, db)
+
+    # the request's session, so the handler reuses this connection
+    return verify_student_token(token, db)
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+        )
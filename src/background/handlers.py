@@ -0,0 +1,41 @@
+"""Outbox topics handled by the in-process worker pool.
+
+Import this module (main.py does) to register the handlers.
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from src.analytics.aggregates import refresh_aggregates
+from src.analytics.calibration import run_calibration
+from src.analytics.mastery import update_mastery_many
+from src.background.worker import handler
+from src.database.services import db_session
+
+MASTERY_UPDATE = "mastery.update"
+AGGREGATES_REFRESH = "aggregates.refresh"
+CALIBRATION_RUN = "calibration.run"
+
+
+@handler(MASTERY_UPDATE, transactional=True)
+def handle_mastery_update(db: Session, payload: dict) -> None:
+    """payload: student_id, chapter_id, answers (is_correct each, in answer order), answered_at (ISO 8601)."""
+    update_mastery_many(
+        db,
+        payload["student_id"],
+        payload["chapter_id"],
+        payload["answers"],
+        datetime.fromisoformat(payload["answered_at"]) if payload.get("answered_at") else None,
+    )
+
+
+@handler(AGGREGATES_REFRESH)
+def handle_aggregates_refresh(payload: dict) -> None:
+    with db_session() as db:
+        refresh_aggregates(db, rebuild=payload.get("rebuild", False))
+
+
+@handler(CALIBRATION_RUN)
+def handle_calibration_run(payload: dict) -> None:
+    with db_session() as db:
+        run_calibration(db, full=payload.get("full", False))
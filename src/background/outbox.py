@@ -0,0 +1,134 @@
+"""Transactional outbox: deferred work stored next to the change that caused it.
+
+`enqueue` adds a row to the caller's session, so the work item commits or
+rolls back together with the triggering change. Workers (see worker.py)
+claim due rows with ``FOR UPDATE SKIP LOCKED``; claiming pushes
+`available_at` out by a lease, so a row held by a crashed worker becomes
+due again instead of being lost. Handled rows are deleted; failures are
+retried with exponential backoff and parked as 'dead' after
+OUTBOX_MAX_ATTEMPTS attempts. Delivery is at least once: handlers must be
+idempotent.
+"""
+import random
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.constants import (
+    OUTBOX_BACKOFF_BASE,
+    OUTBOX_BACKOFF_MAX,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+)
+from src.database.repository import OutboxEvent
+
+PENDING = "pending"
+DEAD = "dead"
+
+
+class ClaimedEvent(NamedTuple):
+    id: int
+    topic: str
+    payload: dict
+    attempts: int
+    age_seconds: float  # since enqueue, at claim time
+    created_at: datetime
+
+
+def enqueue(db: Session, topic: str, payload: dict, delay_seconds: float = 0) -> OutboxEvent:
+    """Add a work item to the caller's transaction. The caller commits."""
+    event = OutboxEvent(topic=topic, payload=payload)
+    if delay_seconds:
+        event.available_at = text(f"LOCALTIMESTAMP + make_interval(secs => {float(delay_seconds)})")
+    db.add(event)
+    return event
+
+
+def claim_batch(db: Session, limit: int, lease_seconds: float = OUTBOX_LEASE_SECONDS) -> List[ClaimedEvent]:
+    rows = db.execute(
+        text(
+            """
+            UPDATE outbox
+            SET attempts = attempts + 1,
+                available_at = LOCALTIMESTAMP + make_interval(secs => :lease)
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE status = 'pending' AND available_at <= LOCALTIMESTAMP
+                ORDER BY available_at, id
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, topic, payload, attempts,
+                      EXTRACT(EPOCH FROM LOCALTIMESTAMP - created_at)::float8 AS age_seconds, created_at
+            """
+        ),
+        {"lease": lease_seconds, "limit": limit},
+    ).all()
+    db.commit()
+    return sorted((ClaimedEvent(*row) for row in rows), key=lambda event: event.id)
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter for the retry after `attempts` failed tries."""
+    return random.uniform(0, min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1)))
+
+
+def complete(db: Session, handled_ids: List[int], failures: List[tuple]) -> int:
+    """Delete handled rows and reschedule failed ones. `failures` holds (event, error) pairs.
+
+    Returns how many events were marked dead.
+    """
+    if handled_ids:
+        db.execute(text("DELETE FROM outbox WHERE id = ANY(:ids)"), {"ids": handled_ids})
+    dead = 0
+    for event, error in failures:
+        exhausted = event.attempts >= OUTBOX_MAX_ATTEMPTS
+        dead += exhausted
+        db.execute(
+            text(
+                """
+                UPDATE outbox
+                SET status = :status, last_error = :error,
+                    available_at = LOCALTIMESTAMP + make_interval(secs => :delay)
+                WHERE id = :id
+                """
+            ),
+            {
+                "id": event.id,
+                "status": DEAD if exhausted else PENDING,
+                "error": error[:2000],
+                "delay": 0.0 if exhausted else backoff_seconds(event.attempts),
+            },
+        )
+    db.commit()
+    return dead
+
+
+def queue_depth(db: Session) -> dict:
+    row = db.execute(
+        text(
+            """
+            SELECT count(*) FILTER (WHERE status = 'pending'),
+                   count(*) FILTER (WHERE status = 'pending' AND available_at <= LOCALTIMESTAMP),
+                   count(*) FILTER (WHERE status = 'dead'),
+                   EXTRACT(EPOCH FROM LOCALTIMESTAMP - min(created_at) FILTER (WHERE status = 'pending'))::float8
+            FROM outbox
+            """
+        )
+    ).one()
+    return {"pending": row[0], "due": row[1], "dead": row[2], "oldest_pending_seconds": row[3] or 0.0}
+
+
+def retry_dead(db: Session, topic: Optional[str] = None) -> int:
+    """Put dead events back in the queue (after fixing whatever made them fail)."""
+    result = db.execute(
+        text(
+            "UPDATE outbox SET status = 'pending', attempts = 0, available_at = LOCALTIMESTAMP "
+            "WHERE status = 'dead' AND (CAST(:topic AS text) IS NULL OR topic = :topic)"
+        ),
+        {"topic": topic},
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,180 @@
+"""Asyncio worker pool that drains the outbox inside the API process.
+
+Handlers are registered per topic with `@handler("topic")` and receive the
+event payload. Coroutine handlers run on the event loop; plain functions run
+in the threadpool, so blocking database work does not stall requests.
+`@handler("topic", transactional=True)` handlers are called as
+``fn(db, payload)`` and the outbox row is deleted in that same transaction,
+so database-only side effects are applied exactly once. Each
+worker claims its own batch, handles it and records the outcome in one more
+round trip; `SKIP LOCKED` keeps workers (and other processes) from claiming
+the same rows.
+
+Metrics: `outbox_processed_total{topic,outcome}`,
+`outbox_processing_seconds{topic}` (handler time), `outbox_lag_seconds{topic}`
+(enqueue to completion) and the `outbox_pending`, `outbox_due`,
+`outbox_dead` and `outbox_oldest_pending_seconds` gauges.
+
+A school with its own database (EDU_TENANT_DB_HOSTS) has its own outbox
+there, drained by a pool created with its `school_id`; that pool's gauges
+carry a ``school`` label.
+"""
+import asyncio
+import functools
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from src.background.outbox import ClaimedEvent, claim_batch, complete, queue_depth
+from src.core.configurations import logger
+from src.core.constants import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL, OUTBOX_WORKERS
+from src.core.metrics import metrics
+from src.database.services import db_session, tenant_scope
+
+HANDLERS: Dict[str, Callable] = {}
+DEPTH_REFRESH_INTERVAL = 5.0  # seconds
+
+
+def handler(topic: str, transactional: bool = False):
+    """Register the function that processes events of `topic`."""
+
+    def decorator(fn):
+        if topic in HANDLERS:
+            raise ValueError(f"Outbox topic {topic!r} already has a handler")
+        HANDLERS[topic] = functools.partial(_run_in_transaction, fn) if transactional else fn
+        return fn
+
+    return decorator
+
+
+def _run_in_transaction(fn, event: ClaimedEvent) -> None:
+    with db_session() as db:
+        # Deleting first locks the row: a second worker holding the same event
+        # (claimed again after the lease ran out) waits here and then finds it
+        # gone instead of applying it twice.
+        deleted = db.execute(text("DELETE FROM outbox WHERE id = :id"), {"id": event.id}).rowcount
+        if not deleted:
+            db.rollback()
+            return
+        fn(db, event.payload)
+        db.commit()
+
+
+def _claim(limit: int):
+    with db_session() as db:
+        return claim_batch(db, limit)
+
+
+def _complete(handled_ids, failures):
+    with db_session() as db:
+        return complete(db, handled_ids, failures)
+
+
+def _queue_depth():
+    with db_session() as db:
+        return queue_depth(db)
+
+
+class OutboxWorkerPool:
+    def __init__(
+        self,
+        workers: int = OUTBOX_WORKERS,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        school_id: Optional[int] = None,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.school_id = school_id
+        self._tasks = []
+        self._depth = {"pending": 0, "due": 0, "dead": 0, "oldest_pending_seconds": 0.0}
+
+        labels = {"school": school_id} if school_id is not None else {}
+        for name in self._depth:
+            metrics.set_gauge(f"outbox_{name}", lambda name=name: self._depth[name], **labels)
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        # tasks copy the current context, so every session they open uses the school's database
+        with tenant_scope(self.school_id) if self.school_id is not None else nullcontext():
+            self._tasks = [loop.create_task(self._work(i)) for i in range(self.workers)]
+            self._tasks.append(loop.create_task(self._watch_depth()))
+        school = f" for school {self.school_id}" if self.school_id is not None else ""
+        logger.info(f"Outbox worker pool started with {self.workers} workers{school}")
+
+    async def stop(self) -> None:
+        """Cancel the workers. Events claimed but not completed are retried after their lease."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, worker: int) -> None:
+        while True:
+            try:
+                events = await run_in_threadpool(_claim, self.batch_size)
+            except Exception as e:
+                logger.error(f"Outbox worker {worker} could not claim events: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if not events:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            claimed_at = time.perf_counter()
+            handled, failures = [], []
+            for event in events:
+                error = await self._handle(event)
+                if error is None:
+                    handled.append(event)
+                else:
+                    failures.append((event, error))
+
+            try:
+                dead = await run_in_threadpool(_complete, [event.id for event in handled], failures)
+            except Exception as e:
+                # the lease expires and the batch is handled again
+                logger.error(f"Outbox worker {worker} could not record results: {e}")
+                continue
+
+            lag_offset = time.perf_counter() - claimed_at
+            for event in handled:
+                metrics.inc("outbox_processed_total", topic=event.topic, outcome="ok")
+                metrics.observe("outbox_lag_seconds", event.age_seconds + lag_offset, topic=event.topic)
+            for event, error in failures:
+                metrics.inc("outbox_processed_total", topic=event.topic, outcome="error")
+                logger.warning(f"Outbox event {event.id} ({event.topic}) attempt {event.attempts} failed: {error}")
+            if dead:
+                metrics.inc("outbox_dead_total", dead)
+
+    @staticmethod
+    async def _handle(event: ClaimedEvent):
+        """Run the event's handler. Returns None on success, else the error message."""
+        fn = HANDLERS.get(event.topic)
+        if fn is None:
+            return f"no handler for topic {event.topic!r}"
+        started = time.perf_counter()
+        try:
+            if isinstance(fn, functools.partial):
+                await run_in_threadpool(fn, event)
+            elif asyncio.iscoroutinefunction(fn):
+                await fn(event.payload)
+            else:
+                await run_in_threadpool(fn, event.payload)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        finally:
+            metrics.observe("outbox_processing_seconds", time.perf_counter() - started, topic=event.topic)
+        return None
+
+    async def _watch_depth(self) -> None:
+        while True:
+            try:
+                self._depth = await run_in_threadpool(_queue_depth)
+            except Exception as e:
+                logger.error(f"Could not read outbox depth: {e}")
+            await asyncio.sleep(DEPTH_REFRESH_INTERVAL)
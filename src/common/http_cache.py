@@ -0,0 +1,28 @@
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.core.constants import CACHE_CONTROL, CACHE_VARY
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag built from the given parts, e.g. make_etag("chapters", 42) -> '"chapters-42"'."""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match lists `etag` (or is `*`)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x".
+    return etag in (candidate.strip().removeprefix("W/") for candidate in header.split(","))
+
+
+def cache_headers(route: str, etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL[route], "Vary": CACHE_VARY}
+
+
+def not_modified(route: str, etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(route, etag))
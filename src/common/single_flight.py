@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import threading
+
+from src.core.constants import SINGLE_FLIGHT_WAIT_TIMEOUT
+from src.core.metrics import metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _call_key(args: tuple, kwargs: dict):
+    return args, tuple(sorted(kwargs.items()))
+
+
+def single_flight(name: str = None, key=None, wait_timeout: float = SINGLE_FLIGHT_WAIT_TIMEOUT):
+    """Share one in-flight execution between concurrent identical calls.
+
+    While a call with given arguments is running, further calls with the same
+    arguments wait for it and receive its result (or exception) instead of
+    executing again. Nothing is cached once the call finishes. Works on both
+    coroutine functions (coalesced within the event loop) and plain functions
+    (coalesced across threads, e.g. the threadpool that runs sync endpoints).
+    Arguments must be hashable, unless `key` is given: it is called with the
+    same arguments and returns the hashable identity of the call, e.g. to
+    leave out a per-request session that the first caller's execution uses.
+
+    A waiting call gives up after `wait_timeout` seconds and executes on its
+    own, so a hung execution cannot hold every waiter's thread (counted in
+    `singleflight_wait_timeouts_total`). A coroutine execution that is
+    cancelled (e.g. its client went away) has no result to share: its
+    waiters start over, the first of them executing for the rest.
+
+    Executions and calls that received another execution's result are
+    counted in `singleflight_executions_total` and
+    `singleflight_coalesced_total`, labelled with `name`.
+    """
+
+    def decorator(fn):
+        label = name or fn.__qualname__
+        call_key = key or (lambda *args, **kwargs: _call_key(args, kwargs))
+
+        if asyncio.iscoroutinefunction(fn):
+            in_flight = {}
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = call_key(*args, **kwargs)
+                future = in_flight.get(key)
+                if future is not None:
+                    try:
+                        await asyncio.wait_for(asyncio.shield(future), wait_timeout)
+                    except asyncio.CancelledError:
+                        if not future.cancelled():
+                            raise  # this call was cancelled, not the execution
+                        return await async_wrapper(*args, **kwargs)
+                    except Exception:
+                        if not future.done():
+                            metrics.inc("singleflight_wait_timeouts_total", fn=label)
+                            return await fn(*args, **kwargs)
+                        # else the execution's error, raised below
+                    metrics.inc("singleflight_coalesced_total", fn=label)
+                    return future.result()
+
+                future = asyncio.get_running_loop().create_future()
+                in_flight[key] = future
+                metrics.inc("singleflight_executions_total", fn=label)
+                try:
+                    result = await fn(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    # mark retrieved so an un-awaited failure is not logged
+                    future.exception()
+                    raise
+                else:
+                    future.set_result(result)
+                    return result
+                finally:
+                    del in_flight[key]
+
+            return async_wrapper
+
+        lock = threading.Lock()
+        calls = {}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = call_key(*args, **kwargs)
+            with lock:
+                call = calls.get(key)
+                leader = call is None
+                if leader:
+                    call = calls[key] = _Call()
+
+            if not leader:
+                if not call.done.wait(wait_timeout):
+                    metrics.inc("singleflight_wait_timeouts_total", fn=label)
+                    return fn(*args, **kwargs)
+                metrics.inc("singleflight_coalesced_total", fn=label)
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+            metrics.inc("singleflight_executions_total", fn=label)
+            try:
+                call.result = fn(*args, **kwargs)
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with lock:
+                    del calls[key]
+                call.done.set()
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.core.metrics import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being stored.
+
+    `invalidate` leaves a tombstone, so a value that was loaded before the
+    invalidation (`set(..., loaded_at=...)`) is not stored over it. Hits and
+    misses are counted in `cache_hits_total` / `cache_misses_total` and the
+    entry count is exported as `cache_entries`, labelled with `name`.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (value, expires_at), or (_MISSING, invalidated_at) for a tombstone
+        self._entries = OrderedDict()
+
+        metrics.set_gauge("cache_entries", lambda: len(self._entries), cache=name)
+
+    @staticmethod
+    def now() -> float:
+        return time.monotonic()
+
+    def get(self, key, default=None):
+        now = self.now()
+        with self._lock:
+            value, expires_at = self._entries.get(key, (_MISSING, 0.0))
+            if value is not _MISSING and expires_at <= now:
+                del self._entries[key]
+                value = _MISSING
+            elif value is not _MISSING:
+                self._entries.move_to_end(key)
+        if value is _MISSING:
+            metrics.inc("cache_misses_total", cache=self.name)
+            return default
+        metrics.inc("cache_hits_total", cache=self.name)
+        return value
+
+    def set(self, key, value, loaded_at: Optional[float] = None) -> None:
+        """Store `value`. With `loaded_at` (a `now()` taken before loading), skip if invalidated since."""
+        now = self.now()
+        with self._lock:
+            current, stamp = self._entries.get(key, (None, 0.0))
+            if loaded_at is not None and current is _MISSING and stamp >= loaded_at:
+                return
+            self._put(key, value, now + self.ttl)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._put(key, _MISSING, self.now())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _put(self, key, value, stamp: float) -> None:
+        self._entries[key] = (value, stamp)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,170 @@
+import os
+
+# Upper bound on ids + emails + phones accepted by one batch student lookup.
+MAX_STUDENT_BATCH_LOOKUP = 500
+
+# Admission control for expensive routes, keyed by full request path.
+#   max_concurrency: requests executing at once
+#   max_queue:       requests allowed to wait for a slot; beyond this -> 503
+#   queue_timeout:   seconds a queued request waits before giving up -> 503
+#   retry_after:     seconds advertised in the Retry-After header
+#   ip_rate/ip_burst, email_rate/email_burst: token buckets (tokens/second,
+#   bucket size) per client IP and per login email -> 429
+ADMISSION_LIMITS = {
+    "/edu/v1/storefront/login_student": {
+        "max_concurrency": os.cpu_count() or 1,
+        "max_queue": 64,
+        "queue_timeout": 2.0,
+        "retry_after": 2,
+        "ip_rate": 2.0,
+        "ip_burst": 60,
+        "email_rate": 0.1,
+        "email_burst": 5,
+    },
+}
+# Bodies read by admission control (to find the login email) are capped at
+# this size; larger ones are refused with 413 before reaching the handler.
+ADMISSION_MAX_BODY_BYTES = 64 * 1024
+
+# Seconds a worker trusts its cached curriculum version before re-reading it.
+# Bounds how long a conditional GET may answer 304 after content changes.
+CURRICULUM_VERSION_TTL = 10
+
+# Seconds a coalesced call waits for the in-flight one (src/common/single_flight.py)
+# before executing on its own.
+SINGLE_FLIGHT_WAIT_TIMEOUT = 15.0
+
+# Cache-Control header per cacheable route.
+CACHE_CONTROL = {
+    "all_chapters": "public, max-age=60, must-revalidate",
+    "chapter_by_number": "public, max-age=60, must-revalidate",
+    "chapter_quiz": "public, max-age=60, must-revalidate",
+}
+# The request headers that pick the school, and with it the database these
+# responses come from (see RequestContextMiddleware); sent as Vary so shared
+# caches never serve one school's copy to another.
+CACHE_VARY = "Authorization, X-School-Id"
+
+# Time-range analytics (/analytics/students/timeseries)
+ANALYTICS_MAX_STUDENTS = 200
+ANALYTICS_MAX_RANGE_DAYS = 3 * 366
+# Buckets per series; a coarser bucket is chosen when the range would exceed it.
+ANALYTICS_MAX_BUCKETS = 120
+
+# quiz_submissions is range-partitioned by month on submitted_at; keep this
+# many future monthly partitions created ahead of time.
+PARTITION_MONTHS_AHEAD = 3
+# Seconds between checks that those partitions exist, in every database, so a
+# long-running process keeps creating them as months pass.
+PARTITION_CHECK_INTERVAL = 3600
+
+# Cold archive of quiz_submissions (src/database/archive.py)
+ARCHIVE_DIR = "archive/quiz_submissions"
+# Months older than this many full months are eligible for archiving.
+ARCHIVE_AFTER_MONTHS = 12
+# Students per archive file within a month.
+ARCHIVE_STUDENT_RANGE = 100_000
+
+# Question calibration (src/analytics/calibration.py). As for the aggregates,
+# submissions younger than this wait for the next run.
+CALIBRATION_LAG = 30  # seconds
+
+# Chapter / question aggregates (src/analytics/aggregates.py)
+AGGREGATE_REFRESH_INTERVAL = 60  # seconds between incremental refreshes
+# Submissions younger than this are left for the next refresh, so rows from
+# transactions still in flight are not skipped past by the watermark.
+AGGREGATE_REFRESH_LAG = 30  # seconds
+
+# Parent dashboard cache (src/analytics/parent_dashboard.py). Entries are
+# dropped when the student submits answers; the TTL bounds staleness for
+# changes made by other worker processes.
+PARENT_DASHBOARD_TTL = 300  # seconds
+PARENT_DASHBOARD_CACHE_SIZE = 50_000  # students per worker
+PARENT_DASHBOARD_DAYS = 30
+
+# Outbox workers (src/background/worker.py)
+OUTBOX_WORKERS = 4  # concurrent consumers per process
+OUTBOX_BATCH_SIZE = 50  # rows claimed per query
+OUTBOX_POLL_INTERVAL = 1.0  # seconds to sleep when nothing is due
+# A claimed row becomes due again after this long, so work held by a worker
+# that died is picked up by another one.
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_MAX_ATTEMPTS = 8  # then the row is marked 'dead'
+OUTBOX_BACKOFF_BASE = 2.0  # seconds; doubled per failed attempt
+OUTBOX_BACKOFF_MAX = 600.0
+
+# XP awarded for a correct answer
+QUIZ_XP_PER_CORRECT = 10
+
+# Whole-chapter quiz payloads and answer keys (GET /quiz/chapters/{id}),
+# cached per chapter and curriculum version; a content change is a new key.
+QUIZ_CACHE_TTL = 3600  # seconds
+QUIZ_CACHE_SIZE = 2_000  # chapter versions per worker
+
+# Edge nodes (src/edge). An edge node runs with EDU_EDGE_DB_PATH set (see
+# src/database/services.py) and syncs with the central server at
+# EDGE_CENTRAL_URL, authenticating with its own EDGE_SYNC_TOKEN (issued by
+# `python -m src.edge.central <node_id>` on the central server).
+EDGE_NODE_ID = os.getenv("EDU_EDGE_NODE_ID", "")
+EDGE_CENTRAL_URL = os.getenv("EDU_EDGE_CENTRAL_URL", "")
+EDGE_SYNC_TOKEN = os.getenv("EDU_EDGE_SYNC_TOKEN", "")
+EDGE_SYNC_INTERVAL = 60  # seconds between sync attempts
+EDGE_SYNC_BATCH = 2_000  # submissions pushed per request
+EDGE_SYNC_TIMEOUT = 30  # seconds per request
+EDGE_CURRICULUM_PAGE = 5_000  # curriculum change log entries per sync request
+
+# Curriculum change feed (/storefront/sync)
+CURRICULUM_SYNC_DEFAULT_LIMIT = 500
+CURRICULUM_SYNC_MAX_LIMIT = 2_000
+# Withheld from clients; answers are graded server side.
+CURRICULUM_SYNC_HIDDEN_FIELDS = {"questions": ("correct_answer_index", "explanation")}
+
+# Question image proxy (src/media/image_cache.py). IMAGE_ORIGIN is either a
+# local directory or an http(s) base URL; an image_url is looked up there by
+# its path.
+IMAGE_ORIGIN = os.getenv("EDU_IMAGE_ORIGIN", "media/originals")
+IMAGE_CACHE_DIR = "cache/images"
+IMAGE_CACHE_MAX_BYTES = 2 * 1024**3  # originals + variants; least recently served are evicted first
+IMAGE_ORIGIN_MAX_BYTES = 20 * 1024**2  # larger originals are refused
+IMAGE_ORIGIN_TIMEOUT = 10  # seconds per origin fetch
+# Widths a variant may be requested at; anything else would let clients fill the cache.
+IMAGE_WIDTHS = (160, 320, 640, 1280)
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"  # content-addressed URLs
+IMAGE_REDIRECT_CACHE_CONTROL = "public, max-age=300"  # question -> content URL
+
+# Operator endpoints (/admin), called with the X-Admin-Token header. They are
+# refused for everyone while this is unset.
+ADMIN_TOKEN = os.getenv("EDU_ADMIN_TOKEN", "")
+
+# Slow query log (src/database/slow_queries.py)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("EDU_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_FILE = "logs/slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024**2  # per file before rotating
+SLOW_QUERY_LOG_BACKUPS = 5
+# Fraction of slow SELECTs re-run under EXPLAIN (ANALYZE, BUFFERS) in the background.
+SLOW_QUERY_EXPLAIN_SAMPLE = 0.1
+SLOW_QUERY_EXPLAIN_INTERVAL = 300  # seconds before the same statement is explained again
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = 5_000  # statement_timeout for the EXPLAIN run
+SLOW_QUERY_EXPLAIN_QUEUE = 100  # pending EXPLAINs; more are dropped
+
+# Schools (tenants). Requests are routed by the school_id claim of the
+# student token, or by the X-School-Id header when there is no token (login,
+# registration); rows without a school belong to DEFAULT_SCHOOL_ID.
+# Schools with a database of their own are configured in
+# src/database/services.py (EDU_TENANT_DB_HOSTS); logins without the header
+# also look for the student in those databases.
+DEFAULT_SCHOOL_ID = 1
+SCHOOL_HEADER = "x-school-id"
+TENANT_CURRICULUM_SYNC_INTERVAL = 60  # seconds between curriculum copies into school databases
+
+# Live classroom quiz sessions over WebSockets (src/live). Sessions live in
+# the memory of the worker that created them.
+LIVE_SESSION_IDLE_TIMEOUT = 2 * 3600  # seconds without activity before a session is closed
+LIVE_MAX_STUDENTS = 500  # sockets per session
+LIVE_MAX_QUESTIONS = 100  # per session
+LIVE_BROADCAST_INTERVAL = 0.5  # seconds; answer counts are pushed to hosts at most this often
+LIVE_SEND_TIMEOUT = 5.0  # seconds; a socket that cannot take a message in time is dropped
+LIVE_FLUSH_INTERVAL = 1.0  # seconds between batched writes to quiz_submissions
+LIVE_FLUSH_BATCH = 1_000  # answers per transaction
+LIVE_FLUSH_MAX_PENDING = 50_000  # answers held while the database is unavailable; beyond this they are dropped
+LIVE_DEAD_LETTER_FILE = "logs/live_dead_letters.jsonl"  # answers the database rejected, one JSON object per line
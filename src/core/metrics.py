@@ -0,0 +1,57 @@
+import threading
+from collections import defaultdict
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and summaries exported by `/admin/metrics`.
+
+    Values are per worker process; scrape every worker (or sum them) when
+    running more than one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._summaries = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value, **labels) -> None:
+        """Set a gauge to a value, or to a zero-argument callable read at snapshot time."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = {"count": 0, "sum": 0.0, "max": value}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            summaries = {key: dict(value) for key, value in self._summaries.items()}
+        for key, value in gauges.items():
+            if callable(value):
+                gauges[key] = value()
+        for summary in summaries.values():
+            summary["avg"] = summary["sum"] / summary["count"] if summary["count"] else 0.0
+        return {"counters": counters, "gauges": gauges, "summaries": summaries}
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,406 @@
+"""Cold archive of closed months of quiz_submissions.
+
+Layout on disk::
+
+    ARCHIVE_DIR/2025-01/students_000000000-000099999_run000.npz
+    ARCHIVE_DIR/2025-01/students_000100000-000199999_run000.npz
+    ARCHIVE_DIR/2025-01/students_000000000-000099999_run001.npz
+    ARCHIVE_DIR/2025-01/manifest.json
+    ARCHIVE_DIR/school-12/2025-01/...
+
+The primary's months sit at the top; a school with a database of its own
+(see `database_key`) has its months under its own directory, since student
+and question ids are only unique within one database.
+
+Each ``.npz`` file holds one deflate-compressed NumPy array per column of
+quiz_submissions (a small column store: readers load only the columns they
+need). ``time_taken_seconds`` uses -1 for NULL. Files written before
+``school_id`` and ``received_at`` were archived read back -1 and NaT for
+them.
+
+A month can be archived in several runs: edge nodes upload submissions
+with their original submitted_at, so rows for an archived month keep
+arriving (into the DEFAULT partition once the month's own is dropped).
+Each run writes new files and never touches earlier ones.
+
+The manifest is the commit point. Its ``files`` are the runs whose rows
+have been removed from Postgres, and readers use only those, so a row is
+never counted from both places. A run is first recorded as ``pending``
+once its files are verified, while its rows are still in Postgres, and
+moved to ``files`` only after the transaction that removes them has
+committed. A pending run left by a crash is resolved by probing for one
+of its rows: still in Postgres means the purge never committed and the
+run is discarded, gone means it did and the run is kept.
+
+`scan_archive` is the read path: it yields column dicts filtered by time,
+student and question, and is used next to the hot table by the mastery
+recompute and question calibration jobs.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from src.core.configurations import logger
+from src.core.constants import ARCHIVE_AFTER_MONTHS, ARCHIVE_DIR, ARCHIVE_STUDENT_RANGE
+from src.database.partitions import (
+    DEFAULT_PARTITION,
+    DETACH_LOCK_TIMEOUT,
+    add_months,
+    detach_month_partition,
+    list_partitions,
+    month_floor,
+    partition_name,
+    submitted_at_bounds,
+)
+from src.database.repository import QuizSubmission
+from src.database.services import PRIMARY_DATABASE, database_key
+
+COLUMNS = {
+    "id": np.int64,
+    "student_id": np.int64,
+    "question_id": np.int64,
+    "selected_answer_index": np.int16,
+    "is_correct": bool,
+    "xp_earned": np.int32,
+    "time_taken_seconds": np.int32,
+    "submitted_at": "datetime64[us]",
+    "school_id": np.int64,
+    "received_at": "datetime64[us]",
+}
+NULL_TIME_TAKEN = -1
+# values read for columns that files archived before them lack
+MISSING_COLUMN = {"school_id": -1, "received_at": np.datetime64("NaT")}
+MANIFEST = "manifest.json"
+MONTH_DIR = re.compile(r"\d{4}-\d{2}")
+
+
+class ArchiveVerificationError(Exception):
+    pass
+
+
+def _root(database: str) -> Path:
+    return Path(ARCHIVE_DIR) if database == PRIMARY_DATABASE else Path(ARCHIVE_DIR) / database
+
+
+def _month_dir(month: date, database: str) -> Path:
+    return _root(database) / f"{month.year}-{month.month:02d}"
+
+
+def _file_name(range_start: int, run: int) -> str:
+    return f"students_{range_start:09d}-{range_start + ARCHIVE_STUDENT_RANGE - 1:09d}_run{run:03d}.npz"
+
+
+def _month_filter(month: date) -> list:
+    return submitted_at_bounds(QuizSubmission.submitted_at, month, add_months(month, 1))
+
+
+def _fetch_range(db: Session, month: date, range_start: int) -> dict:
+    stmt = (
+        select(*(getattr(QuizSubmission, name) for name in COLUMNS))
+        .where(
+            *_month_filter(month),
+            QuizSubmission.student_id.between(range_start, range_start + ARCHIVE_STUDENT_RANGE - 1),
+        )
+        .order_by(QuizSubmission.student_id, QuizSubmission.submitted_at, QuizSubmission.id)
+    )
+    rows = db.execute(stmt).all()
+    values = dict(zip(COLUMNS, zip(*rows))) if rows else {name: () for name in COLUMNS}
+    values["time_taken_seconds"] = [NULL_TIME_TAKEN if v is None else v for v in values["time_taken_seconds"]]
+    return {name: np.array(values[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_archive_file(path: Path, columns=None) -> dict:
+    with np.load(path) as data:
+        rows = len(data["id"])
+        return {
+            name: data[name] if name in data.files else np.full(rows, MISSING_COLUMN[name], dtype=COLUMNS[name])
+            for name in (columns or COLUMNS)
+        }
+
+
+def archivable_before() -> date:
+    """First month that is still too recent to archive."""
+    return add_months(month_floor(datetime.utcnow()), -ARCHIVE_AFTER_MONTHS)
+
+
+def _read_manifest(month_dir: Path) -> Optional[dict]:
+    path = month_dir / MANIFEST
+    return json.loads(path.read_text()) if path.is_file() else None
+
+
+def _write_manifest(month_dir: Path, manifest: dict) -> None:
+    _write_atomic(month_dir / MANIFEST, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+
+def _lock_month(db: Session, month: date) -> str:
+    """Block writes to the month's rows until the transaction ends. Returns the table holding them.
+
+    SHARE mode still lets readers in. Inserts for the month wait (the
+    partition is small and old, so only late edge-node uploads land there);
+    inserts already in flight are waited for, so every row counted below
+    is committed and no row can appear after the count.
+    """
+    table = partition_name(month)
+    if table not in list_partitions(db):
+        table = DEFAULT_PARTITION
+    db.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+    db.execute(text(f"LOCK TABLE {table} IN SHARE MODE"))
+    return table
+
+
+def _next_run(manifest: dict) -> int:
+    # manifests written before runs existed hold a single run
+    return manifest.get("runs", 1 if manifest["files"] else 0)
+
+
+def _resolve_pending(db: Session, month: date, manifest: dict) -> None:
+    """Keep or discard a run left pending by an interrupted archive, and rewrite the manifest."""
+    pending = manifest.pop("pending", None)
+    if pending is None:
+        return
+    month_dir = _month_dir(month, database_key(db.get_bind()))
+    probe = db.execute(
+        select(func.count()).where(*_month_filter(month), QuizSubmission.id == pending["probe_id"])
+    ).scalar()
+    if probe:
+        for entry in pending["files"]:
+            (month_dir / entry["file"]).unlink(missing_ok=True)
+        logger.warning(f"Discarded archive run {pending['run']} of {month:%Y-%m}, whose rows were not purged")
+    else:
+        _commit_run(manifest, pending)
+        logger.warning(f"Completed archive run {pending['run']} of {month:%Y-%m}, purged by an interrupted run")
+    _write_manifest(month_dir, manifest)
+
+
+def _commit_run(manifest: dict, run: dict) -> None:
+    manifest["files"].extend(run["files"])
+    manifest["rows"] += run["rows"]
+    manifest["runs"] = run["run"] + 1
+    manifest["archived_at"] = run["archived_at"]
+
+
+def archive_month(db: Session, month: date, purge: bool = True) -> dict:
+    """Export a closed month's rows to the archive, verify them, then remove them from Postgres.
+
+    The month's rows are locked against writes first. Each file is re-read
+    and checked against a row count and id checksum taken under that lock,
+    and the rows are removed in the same transaction: a month with its own
+    partition has it detached and dropped, rows that sit in the DEFAULT
+    partition are deleted. A month archived before gets a new run next to
+    its earlier files. With ``purge=False`` the files are written and
+    verified but the run stays pending, and readers keep using Postgres.
+    """
+    month = month_floor(month)
+    if month >= archivable_before():
+        raise ValueError(f"{month:%Y-%m} is not older than {ARCHIVE_AFTER_MONTHS} months")
+
+    month_dir = _month_dir(month, database_key(db.get_bind()))
+    month_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(month_dir) or {"month": f"{month.year}-{month.month:02d}", "rows": 0, "files": []}
+    table = _lock_month(db, month)
+    _resolve_pending(db, month, manifest)
+    run = _next_run(manifest)
+    range_starts = db.execute(
+        select((QuizSubmission.student_id // ARCHIVE_STUDENT_RANGE).label("bucket"))
+        .where(*_month_filter(month))
+        .distinct()
+        .order_by("bucket")
+    ).scalars().all()
+
+    files, probe_id = [], None
+    for bucket in range_starts:
+        range_start = int(bucket) * ARCHIVE_STUDENT_RANGE
+        columns = _fetch_range(db, month, range_start)
+        path = month_dir / _file_name(range_start, run)
+        _write_atomic(path, lambda f: np.savez_compressed(f, **columns))
+
+        stored = read_archive_file(path, ["id"])["id"]
+        expected_rows, expected_id_sum = db.execute(
+            select(func.count(), func.coalesce(func.sum(QuizSubmission.id), 0)).where(
+                *_month_filter(month),
+                QuizSubmission.student_id.between(range_start, range_start + ARCHIVE_STUDENT_RANGE - 1),
+            )
+        ).one()
+        if len(stored) != expected_rows or int(stored.sum()) != int(expected_id_sum):
+            db.rollback()
+            raise ArchiveVerificationError(
+                f"{path}: archived {len(stored)} rows, database has {expected_rows}"
+            )
+        if probe_id is None and len(stored):
+            probe_id = int(stored[0])
+        files.append(
+            {
+                "file": path.name,
+                "student_range": [range_start, range_start + ARCHIVE_STUDENT_RANGE - 1],
+                "rows": len(stored),
+                "sha256": _sha256(path),
+            }
+        )
+
+    if not files:
+        db.rollback()
+        return manifest
+    pending = {
+        "run": run,
+        "probe_id": probe_id,
+        "rows": sum(f["rows"] for f in files),
+        "archived_at": datetime.utcnow().isoformat(),
+        "files": files,
+    }
+    manifest["pending"] = pending
+    _write_manifest(month_dir, manifest)
+    if not purge:
+        db.rollback()
+        logger.info(f"Exported {pending['rows']} submissions for {manifest['month']}; left in Postgres")
+        return manifest
+
+    try:
+        _purge_month(db, month, table)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _commit_run(manifest, manifest.pop("pending"))
+    _write_manifest(month_dir, manifest)
+    logger.info(
+        f"Archived {pending['rows']} submissions for {manifest['month']} into {len(files)} files (run {run})"
+    )
+    return manifest
+
+
+def _purge_month(db: Session, month: date, table: str) -> None:
+    """Remove the month's rows in the caller's transaction, which holds `_lock_month`."""
+    if table == partition_name(month):
+        detach_month_partition(month, drop=True, db=db)
+    else:
+        db.execute(
+            text(f"DELETE FROM {table} WHERE submitted_at >= :lower AND submitted_at < :upper"),
+            {"lower": month, "upper": add_months(month, 1)},
+        )
+
+
+def _resolve_interrupted_runs(db: Session) -> None:
+    database = database_key(db.get_bind())
+    for month in _months(database):
+        manifest = _read_manifest(_month_dir(month, database))
+        if "pending" in manifest:
+            _resolve_pending(db, month, manifest)
+
+
+def archive_closed_months(db: Session) -> List[dict]:
+    """Archive every month older than ARCHIVE_AFTER_MONTHS that still has rows in Postgres.
+
+    Months archived before are picked up again when late rows arrive for them.
+    """
+    _resolve_interrupted_runs(db)
+    oldest = db.execute(select(func.min(QuizSubmission.submitted_at))).scalar()
+    if oldest is None:
+        return []
+    manifests = []
+    month = month_floor(oldest)
+    while month < archivable_before():
+        if db.execute(select(func.count()).where(*_month_filter(month))).scalar():
+            manifests.append(archive_month(db, month))
+        month = add_months(month, 1)
+    return manifests
+
+
+def _months(database: str) -> List[date]:
+    root = _root(database)
+    if not root.is_dir():
+        return []
+    months = []
+    for entry in sorted(root.iterdir()):
+        if MONTH_DIR.fullmatch(entry.name) and (entry / MANIFEST).is_file():
+            year, month = entry.name.split("-")
+            months.append(date(int(year), int(month), 1))
+    return months
+
+
+def archived_months(database: Optional[str] = None) -> List[date]:
+    """Months of `database` (the request's by default) with archived runs, whose rows are no longer in Postgres."""
+    database = database or database_key()
+    return [month for month in _months(database) if _read_manifest(_month_dir(month, database))["files"]]
+
+
+def scan_archive(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    student_ids=None,
+    question_ids=None,
+    columns=None,
+    database: Optional[str] = None,
+) -> Iterator[dict]:
+    """Yield archived submissions in [since, until) as column dicts, one per file.
+
+    Reads the archive of `database` (a `database_key`; the request's or
+    background task's by default), which callers holding a session pass as
+    ``database_key(db.get_bind())``. Months and student-range files that
+    cannot match are skipped without being opened; remaining rows are
+    filtered with NumPy.
+    """
+    database = database or database_key()
+    columns = list(columns or COLUMNS)
+    wanted = list(dict.fromkeys(columns + ["submitted_at", "student_id", "question_id"]))
+    students = np.asarray(sorted(student_ids), dtype=np.int64) if student_ids is not None else None
+    questions = np.asarray(sorted(question_ids), dtype=np.int64) if question_ids is not None else None
+
+    since = np.datetime64(since, "us") if since is not None else None
+    until = np.datetime64(until, "us") if until is not None else None
+
+    for month in archived_months(database):
+        if until is not None and np.datetime64(month, "us") >= until:
+            continue
+        if since is not None and np.datetime64(add_months(month, 1), "us") <= since:
+            continue
+        month_dir = _month_dir(month, database)
+        manifest = _read_manifest(month_dir)
+        for entry in manifest["files"]:
+            low, high = entry["student_range"]
+            if students is not None and not np.any((students >= low) & (students <= high)):
+                continue
+            data = read_archive_file(month_dir / entry["file"], wanted)
+            mask = np.ones(len(data["submitted_at"]), dtype=bool)
+            if since is not None:
+                mask &= data["submitted_at"] >= since
+            if until is not None:
+                mask &= data["submitted_at"] < until
+            if students is not None:
+                mask &= np.isin(data["student_id"], students)
+            if questions is not None:
+                mask &= np.isin(data["question_id"], questions)
+            if mask.any():
+                yield {name: data[name][mask] for name in columns}
+
+
+if __name__ == "__main__":
+    from src.database.services import db_session
+
+    with db_session() as db:
+        for manifest in archive_closed_months(db):
+            print(f"{manifest['month']}: {manifest['rows']} rows in {len(manifest['files'])} files")
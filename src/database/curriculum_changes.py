@@ -0,0 +1,96 @@
+"""Reading and compacting the curriculum change log (curriculum_changes).
+
+Clients keep the highest `version` they have applied and ask for the
+changes after it. A page is reduced to the latest operation per record, and
+the current rows for inserts and updates are loaded with one query per
+table, so a client that is N changes behind does O(N) work, not O(catalog).
+"""
+from sqlalchemy import Integer, String, text
+from sqlalchemy.orm import Session
+
+from src.database.dialects import in_values
+from src.database.repository import Chapter, Concept, CurriculumChange, Question, Topic
+
+MODELS = {model.__tablename__: model for model in (Chapter, Topic, Concept, Question)}
+
+
+def _typed_id(model, record_id: str):
+    return int(record_id) if isinstance(model.id.type, Integer) else record_id
+
+
+def read_changes(db: Session, since: int, limit: int) -> dict:
+    """Changes with version > `since`, at most `limit` log entries.
+
+    Returns ``version`` (pass it as the next `since`), ``has_more``,
+    ``truncated`` (tables to empty before applying this page), ``upserts``
+    (table -> current ORM rows) and ``deletes`` (table -> ids).
+    """
+    changes = (
+        db.query(CurriculumChange)
+        .filter(CurriculumChange.version > since)
+        .order_by(CurriculumChange.version)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    truncated = []
+    latest = {}
+    for change in changes:
+        if change.op == "T":
+            truncated.append(change.table_name)
+            latest = {key: op for key, op in latest.items() if key[0] != change.table_name}
+        else:
+            latest[(change.table_name, change.record_id)] = change.op
+
+    upserts = {table: [] for table in MODELS}
+    deletes = {table: [] for table in MODELS}
+    for table, model in MODELS.items():
+        wanted = [_typed_id(model, record_id) for (t, record_id), op in latest.items() if t == table and op != "D"]
+        deletes[table] = [_typed_id(model, record_id) for (t, record_id), op in latest.items() if t == table and op == "D"]
+        if not wanted:
+            continue
+        item_type = Integer if isinstance(model.id.type, Integer) else String
+        rows = db.query(model).filter(in_values(model.id, f"{table}_ids", wanted, item_type)).all()
+        upserts[table] = rows
+        # changed in this page and deleted by a later change: report the delete now
+        found = {row.id for row in rows}
+        deletes[table].extend(record_id for record_id in wanted if record_id not in found)
+
+    return {
+        "version": changes[-1].version if changes else since,
+        "has_more": has_more,
+        "truncated": list(dict.fromkeys(truncated)),
+        "upserts": upserts,
+        "deletes": deletes,
+    }
+
+
+def compact_changes(db: Session) -> int:
+    """Drop log entries superseded by a later entry for the same record (or a later TRUNCATE).
+
+    Safe while clients are paging: anything removed has a newer version
+    that every client behind it will still receive. Delete markers are
+    kept so that long-offline clients still learn about deletions.
+    """
+    superseded = db.execute(
+        text(
+            """
+            DELETE FROM curriculum_changes c
+            USING curriculum_changes n
+            WHERE n.table_name = c.table_name
+              AND n.version > c.version
+              AND (n.record_id = c.record_id OR n.op = 'T')
+            """
+        )
+    ).rowcount
+    db.commit()
+    return superseded
+
+
+if __name__ == "__main__":
+    from src.database.services import db_session
+
+    with db_session() as db:
+        print(f"removed {compact_changes(db)} superseded change log entries")
@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.core.constants import CURRICULUM_VERSION_TTL
+from src.database.repository import CurriculumMeta
+from src.database.services import READ, database_key, db_session
+
+_lock = threading.Lock()
+# database_key -> (version, monotonic time it was read); every database has its own versions
+_versions: Dict[str, Tuple[int, float]] = {}
+
+
+def remember_curriculum_version(version: int, database: Optional[str] = None) -> None:
+    """Record a version read elsewhere (e.g. alongside a content query)."""
+    database = database or database_key()
+    with _lock:
+        cached = _versions.get(database)
+        # versions only move forward; never let a lagging replica read regress them
+        if cached is not None and version < cached[0]:
+            version = cached[0]
+        _versions[database] = (version, time.monotonic())
+
+
+def read_curriculum_version(db: Session) -> int:
+    version = db.query(CurriculumMeta.version).filter(CurriculumMeta.id == 1).scalar()
+    remember_curriculum_version(version, database_key(db.get_bind()))
+    return version
+
+
+def cached_curriculum_version(database: Optional[str] = None) -> Optional[int]:
+    """The database's cached version if it is younger than CURRICULUM_VERSION_TTL, else None.
+
+    Defaults to the database serving the current request.
+    """
+    with _lock:
+        cached = _versions.get(database or database_key())
+    if cached is not None and time.monotonic() - cached[1] < CURRICULUM_VERSION_TTL:
+        return cached[0]
+    return None
+
+
+def current_curriculum_version() -> int:
+    version = cached_curriculum_version()
+    if version is not None:
+        return version
+    with db_session(READ) as db:
+        return read_curriculum_version(db)
+
+
+def invalidate_curriculum_version(db: Optional[Session] = None) -> None:
+    """Force the next lookup to hit the database, e.g. after this worker changed content.
+
+    With `db`, once that session commits: invalidating earlier would let a
+    concurrent request cache the old version again.
+    """
+    if db is not None:
+        event.listen(db, "after_commit", lambda session: invalidate_curriculum_version(), once=True)
+        return
+    with _lock:
+        for database, (version, _) in list(_versions.items()):
+            _versions[database] = (version, 0.0)
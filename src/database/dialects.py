@@ -0,0 +1,24 @@
+"""Expressions that differ between the central Postgres and SQLite edge nodes."""
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.database.services import IS_POSTGRES
+
+
+def in_values(column, name: str, values: list, item_type):
+    """`column` matches any of `values`.
+
+    On Postgres this is ``column = ANY(:name)`` with a single array
+    parameter, so the statement text (and its cached plan) is the same for
+    every list length. Other dialects get a plain expanding IN list.
+    """
+    if IS_POSTGRES:
+        return column == any_(bindparam(name, values, type_=ARRAY(item_type)))
+    return column.in_(values)
+
+
+def insert_or_ignore(model):
+    """``INSERT ... ON CONFLICT DO NOTHING`` into `model`'s table; both dialects support it."""
+    insert = postgresql.insert if IS_POSTGRES else sqlite.insert
+    return insert(model).on_conflict_do_nothing()
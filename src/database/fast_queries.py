@@ -0,0 +1,80 @@
+"""Pre-built Core statements for the hottest single-row lookups.
+
+`db.query(Model).filter(...).first()` builds a new statement, runs the ORM
+compile step and creates (or looks up) an identity-mapped instance on every
+call. The statements here are built once at import, select plain table
+columns with bound parameters, and come back as lightweight `Row` tuples
+with attribute access (``row.id``, ``row.email``). Their compiled form is
+reused from the engine's statement cache after the first execution.
+
+Rows are read-only snapshots: use the ORM when the result is going to be
+modified. See benchmarks/fast_queries.py for the per-call difference.
+"""
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from src.database.repository import Chapter, Student
+
+_students = Student.__table__
+_chapters = Chapter.__table__
+
+# everything but password_hash
+STUDENT_COLUMNS = tuple(c for c in _students.c if c.name != "password_hash")
+STUDENT_SUMMARY_COLUMNS = (_students.c.email, _students.c.phone, _students.c.id, _students.c.first_name, _students.c.standard)
+
+_LOOKUP_KEYS = (("student_id", _students.c.id), ("email", _students.c.email), ("phone", _students.c.phone))
+
+
+def _summary_statement(keys: frozenset):
+    return (
+        select(*STUDENT_SUMMARY_COLUMNS)
+        .where(and_(*(column == bindparam(key) for key, column in _LOOKUP_KEYS if key in keys)))
+        .limit(1)
+    )
+
+
+# one statement per combination of lookup keys given to /get_students
+_STUDENT_SUMMARY = {
+    frozenset(keys): _summary_statement(frozenset(keys))
+    for keys in (
+        {"student_id"},
+        {"email"},
+        {"phone"},
+        {"student_id", "email"},
+        {"student_id", "phone"},
+        {"email", "phone"},
+        {"student_id", "email", "phone"},
+    )
+}
+
+_STUDENT_FOR_TOKEN = select(*STUDENT_COLUMNS).where(
+    _students.c.id == bindparam("student_id"), _students.c.email == bindparam("email")
+)
+
+_CHAPTER_BY_ORDER = select(*_chapters.c).where(_chapters.c.order == bindparam("order")).limit(1)
+
+
+def student_summary(
+    db: Session, student_id: Optional[int] = None, email: Optional[str] = None, phone: Optional[str] = None
+) -> Optional[Row]:
+    """(email, phone, id, first_name, standard) of the student matching every given key."""
+    params = {
+        key: value
+        for key, value in (("student_id", student_id), ("email", email), ("phone", phone))
+        if value
+    }
+    if not params:
+        raise ValueError("student_summary needs student_id, email or phone")
+    return db.execute(_STUDENT_SUMMARY[frozenset(params)], params).first()
+
+
+def student_for_token(db: Session, student_id: int, email: str) -> Optional[Row]:
+    """The student a token was issued to, without password_hash."""
+    return db.execute(_STUDENT_FOR_TOKEN, {"student_id": student_id, "email": email}).first()
+
+
+def chapter_by_order(db: Session, order: int) -> Optional[Row]:
+    return db.execute(_CHAPTER_BY_ORDER, {"order": order}).first()
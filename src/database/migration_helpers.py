@@ -0,0 +1,229 @@
+"""Alembic helpers for changing large tables without blocking traffic (Postgres).
+
+A plain ``CREATE INDEX`` holds a SHARE lock on the table for the whole
+build, ``SET NOT NULL`` scans it under ACCESS EXCLUSIVE, and one
+``UPDATE``/``INSERT ... SELECT`` over millions of rows holds its row locks
+and bloats until it commits. These helpers avoid that:
+
+* `lock_timeout` -- DDL that cannot get its lock promptly fails instead of
+  queueing, since a waiting ACCESS EXCLUSIVE request blocks every query
+  behind it. Rerun the migration when the long transaction is gone.
+* `create_index_concurrently` / `drop_index_concurrently` -- build without
+  blocking writes; on a partitioned table the parent index is created
+  ``ON ONLY`` and each partition's index is built concurrently and attached.
+* `run_in_batches` / `backfill_column` -- keyset-paginated batches, each
+  committed on its own, with progress logging and a pause between batches.
+* `set_not_null` -- NOT VALID check constraint, VALIDATE (does not block
+  writes), then SET NOT NULL, which Postgres 12+ proves from the constraint.
+
+Everything that must run outside a transaction uses Alembic's
+``autocommit_block``, which commits the migration's work so far first.
+Helpers are idempotent, so an interrupted migration can simply be rerun.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+log = logging.getLogger("alembic.runtime.migration")
+
+DEFAULT_LOCK_TIMEOUT = "5s"
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_BATCH_PAUSE = 0.05  # seconds between batches, leaves room for replication and vacuum
+PROGRESS_EVERY = 10.0  # seconds between progress lines
+
+
+def _scalar(sql: str, **params):
+    return op.get_bind().execute(sa.text(sql), params).scalar()
+
+
+@contextmanager
+def lock_timeout(timeout: str = DEFAULT_LOCK_TIMEOUT):
+    """Limit how long statements in the block wait for a lock (transaction scoped)."""
+    previous = _scalar("SHOW lock_timeout")
+    _scalar("SELECT set_config('lock_timeout', :value, true)", value=timeout)
+    yield
+    _scalar("SELECT set_config('lock_timeout', :value, true)", value=previous)
+
+
+def _index_state(name: str) -> Optional[bool]:
+    """None if the index does not exist, else whether it is valid."""
+    return _scalar(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)",
+        name=name,
+    )
+
+
+def _partitions(table: str) -> list:
+    return [
+        row[0]
+        for row in op.get_bind().execute(
+            sa.text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+            ),
+            {"table": table},
+        )
+    ]
+
+
+def _build_concurrently(name: str, table: str, definition: str, unique: bool, timeout: str) -> None:
+    if _index_state(name) is False:
+        # left INVALID by an interrupted concurrent build
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.execute(f"SET lock_timeout = '{timeout}'")
+    op.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+    timeout: str = DEFAULT_LOCK_TIMEOUT,
+) -> None:
+    definition = f"({', '.join(columns)})" + (f" WHERE {where}" if where else "")
+    with op.get_context().autocommit_block():
+        try:
+            partitioned = _scalar("SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(:t AS regclass)", t=table)
+            if not partitioned:
+                _build_concurrently(name, table, definition, unique, timeout)
+                return
+
+            # CONCURRENTLY is not supported on a partitioned table: create the
+            # parent index (invalid, no build), then build and attach one per
+            # partition. The parent index becomes valid once all are attached.
+            op.execute(f"SET lock_timeout = '{timeout}'")
+            op.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}")
+            for partition in _partitions(table):
+                partition_index = f"{partition}_{name}"[:63]
+                _build_concurrently(partition_index, partition, definition, unique, timeout)
+                attached = _scalar(
+                    "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = CAST(:child AS regclass) "
+                    "AND inhparent = CAST(:parent AS regclass))",
+                    child=partition_index,
+                    parent=name,
+                )
+                if not attached:
+                    op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+        finally:
+            op.execute("RESET lock_timeout")
+
+
+def drop_index_concurrently(name: str, timeout: str = DEFAULT_LOCK_TIMEOUT) -> None:
+    with op.get_context().autocommit_block():
+        try:
+            op.execute(f"SET lock_timeout = '{timeout}'")
+            partitioned = _scalar("SELECT relkind = 'I' FROM pg_class WHERE relname = :name", name=name)
+            if partitioned:
+                # drops the attached partition indexes too; not supported CONCURRENTLY
+                op.execute(f"DROP INDEX IF EXISTS {name}")
+            else:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        finally:
+            op.execute("RESET lock_timeout")
+
+
+def run_in_batches(
+    statement: str,
+    start,
+    description: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause: float = DEFAULT_BATCH_PAUSE,
+    estimated_rows: Optional[int] = None,
+) -> int:
+    """Run `statement` repeatedly, each run committed on its own, until it returns no rows.
+
+    `statement` is bound with ``:after`` (the largest key returned by the
+    previous run; `start` for the first, e.g. 0 or '') and ``:batch_size``,
+    and must ``RETURNING`` the key of every row it processed. Returns the
+    number of rows processed.
+    """
+    query = sa.text(statement)
+    after, done = start, 0
+    started = last_report = time.monotonic()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            keys = [row[0] for row in bind.execute(query, {"after": after, "batch_size": batch_size})]
+            if not keys:
+                break
+            after = max(keys)
+            done += len(keys)
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_EVERY:
+                rate = done / (now - started)
+                of = f"/~{estimated_rows:,} ({100 * done / max(estimated_rows, 1):.1f}%)" if estimated_rows else ""
+                log.info(f"{description}: {done:,}{of} rows, {rate:,.0f} rows/s")
+                last_report = now
+            if pause:
+                time.sleep(pause)
+    log.info(f"{description}: done, {done:,} rows in {time.monotonic() - started:.1f}s")
+    return done
+
+
+def estimated_rows(table: str) -> int:
+    """Planner estimate of the table's row count (sum of partitions), without scanning it."""
+    return int(
+        _scalar(
+            "SELECT COALESCE(sum(GREATEST(c.reltuples, 0)), 0) FROM pg_class c "
+            "WHERE c.oid = CAST(:t AS regclass) "
+            "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:t AS regclass))",
+            t=table,
+        )
+    )
+
+
+def backfill_column(
+    table: str,
+    column: str,
+    value_sql: str,
+    key: str = "id",
+    start=0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause: float = DEFAULT_BATCH_PAUSE,
+) -> int:
+    """Set `column` to `value_sql` on rows where it is NULL, in keyset batches of `key`."""
+    return run_in_batches(
+        f"""
+        WITH batch AS (
+            SELECT {key} FROM {table}
+            WHERE {key} > :after AND {column} IS NULL
+            ORDER BY {key} LIMIT :batch_size
+        )
+        UPDATE {table} t SET {column} = {value_sql}
+        FROM batch WHERE t.{key} = batch.{key}
+        RETURNING t.{key}
+        """,
+        start,
+        f"backfill {table}.{column}",
+        batch_size=batch_size,
+        pause=pause,
+        estimated_rows=estimated_rows(table),
+    )
+
+
+def set_not_null(table: str, column: str, timeout: str = DEFAULT_LOCK_TIMEOUT) -> None:
+    """SET NOT NULL without holding ACCESS EXCLUSIVE for a full table scan."""
+    constraint = f"{table}_{column}_not_null"[:63]
+    with op.get_context().autocommit_block():
+        try:
+            op.execute(f"SET lock_timeout = '{timeout}'")
+            exists = _scalar(
+                "SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = :name "
+                "AND conrelid = CAST(:t AS regclass))",
+                name=constraint,
+                t=table,
+            )
+            if not exists:
+                op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}")
+        finally:
+            op.execute("RESET lock_timeout")
@@ -1,5 +1,7 @@
 from datetime import date
-# ...existing code...
+from typing import Any, Optional,List
+from pydantic import BaseModel,EmailStr, Field
+
 
 class DailyAnalyticsCreate(BaseModel):
     student_id: int
@@ -9,8 +11,6 @@ class DailyAnalyticsCreate(BaseModel):
     xp_earned: int = 0
     time_spent_minutes: int = 0
     streak_count: int = 0
-from typing import Any, Optional,List
-from pydantic import BaseModel,EmailStr, Field
 
 
 
@@ -83,3 +83,31 @@ class StudentCreateRequest(BaseModel):
 class StudentLoginRequest(BaseModel):
     email: EmailStr
     password: str
+
+
+class StudentBatchLookupRequest(BaseModel):
+    student_ids: List[int] = Field(default_factory=list)
+    emails: List[str] = Field(default_factory=list)
+    phones: List[str] = Field(default_factory=list)
+
+
+class QuizAnswerRequest(BaseModel):
+    question_id: int
+    selected_answer_index: int = Field(..., ge=0)
+    time_taken_seconds: Optional[int] = Field(default=None, ge=0)
+
+
+class QuizSheetAnswer(BaseModel):
+    question_id: int
+    selected_answer_index: int = Field(..., ge=0)
+    time_taken_seconds: Optional[int] = Field(default=None, ge=0)
+
+
+class QuizSheetRequest(BaseModel):
+    answers: List[QuizSheetAnswer] = Field(..., min_length=1)
+
+
+class LiveSessionCreateRequest(BaseModel):
+    chapter_id: str
+    # a subset of the chapter's questions, in this order; all of them by default
+    question_ids: List[int] = Field(default_factory=list)
@@ -0,0 +1,134 @@
+"""Monthly range partitions of quiz_submissions (see 20260115_partition_submissions)."""
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.configurations import logger
+from src.core.constants import PARTITION_MONTHS_AHEAD
+from src.database.services import engine
+
+PARENT_TABLE = "quiz_submissions"
+DEFAULT_PARTITION = "quiz_submissions_default"
+DETACH_LOCK_TIMEOUT = "5s"
+
+
+def month_floor(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def list_partitions(db: Session) -> List[str]:
+    return db.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+            ORDER BY child.relname
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars().all()
+
+
+def create_month_partition(db: Session, month: date) -> bool:
+    """Create the partition for `month` if missing. Returns True when it was created.
+
+    Rows already sitting in the DEFAULT partition for that month (written
+    before the partition existed) are moved into the new partition; Postgres
+    refuses to create it otherwise.
+    """
+    name = partition_name(month)
+    if name in list_partitions(db):
+        return False
+
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    bounds = {"lower": lower, "upper": upper}
+    stray = db.execute(
+        text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE submitted_at >= :lower AND submitted_at < :upper"),
+        bounds,
+    ).scalar()
+    if stray:
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        db.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+        )
+        db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE submitted_at >= :lower AND submitted_at < :upper RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        logger.warning(f"Moved {stray} rows from {DEFAULT_PARTITION} into {name}")
+    else:
+        db.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+        )
+    return True
+
+
+def ensure_future_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Create partitions from the current month through `months_ahead` months ahead."""
+    current = month_floor(datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_month_partition(db, month):
+            created.append(partition_name(month))
+    db.commit()
+    if created:
+        logger.info(f"Created quiz_submissions partitions: {', '.join(created)}")
+    return created
+
+
+def detach_month_partition(month: date, drop: bool = False, db: Optional[Session] = None) -> str:
+    """Detach (and optionally drop) a month's partition without a bulk DELETE.
+
+    DETACH is a catalog-only change, but it needs a short exclusive lock on
+    quiz_submissions (CONCURRENTLY is not allowed while a DEFAULT partition
+    exists), so it gives up after DETACH_LOCK_TIMEOUT instead of queueing
+    behind long transactions and blocking inserts. The detached table keeps
+    its data until dropped, e.g. after it has been archived. With `db` it
+    runs in that session's transaction and the caller commits.
+    """
+    name = partition_name(month)
+    statements = [
+        f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'",
+        f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}",
+    ]
+    if drop:
+        statements.append(f"DROP TABLE {name}")
+    if db is not None:
+        for statement in statements:
+            db.execute(text(statement))
+    else:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    logger.info(f"Detached partition {name}{' and dropped it' if drop else ''}")
+    return name
+
+
+def submitted_at_bounds(column, since: Optional[datetime] = None, until: Optional[datetime] = None) -> list:
+    """Filters on `submitted_at` that let the planner prune partitions outside [since, until)."""
+    conditions = []
+    if since is not None:
+        conditions.append(column >= since)
+    if until is not None:
+        conditions.append(column < until)
+    return conditions
@@ -2,11 +2,14 @@
 from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index, DateTime
 import sqlalchemy as sa
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from src.database.services import Base
 
+# JSONB on Postgres, JSON text on SQLite edge nodes
+JSONType = sa.JSON().with_variant(JSONB(), "postgresql")
+
 
 class Chapter(Base):
     __tablename__ = "chapters"
@@ -56,10 +59,8 @@ class Concept(Base):
     # many to one relationship with Topic
     topic = relationship("Topic", back_populates="concepts")
 
-    #   one to many relationship with Question
-    questions = relationship(
-        "Question", back_populates="concept", cascade="all, delete"
-    )
+    # Questions are no longer linked to concepts: 20251224_replace_questions
+    # recreated `questions` keyed by chapter_id, without a concept_id column.
 
 
 class Question(Base):
@@ -69,18 +70,48 @@ class Question(Base):
     quiz_id = Column(String(255), unique=True, nullable=False)
     chapter_id = Column(String(50), ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False)
     question_text = Column(Text, nullable=False)
-    options = Column(JSONB, nullable=False)
+    options = Column(JSONType, nullable=False)
     correct_answer_index = Column(Integer, nullable=False)
     explanation = Column(Text, nullable=True)
     image_url = Column(String(500), nullable=True)
     difficulty_level = Column(String(20), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
 
+    # written by the calibration job (src/analytics/calibration.py)
+    response_count = Column(Integer, nullable=True)
+    p_value = Column(sa.Numeric(5, 4), nullable=True)
+    irt_difficulty = Column(sa.Float, nullable=True)
+    irt_discrimination = Column(sa.Float, nullable=True)
+    calibrated_at = Column(DateTime, nullable=True)
+
     # relationship back to Chapter if needed
     chapter = relationship("Chapter", backref="questions")
 
+class School(Base):
+    """A tenant. Every student belongs to one; see DEFAULT_SCHOOL_ID."""
+
+    __tablename__ = "schools"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+# school_id is copied from the student onto quiz_submissions, student_progress
+# and daily_analytics so per-school queries use school-leading indexes. On
+# Postgres a BEFORE INSERT trigger fills it from students when an insert
+# leaves it out (20260120_school_tenants); the server default here is for
+# edge node SQLite databases, which serve a single school.
+def _school_id_column():
+    return Column(Integer, server_default=sa.text('1'), nullable=False)
+
+
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        Index('idx_students_phone', 'phone'),
+        Index('idx_students_school', 'school_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     first_name = Column(String(255), nullable=False)
@@ -92,6 +123,9 @@ class Student(Base):
     standard = Column(String(20))
     enrollment_date = Column(DateTime, server_default=func.now())
     password_hash = Column(String(255), nullable=False)
+    # references schools.id; the constraint is created by the migration only,
+    # edge nodes have no schools rows
+    school_id = Column(Integer, server_default=sa.text('1'), nullable=False)
 
     parent = relationship(
         "Parent",
@@ -120,7 +154,11 @@ class Parent(Base):
 
 
 class QuizSubmission(Base):
+    # Range partitioned by month on submitted_at (20260115_partition_submissions).
+    # The table's primary key is (id, submitted_at); ids come from one sequence
+    # and are unique on their own, so the ORM identity stays `id`.
     __tablename__ = "quiz_submissions"
+    __table_args__ = (Index('idx_quiz_submissions_school_time', 'school_id', 'submitted_at'),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
@@ -129,7 +167,12 @@ class QuizSubmission(Base):
     is_correct = Column(sa.Boolean(), nullable=False)
     xp_earned = Column(Integer, server_default=sa.text('0'), nullable=False)
     time_taken_seconds = Column(Integer, nullable=True)
-    submitted_at = Column(DateTime, server_default=func.now(), nullable=True)
+    submitted_at = Column(DateTime, server_default=func.now(), nullable=False)
+    school_id = _school_id_column()
+    # When the row reached this database (20260121_submission_received_at);
+    # incremental jobs watermark on it. Deferred: edge node SQLite files
+    # created before it do not have the column.
+    received_at = deferred(Column(DateTime, server_default=func.now(), nullable=False))
 
     # relationships
     student = relationship("Student", backref="quiz_submissions")
@@ -138,7 +181,10 @@ class QuizSubmission(Base):
 
 class StudentProgress(Base):
     __tablename__ = "student_progress"
-    __table_args__ = (sa.UniqueConstraint('student_id', 'chapter_id', name='uq_student_chapter'),)
+    __table_args__ = (
+        sa.UniqueConstraint('student_id', 'chapter_id', name='uq_student_chapter'),
+        Index('idx_student_progress_school_chapter', 'school_id', 'chapter_id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
@@ -147,6 +193,7 @@ class StudentProgress(Base):
     questions_completed = Column(Integer, server_default=sa.text('0'), nullable=False)
     questions_correct = Column(Integer, server_default=sa.text('0'), nullable=False)
     last_answered_at = Column(DateTime, nullable=True)
+    school_id = _school_id_column()
 
     student = relationship("Student", backref="progress")
     chapter = relationship("Chapter", backref="progress")
@@ -160,6 +207,7 @@ class DailyAnalytics(Base):
         UniqueConstraint('student_id', 'analytics_date', name='uq_student_analytics_date'),
         Index('idx_daily_analytics_student', 'student_id'),
         Index('idx_daily_analytics_date', 'analytics_date'),
+        Index('idx_daily_analytics_school_date', 'school_id', 'analytics_date'),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -169,4 +217,123 @@ class DailyAnalytics(Base):
     questions_correct = Column(Integer, server_default=sa.text('0'), nullable=False)
     xp_earned = Column(Integer, server_default=sa.text('0'), nullable=False)
     time_spent_minutes = Column(Integer, server_default=sa.text('0'), nullable=False)
-    streak_count = Column(Integer, server_default=sa.text('0'), nullable=False)
\ No newline at end of file
+    streak_count = Column(Integer, server_default=sa.text('0'), nullable=False)
+    school_id = _school_id_column()
+
+class CurriculumMeta(Base):
+    """Single row whose `version` is bumped by triggers on every curriculum table change."""
+
+    __tablename__ = "curriculum_meta"
+
+    id = Column(sa.SmallInteger, primary_key=True)
+    version = Column(sa.BigInteger, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class CurriculumChange(Base):
+    """One row per changed chapter / topic / concept / question, written by row triggers.
+
+    `version` comes from curriculum_version_seq (20260119_curriculum_changes);
+    op is I, U, D, or T for a TRUNCATE of the whole table.
+    """
+
+    __tablename__ = "curriculum_changes"
+    __table_args__ = (Index('idx_curriculum_changes_record', 'table_name', 'record_id'),)
+
+    version = Column(sa.BigInteger, primary_key=True, autoincrement=False)
+    table_name = Column(String(30), nullable=False)
+    record_id = Column(String(50), nullable=True)
+    op = Column(String(1), nullable=False)
+    changed_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class JobWatermark(Base):
+    """Last successful run of an incremental background job."""
+
+    __tablename__ = "job_watermarks"
+
+    job_name = Column(String(100), primary_key=True)
+    last_run_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class OutboxEvent(Base):
+    """Deferred work written in the same transaction as the change that caused it.
+
+    Consumed by src/background/worker.py; rows are deleted once handled and
+    kept with status 'dead' after OUTBOX_MAX_ATTEMPTS failures.
+    """
+
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index('idx_outbox_pending', 'available_at', 'id', postgresql_where=sa.text("status = 'pending'")),
+    )
+
+    id = Column(sa.BigInteger, primary_key=True, autoincrement=True)
+    topic = Column(String(100), nullable=False)
+    payload = Column(JSONType, nullable=False)
+    status = Column(String(20), server_default=sa.text("'pending'"), nullable=False)
+    attempts = Column(Integer, server_default=sa.text('0'), nullable=False)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, server_default=func.now(), nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class QuestionStats(Base):
+    """Running totals per question, maintained by src/analytics/aggregates.py."""
+
+    __tablename__ = "question_stats"
+    __table_args__ = (Index('idx_question_stats_chapter', 'chapter_id'),)
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    chapter_id = Column(String(50), ForeignKey("chapters.id", ondelete="CASCADE"), nullable=False)
+    attempts = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    correct = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    timed_attempts = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    total_time_seconds = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    last_submission_at = Column(DateTime, nullable=True)
+
+
+class ChapterStats(Base):
+    """Per chapter roll-up of question_stats plus student_progress."""
+
+    __tablename__ = "chapter_stats"
+
+    chapter_id = Column(String(50), ForeignKey("chapters.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    correct = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    timed_attempts = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    total_time_seconds = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    students = Column(Integer, server_default=sa.text('0'), nullable=False)
+    avg_mastery_score = Column(sa.Numeric(5, 2), nullable=True)
+    last_submission_at = Column(DateTime, nullable=True)
+
+
+class EdgeNode(Base):
+    """Sync position of an offline-capable edge node (src/edge).
+
+    On the central server there is one row per node: the highest local
+    submission id received from it, the SHA-256 of the node's sync token and
+    the instance id of the node database those ids belong to. On an edge
+    node the single row for itself holds the highest local id the central
+    server has acknowledged and its own instance id, generated when the
+    SQLite file is created.
+    """
+
+    __tablename__ = "edge_nodes"
+
+    node_id = Column(String(100), primary_key=True)
+    last_submission_id = Column(sa.BigInteger, server_default=sa.text('0'), nullable=False)
+    last_synced_at = Column(DateTime, nullable=True)
+    # central server only; deferred so edge node files created before it still load
+    token_hash = deferred(Column(String(64), nullable=True))
+    instance_id = Column(String(36), nullable=True)
+
+
+class EdgeNodeStudent(Base):
+    """Students served by an edge node; only these are sent to it (central server only)."""
+
+    __tablename__ = "edge_node_students"
+
+    node_id = Column(String(100), ForeignKey("edge_nodes.node_id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
@@ -1,10 +1,22 @@
+import itertools
+import os
+import threading
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Annotated, Iterator, Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event, orm, text
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
+from src.core.configurations import logger
+from src.core.constants import SLOW_QUERY_THRESHOLD_MS
+from src.core.metrics import metrics
+from src.database.slow_queries import record_slow_query
+
 # Database configuration
 RDS_DB_USERNAME = ""
 RDS_DB_PASSWORD = "root"
@@ -12,23 +24,282 @@ RDS_DB_PORT = "5432"
 RDS_DB_NAME = ""
 RDS_DB_HOST = "localhost"
 
+# Comma separated read replica hosts, e.g. "replica-1,replica-2". Empty means
+# every read goes to the primary.
+RDS_DB_REPLICA_HOSTS = [
+    host.strip() for host in os.getenv("RDS_DB_REPLICA_HOSTS", "").split(",") if host.strip()
+]
+REPLICA_HEALTH_CHECK_INTERVAL = 5  # seconds between probes of the same replica
+REPLICA_CONNECT_TIMEOUT = 2  # seconds
+
+# Schools with a database of their own, as school_id=host pairs, e.g.
+# "12=school-12-db,40=school-40-db" (same credentials and database name as
+# the primary). Their requests and background work use that database, never
+# a replica; every other school shares the primary. `alembic upgrade head`
+# migrates each of them along with the primary, and the API process copies
+# the curriculum into them from the primary (src/database/tenants.py).
+RDS_TENANT_DB_HOSTS = {
+    int(school_id): host.strip()
+    for school_id, _, host in (
+        pair.partition("=") for pair in os.getenv("EDU_TENANT_DB_HOSTS", "").split(",") if pair.strip()
+    )
+}
+
+# Session intents accepted by `db_session`
+READ = "read"
+WRITE = "write"
+
+# Edge node mode: set to a file path to run against a local SQLite database
+# instead of the central Postgres (see src/edge/node.py). Replicas are ignored.
+EDGE_DB_PATH = os.getenv("EDU_EDGE_DB_PATH", "")
+IS_EDGE = bool(EDGE_DB_PATH)
+
 # Construct the connection URL
-db_url = f"postgresql://{RDS_DB_USERNAME}:{RDS_DB_PASSWORD}@{RDS_DB_HOST}/{RDS_DB_NAME}"
+if IS_EDGE:
+    db_url = f"sqlite:///{EDGE_DB_PATH}"
+    engine = create_engine(db_url, connect_args={"check_same_thread": False, "timeout": 30})
+    RDS_DB_REPLICA_HOSTS = []
+    RDS_TENANT_DB_HOSTS = {}
+else:
+    db_url = f"postgresql://{RDS_DB_USERNAME}:{RDS_DB_PASSWORD}@{RDS_DB_HOST}/{RDS_DB_NAME}"
+    engine = create_engine(db_url)
+IS_POSTGRES = engine.dialect.name == "postgresql"
+tenant_db_urls = {
+    school_id: f"postgresql://{RDS_DB_USERNAME}:{RDS_DB_PASSWORD}@{host}/{RDS_DB_NAME}"
+    for school_id, host in RDS_TENANT_DB_HOSTS.items()
+}
+
+replica_engines = [
+    create_engine(
+        f"postgresql://{RDS_DB_USERNAME}:{RDS_DB_PASSWORD}@{host}/{RDS_DB_NAME}",
+        connect_args={"connect_timeout": REPLICA_CONNECT_TIMEOUT},
+    )
+    for host in RDS_DB_REPLICA_HOSTS
+]
+tenant_engines = {school_id: create_engine(url) for school_id, url in tenant_db_urls.items()}
 
-engine = create_engine(db_url)
+if IS_EDGE:
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while the sync job or a submission writes
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+# Per-request mutable state. `RequestContextMiddleware` installs a fresh dict
+# for every request; it is mutated rather than replaced so that changes made in
+# threadpool workers (sync endpoints) are visible to the rest of the request.
+request_state: ContextVar[Optional[dict]] = ContextVar("request_state", default=None)
+
+
+def begin_request_scope(scope: Optional[dict] = None, school_id: Optional[int] = None):
+    return request_state.set({"wrote": False, "scope": scope, "checkouts": 0, "school_id": school_id})
+
+
+def end_request_scope(token) -> None:
+    state = request_state.get()
+    if state is not None and state["scope"] is not None:
+        metrics.observe("db_checkouts_per_request", state["checkouts"], route=current_route())
+    request_state.reset(token)
+
+
+def current_school() -> Optional[int]:
+    """School (tenant) of the request or background task being served, if known."""
+    state = request_state.get()
+    return state["school_id"] if state is not None else None
+
+
+@contextmanager
+def tenant_scope(school_id: Optional[int]):
+    """Run background work for `school_id`: `db_session` calls in the block,
+    and asyncio tasks created in it, use that school's database."""
+    token = begin_request_scope(None, school_id)
+    try:
+        yield
+    finally:
+        request_state.reset(token)
+
+
+PRIMARY_DATABASE = "primary"
+_tenant_database_keys = {id(tenant_engine): f"school-{school_id}" for school_id, tenant_engine in tenant_engines.items()}
+
+
+def database_key(bind=None) -> str:
+    """The database holding the data, for keying process-wide caches of its content.
+
+    "primary" covers the primary and its replicas; a school with a database
+    of its own is "school-<id>". Without `bind` (an engine), the database
+    serving the current request or background task. Ids, curriculum
+    versions and content all differ between databases, so a cache keyed
+    without this would serve one school's rows to another.
+    """
+    if bind is not None:
+        return _tenant_database_keys.get(id(bind), PRIMARY_DATABASE)
+    school_id = current_school()
+    return f"school-{school_id}" if school_id in tenant_engines else PRIMARY_DATABASE
+
+
+def current_route() -> str:
+    """Method and route template of the request being served, or "background"."""
+    state = request_state.get()
+    scope = state.get("scope") if state is not None else None
+    if scope is None:
+        return "background"
+    # FastAPI stores the matched route in the (shared) scope once routing is done
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._query_started = time.perf_counter()
+
+
+def _observe_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed_ms = (time.perf_counter() - context._query_started) * 1000
+    school_id = current_school()
+    metrics.observe("db_query_ms", elapsed_ms, school=school_id if school_id is not None else "none")
+    if 0 < SLOW_QUERY_THRESHOLD_MS <= elapsed_ms:
+        record_slow_query(conn.engine, statement, parameters, executemany, elapsed_ms, current_route())
+
+
+# Query latency per school as `db_query_ms{school}`, and the slow query log
+# (src/database/slow_queries.py; EDU_SLOW_QUERY_MS=0 turns it off).
+for _engine in (engine, *replica_engines, *tenant_engines.values()):
+    event.listen(_engine, "before_cursor_execute", _start_timer)
+    event.listen(_engine, "after_cursor_execute", _observe_query)
+
+
+def _count_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    state = request_state.get()
+    if state is not None:
+        state["checkouts"] += 1
+
+
+# pool checkouts per request, observed as `db_checkouts_per_request` by route
+for _engine in (engine, *replica_engines, *tenant_engines.values()):
+    event.listen(_engine, "checkout", _count_checkout)
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas, falling back to the primary.
+
+    Schools in `tenants` (school_id -> engine) are always sent to their own
+    database; the school comes from the caller or the request (see
+    `current_school`). Replicas are probed with ``SELECT 1`` at most once per
+    ``check_interval`` seconds; a replica that fails a probe or raises a
+    connection error mid-session is skipped until its next successful probe.
+    """
+
+    def __init__(self, primary, replicas, check_interval: float, tenants: Optional[dict] = None):
+        self.primary = primary
+        self.replicas = replicas
+        self.tenants = tenants or {}
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self._status = {id(replica): (True, 0.0) for replica in replicas}
+
+    def mark_down(self, replica) -> None:
+        with self._lock:
+            self._status[id(replica)] = (False, time.monotonic())
+        logger.warning(f"Replica {replica.url.host} marked unhealthy")
+
+    def _is_healthy(self, replica) -> bool:
+        with self._lock:
+            healthy, checked_at = self._status[id(replica)]
+        if time.monotonic() - checked_at < self.check_interval:
+            return healthy
+        try:
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            healthy = True
+        except SQLAlchemyError as e:
+            logger.warning(f"Replica {replica.url.host} health check failed: {e}")
+            healthy = False
+        with self._lock:
+            self._status[id(replica)] = (healthy, time.monotonic())
+        return healthy
+
+    def engine_for(self, intent: str, school_id: Optional[int] = None):
+        dedicated = self.tenants.get(school_id if school_id is not None else current_school())
+        if dedicated is not None:
+            return dedicated
+        if intent != READ or not self.replicas:
+            return self.primary
+        state = request_state.get()
+        if state is not None and state["wrote"]:
+            # read-your-writes: replicas may not have this request's changes yet
+            return self.primary
+        with self._lock:
+            candidates = [next(self._cycle) for _ in self.replicas]
+        for replica in candidates:
+            if self._is_healthy(replica):
+                return replica
+        return self.primary
+
+
+router = ReplicaRouter(engine, replica_engines, REPLICA_HEALTH_CHECK_INTERVAL, tenant_engines)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session) -> None:
+    state = request_state.get()
+    if state is not None and session.get_bind() is engine:
+        state["wrote"] = True
+
 
 @contextmanager
-def db_session() -> Session:
-    session = Session()
+def db_session(intent: str = WRITE, school_id: Optional[int] = None) -> Session:
+    bind = router.engine_for(intent, school_id)
+    session = Session(bind=bind)
     try:
         # Schema creation is handled via Alembic migrations.
         # Do not call `Base.metadata.create_all()` here so migrations manage DDL.
         yield session
     except SQLAlchemyError as e:
         session.rollback()
+        if isinstance(e, OperationalError) and bind in router.replicas:
+            router.mark_down(bind)
         raise e
     finally:
         session.close()
+
+
+def get_db(request: Request) -> Iterator[orm.Session]:
+    """FastAPI dependency: the request's unit of work. Use it through `RequestSession`.
+
+    Every dependency and the handler of one request share this session, so
+    authentication and the handler's own queries use a single connection.
+    Nothing is checked out of the pool until the first query; GET and HEAD
+    requests read from a replica, others use the primary, and a school with
+    its own database always uses that. The transaction is
+    committed once, after the handler returns and before the response is
+    sent (a failed commit still becomes an error response), and rolled back
+    if anything raises. Handlers that turn an error into a response
+    themselves must roll back before returning it.
+    """
+    bind = router.engine_for(READ if request.method in ("GET", "HEAD") else WRITE)
+    session = Session(bind=bind)
+    try:
+        yield session
+        if session.in_transaction():
+            session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        if isinstance(e, OperationalError) and bind in router.replicas:
+            router.mark_down(bind)
+        raise e
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+# scope="function": commit before the response is sent, not after
+RequestSession = Annotated[orm.Session, Depends(get_db, scope="function")]
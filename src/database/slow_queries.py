@@ -0,0 +1,250 @@
+"""Slow query log.
+
+The engine hooks in src/database/services.py call `record_slow_query` for
+every statement slower than SLOW_QUERY_THRESHOLD_MS. Each is written as one
+JSON line to SLOW_QUERY_LOG_FILE (rotated by size) with the route that ran
+it, the shape of its parameters (names, types and list lengths, never
+values) and its duration.
+
+A sample of slow SELECTs is re-run under ``EXPLAIN (ANALYZE, BUFFERS)`` on
+a background thread, with the original parameters and a statement_timeout,
+inside a transaction that is rolled back. EXPLAIN ANALYZE executes the
+statement, and a rollback does not undo everything a function can do
+(advisory locks, sequences, dblink), so only SELECTs that take no row
+locks and call nothing outside SAFE_FUNCTIONS are re-run. The request that was slow is not
+delayed, and one statement is explained at most once per
+SLOW_QUERY_EXPLAIN_INTERVAL. Plans are written as separate lines that
+refer to the record's id; `read_slow_queries` joins them back for
+/admin/slow_queries.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+from src.core.configurations import logger
+from src.core.constants import (
+    SLOW_QUERY_EXPLAIN_INTERVAL,
+    SLOW_QUERY_EXPLAIN_QUEUE,
+    SLOW_QUERY_EXPLAIN_SAMPLE,
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS,
+    SLOW_QUERY_LOG_BACKUPS,
+    SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_LOG_MAX_BYTES,
+)
+from src.core.metrics import metrics
+
+MAX_STATEMENT_CHARS = 10_000  # longer statements (multi-row INSERTs) are cut
+
+_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_LOCKING = re.compile(r"\bFOR\s+(?:UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_CALL = re.compile(r'([A-Za-z_][\w.$]*|"[^"]*")\s*\(')
+# words that are followed by a parenthesis without being a function call
+_KEYWORDS = frozenset(
+    """
+    select from where and or not in any all some exists values as on using join lateral over filter
+    group by when then else union intersect except array row cast interval
+    numeric decimal varchar char character timestamp time
+    """.split()
+)
+# functions without side effects; a SELECT calling anything else is not re-run
+SAFE_FUNCTIONS = frozenset(
+    """
+    count sum avg min max bool_and bool_or every array_agg string_agg json_agg jsonb_agg
+    stddev stddev_samp stddev_pop variance var_samp var_pop percentile_cont percentile_disc mode
+    row_number rank dense_rank percent_rank cume_dist ntile lag lead first_value last_value nth_value
+    coalesce nullif greatest least abs round floor ceil ceiling trunc sqrt power ln log exp sign mod div
+    lower upper length char_length substring substr trim btrim ltrim rtrim left right position strpos
+    concat concat_ws replace split_part to_char to_number to_date to_timestamp format md5
+    date_trunc date_part extract age make_interval now
+    array_length array_position cardinality unnest generate_series
+    json_build_object jsonb_build_object jsonb_array_length jsonb_array_elements jsonb_extract_path_text
+    """.split()
+)
+
+
+def explainable(statement: str) -> bool:
+    """Whether re-running `statement` under EXPLAIN ANALYZE can have no lasting effect."""
+    if not _SELECT.match(statement) or _LOCKING.search(statement):
+        return False
+    calls = _CALL.findall(_STRING_LITERAL.sub("''", statement))
+    return all(name.lower() in _KEYWORDS or name.lower() in SAFE_FUNCTIONS for name in calls)
+
+
+def _build_log() -> logging.Logger:
+    os.makedirs(os.path.dirname(SLOW_QUERY_LOG_FILE), exist_ok=True)
+    log = logging.getLogger("edu.slow_queries")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    handler = RotatingFileHandler(
+        SLOW_QUERY_LOG_FILE, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    return log
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def _write(entry: dict) -> None:
+    global _log
+    if _log is None:
+        # built on the first slow query, so importing this module creates no files
+        with _log_lock:
+            if _log is None:
+                _log = _build_log()
+    _log.info(json.dumps(entry, default=str))
+
+
+def _shape(value):
+    if isinstance(value, (list, tuple)):
+        types = "|".join(sorted({type(item).__name__ for item in value}))
+        return f"{type(value).__name__}[{types}]({len(value)})"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Names and types of the bound parameters, without their values."""
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "each": parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_shape(value) for value in parameters]
+    return None
+
+
+def _explain(engine, statement: str, parameters):
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SET LOCAL statement_timeout = {int(SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0]
+        cursor.close()
+        return plan
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+class _Explainer:
+    """One daemon thread running sampled EXPLAINs from a bounded queue."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=SLOW_QUERY_EXPLAIN_QUEUE)
+        self._lock = threading.Lock()
+        self._last_queued = {}  # fingerprint -> monotonic time
+        self._thread = None
+
+    def wanted(self, engine, statement: str, fingerprint: str) -> bool:
+        if engine.dialect.name != "postgresql" or not explainable(statement):
+            return False
+        if random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_queued.get(fingerprint)
+            if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL:
+                return False
+            if len(self._last_queued) > 10_000:
+                self._last_queued = {
+                    key: at for key, at in self._last_queued.items() if now - at < SLOW_QUERY_EXPLAIN_INTERVAL
+                }
+            self._last_queued[fingerprint] = now
+        return True
+
+    def submit(self, record_id: str, engine, statement: str, parameters) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((record_id, engine, statement, parameters))
+        except queue.Full:
+            _write({"type": "explain", "id": record_id, "error": "explain queue full"})
+            metrics.inc("slow_query_explains_total", outcome="dropped")
+
+    def _run(self) -> None:
+        while True:
+            record_id, engine, statement, parameters = self._queue.get()
+            try:
+                plan = _explain(engine, statement, parameters)
+                _write({"type": "explain", "id": record_id, "plan": plan})
+                metrics.inc("slow_query_explains_total", outcome="ok")
+            except Exception as e:
+                _write({"type": "explain", "id": record_id, "error": f"{type(e).__name__}: {e}"})
+                metrics.inc("slow_query_explains_total", outcome="error")
+                logger.warning(f"EXPLAIN of slow query {record_id} failed: {e}")
+
+
+_explainer = _Explainer()
+
+
+def record_slow_query(engine, statement: str, parameters, executemany: bool, duration_ms: float, route: str) -> None:
+    fingerprint = hashlib.sha1(statement.encode()).hexdigest()[:16]
+    record_id = uuid.uuid4().hex[:16]
+    explain = not executemany and _explainer.wanted(engine, statement, fingerprint)
+    _write(
+        {
+            "type": "query",
+            "id": record_id,
+            "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "route": route,
+            "duration_ms": round(duration_ms, 2),
+            "database": engine.url.host or engine.url.database,
+            "fingerprint": fingerprint,
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "parameters": parameter_shape(parameters, executemany),
+            "explain": "pending" if explain else None,
+        }
+    )
+    metrics.inc("slow_queries_total", route=route)
+    if explain:
+        # queued after the record is written, so its plan always follows it in the file
+        _explainer.submit(record_id, engine, statement, parameters)
+
+
+def read_slow_queries(route: Optional[str] = None, min_ms: float = 0, limit: int = 100) -> list:
+    """Newest first, from the current log file and its rotated backups, with any captured plan."""
+    paths = [SLOW_QUERY_LOG_FILE] + [f"{SLOW_QUERY_LOG_FILE}.{i}" for i in range(1, SLOW_QUERY_LOG_BACKUPS + 1)]
+    plans, records = {}, []
+    for path in paths:
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            continue
+        # a plan is always written after its query, so it is seen first here
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # line being written by another process
+            if entry.get("type") == "explain":
+                plans[entry["id"]] = entry
+            elif (route is None or entry["route"] == route) and entry["duration_ms"] >= min_ms:
+                records.append(entry)
+                if len(records) >= limit:
+                    break
+        if len(records) >= limit:
+            break
+
+    for record in records:
+        plan = plans.get(record["id"])
+        if plan is not None:
+            record["explain"] = plan.get("plan") or {"error": plan.get("error")}
+    return records
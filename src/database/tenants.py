@@ -0,0 +1,114 @@
+"""Schools with a database of their own (EDU_TENANT_DB_HOSTS).
+
+The earliest migrations assume tables that predate them, so a new school
+database starts from a copy of the primary's schema and its two bookkeeping
+rows, before the school is added to EDU_TENANT_DB_HOSTS:
+
+    pg_dump --schema-only --no-owner $PRIMARY | psql $SCHOOL_DB
+    pg_dump --data-only -t alembic_version -t curriculum_meta $PRIMARY | psql $SCHOOL_DB
+
+From then on `alembic upgrade head` migrates it along with the primary (see
+alembic/env.py). Curriculum is edited on the primary only; `mirror_curriculum`
+copies chapters, topics, concepts and questions into each school database,
+along with the school's own schools row, which its students reference. Only
+rows that differ are written, so the school database's triggers bump its
+own curriculum version and change log for real changes only. Question
+columns written by the calibration job are left alone: every database
+calibrates against its own submissions.
+
+The API process mirrors at startup and then every
+TENANT_CURRICULUM_SYNC_INTERVAL seconds, skipping databases that already
+have the primary's current version. A school that already has students on
+the primary must have them moved before it is given its own database; this
+module does not move them.
+"""
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from src.core.configurations import logger
+from src.database.curriculum_changes import MODELS
+from src.database.curriculum_version import invalidate_curriculum_version, read_curriculum_version
+from src.database.repository import School, Student
+from src.database.services import READ, db_session, tenant_engines
+
+# written per database by src/analytics/calibration.py
+LOCAL_COLUMNS = {
+    "questions": {
+        "difficulty_level", "response_count", "p_value", "irt_difficulty", "irt_discrimination", "calibrated_at"
+    },
+}
+
+# school_id -> primary curriculum version last copied into its database
+_mirrored: Dict[int, int] = {}
+
+
+def _values(model, row) -> dict:
+    skip = LOCAL_COLUMNS.get(model.__tablename__, ())
+    return {column.key: getattr(row, column.key) for column in model.__table__.columns if column.name not in skip}
+
+
+def _mirror_table(source: Session, target: Session, model) -> int:
+    wanted = {row.id: _values(model, row) for row in source.query(model)}
+    written = 0
+    for row in target.query(model):
+        values = wanted.pop(row.id, None)
+        if values is not None and values != _values(model, row):
+            for key, value in values.items():
+                setattr(row, key, value)
+            written += 1
+    for values in wanted.values():
+        target.add(model(**values))
+        written += 1
+    return written
+
+
+def mirror_curriculum(source: Session, target: Session, school_id: int) -> int:
+    """Make `target`'s curriculum match `source`'s. Commits `target`; returns rows written or deleted."""
+    written = 0
+    school = source.get(School, school_id)
+    if school is not None:
+        target.merge(School(id=school.id, name=school.name, created_at=school.created_at))
+    # children first, so cascades never reach rows that are kept
+    for model in reversed(MODELS.values()):
+        ids = {row_id for (row_id,) in source.query(model.id)}
+        stale = [row_id for (row_id,) in target.query(model.id) if row_id not in ids]
+        if stale:
+            target.query(model).filter(model.id.in_(stale)).delete(synchronize_session=False)
+            written += len(stale)
+    for model in MODELS.values():
+        written += _mirror_table(source, target, model)
+        target.flush()
+    target.commit()
+    return written
+
+
+def mirror_all_curricula() -> None:
+    """Copy the primary's curriculum into every school database that is behind it."""
+    if not tenant_engines:
+        return
+    with db_session(READ) as source:
+        version = read_curriculum_version(source)
+        behind = [school_id for school_id in tenant_engines if _mirrored.get(school_id) != version]
+        for school_id in behind:
+            try:
+                with db_session(school_id=school_id) as target:
+                    written = mirror_curriculum(source, target, school_id)
+            except Exception as e:
+                # the school's database is unreachable; retried on the next run
+                logger.error(f"Could not copy the curriculum to school {school_id}'s database: {e}")
+                continue
+            _mirrored[school_id] = version
+            if written:
+                invalidate_curriculum_version()
+                logger.info(f"Copied curriculum version {version} to school {school_id}'s database ({written} rows)")
+
+
+def find_student_by_email(email: str) -> Optional[Student]:
+    """The student with `email` in any school database, for logins that do not name a school."""
+    for school_id in tenant_engines:
+        with db_session(READ, school_id=school_id) as db:
+            student = db.query(Student).filter(Student.email == email).first()
+        if student is not None:
+            return student
+    return None
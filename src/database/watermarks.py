@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database.repository import JobWatermark
+
+
+def get_watermark(db: Session, job_name: str) -> Optional[datetime]:
+    return db.query(JobWatermark.last_run_at).filter(JobWatermark.job_name == job_name).scalar()
+
+
+def set_watermark(db: Session, job_name: str, last_run_at: datetime) -> None:
+    """Upsert the job's watermark. Written in the caller's transaction."""
+    stmt = insert(JobWatermark.__table__).values(job_name=job_name, last_run_at=last_run_at)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["job_name"],
+            set_={"last_run_at": stmt.excluded.last_run_at, "updated_at": datetime.utcnow()},
+        )
+    )
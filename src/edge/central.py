@@ -0,0 +1,198 @@
+"""Central side of edge sync: apply a node's pushed submissions and build its pull.
+
+Progress counters are never copied from a node. Newly received
+submissions are replayed into student_progress (`apply_answers`), which
+increments questions_completed / questions_correct, so answers given
+offline on any number of nodes and online all add up instead of
+overwriting each other. As online, only a student's first answer to a
+question earns XP and counts: a pushed answer to a question the student
+already answered, here or on another node, is stored with xp_earned 0 and
+not replayed. Mastery is a sequential BKT update, so replaying late
+arrivals is an approximation until the next full `recompute_mastery`.
+
+Nodes push submissions in local id order; the central server keeps the
+highest id received per node (edge_nodes) in the same transaction as the
+inserts, so a retried push is never applied twice. Local ids only grow
+within one node database: every push carries the node's instance id, and
+a node whose SQLite file was replaced (new instance id) starts again from
+local id 0 instead of having its new submissions dropped as already seen.
+
+Each node authenticates with its own token and is sent only the students
+assigned to it. Register a node, or change its students, with
+``python -m src.edge.central <node_id> --students 12,13,14``; the token is
+printed once, when the node is created or with ``--new-token``.
+"""
+import hashlib
+import hmac
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Integer, select
+from sqlalchemy.orm import Session
+
+from src.analytics.mastery import answered_pairs, apply_answers, lock_progress_many
+from src.core.configurations import logger
+from src.core.constants import EDGE_CURRICULUM_PAGE, QUIZ_XP_PER_CORRECT
+from src.core.metrics import metrics
+from src.database.curriculum_changes import read_changes
+from src.database.dialects import in_values
+from src.database.repository import EdgeNode, EdgeNodeStudent, Question, QuizSubmission, Student, StudentProgress
+from src.edge.payloads import dict_to_values, row_to_dict
+
+SUBMISSION_FIELDS = (
+    "student_id",
+    "question_id",
+    "selected_answer_index",
+    "is_correct",
+    "xp_earned",
+    "time_taken_seconds",
+    "submitted_at",
+)
+# sent so students can log in while the node is offline
+STUDENT_FIELDS = (
+    "id", "first_name", "last_name", "age", "phone", "email", "gender", "standard", "password_hash", "school_id"
+)
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def authenticate_node(db: Session, node_id: str, token: str) -> bool:
+    """Whether `token` is the registered sync token of `node_id`."""
+    token_hash = db.execute(select(EdgeNode.token_hash).where(EdgeNode.node_id == node_id)).scalar()
+    return bool(token_hash) and hmac.compare_digest(_hash_token(token), token_hash)
+
+
+def register_node(db: Session, node_id: str, student_ids: Optional[list] = None, new_token: bool = False):
+    """Create or update a node and its student assignments. Returns a new token, if one was issued. Commits."""
+    node = db.get(EdgeNode, node_id)
+    token = None
+    if node is None:
+        node = EdgeNode(node_id=node_id, last_submission_id=0)
+        db.add(node)
+    if new_token or node.token_hash is None:
+        token = secrets.token_urlsafe(32)
+        node.token_hash = _hash_token(token)
+    if student_ids is not None:
+        db.flush()
+        db.query(EdgeNodeStudent).filter(EdgeNodeStudent.node_id == node_id).delete(synchronize_session=False)
+        db.add_all(EdgeNodeStudent(node_id=node_id, student_id=student_id) for student_id in set(student_ids))
+    db.commit()
+    return token
+
+
+def apply_push(db: Session, node_id: str, instance_id: str, submissions: list) -> dict:
+    """Insert the node's new submissions and replay them into student_progress. Commits."""
+    node = db.query(EdgeNode).filter(EdgeNode.node_id == node_id).with_for_update().one()
+    if node.instance_id != instance_id:
+        if node.instance_id is not None:
+            # the node database was replaced; its local ids start over
+            logger.warning(
+                f"Edge node {node_id}: new instance {instance_id} (was {node.instance_id}, "
+                f"acknowledged up to {node.last_submission_id}); restarting from local id 0"
+            )
+            metrics.inc("edge_node_resets_total")
+        node.instance_id = instance_id
+        node.last_submission_id = 0
+
+    fresh = sorted(
+        (s for s in submissions if s["local_id"] > node.last_submission_id), key=lambda s: s["local_id"]
+    )
+    question_ids = list({s["question_id"] for s in fresh})
+    student_ids = list({s["student_id"] for s in fresh})
+    chapters = dict(
+        db.query(Question.id, Question.chapter_id)
+        .filter(in_values(Question.id, "question_ids", question_ids, Integer))
+        .all()
+    ) if fresh else {}
+    known_students = set(
+        db.execute(
+            select(EdgeNodeStudent.student_id).where(
+                EdgeNodeStudent.node_id == node_id,
+                in_values(EdgeNodeStudent.student_id, "student_ids", student_ids, Integer),
+            )
+        ).scalars()
+    ) if fresh else set()
+
+    rejected = 0
+    rows = []
+    for submission in fresh:
+        if submission["question_id"] not in chapters or submission["student_id"] not in known_students:
+            # deleted centrally, or unassigned from the node, since it last synced
+            rejected += 1
+            continue
+        rows.append(dict_to_values(QuizSubmission, {f: submission.get(f) for f in SUBMISSION_FIELDS}))
+    rows.sort(key=lambda r: r["submitted_at"])
+
+    progress = lock_progress_many(db, {(r["student_id"], chapters[r["question_id"]]) for r in rows})
+    answered = answered_pairs(db, {(r["student_id"], r["question_id"]) for r in rows})
+    by_progress = {}
+    for row in rows:
+        pair = (row["student_id"], row["question_id"])
+        first_attempt = pair not in answered
+        answered.add(pair)
+        row["xp_earned"] = QUIZ_XP_PER_CORRECT if row["is_correct"] and first_attempt else 0
+        if first_attempt:
+            by_progress.setdefault((row["student_id"], chapters[row["question_id"]]), []).append(row)
+    if rows:
+        db.bulk_insert_mappings(QuizSubmission, rows)
+    for key, group in by_progress.items():
+        apply_answers(db, progress[key], [r["is_correct"] for r in group], group[-1]["submitted_at"])
+    accepted = len(rows)
+
+    if fresh:
+        node.last_submission_id = fresh[-1]["local_id"]
+    node.last_synced_at = datetime.utcnow()
+    acknowledged = node.last_submission_id
+    db.commit()
+    if fresh:
+        logger.info(f"Edge node {node_id}: accepted {accepted}, rejected {rejected} submissions")
+    return {"acknowledged_submission_id": acknowledged, "accepted": accepted, "rejected": rejected}
+
+
+def build_pull(db: Session, node_id: str, curriculum_version: int) -> dict:
+    """Curriculum changes after the node's version, plus the node's assigned students and their progress."""
+    changes = read_changes(db, curriculum_version or 0, EDGE_CURRICULUM_PAGE)
+    pull = {
+        "curriculum_version": changes["version"],
+        "curriculum": {
+            "has_more": changes["has_more"],
+            "truncated": changes["truncated"],
+            "deletes": changes["deletes"],
+            "upserts": {table: [row_to_dict(row) for row in rows] for table, rows in changes["upserts"].items()},
+        },
+        "students": [],
+        "progress": [],
+    }
+    student_ids = db.execute(
+        select(EdgeNodeStudent.student_id).where(EdgeNodeStudent.node_id == node_id)
+    ).scalars().all()
+    if student_ids:
+        students = db.query(Student).filter(in_values(Student.id, "student_ids", student_ids, Integer)).all()
+        pull["students"] = [{f: getattr(s, f) for f in STUDENT_FIELDS} for s in students]
+        progress = (
+            db.query(StudentProgress)
+            .filter(in_values(StudentProgress.student_id, "student_ids", student_ids, Integer))
+            .all()
+        )
+        pull["progress"] = [row_to_dict(p, exclude=("id",)) for p in progress]
+    return pull
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.services import db_session
+
+    parser = argparse.ArgumentParser(description="Register an edge node on the central server")
+    parser.add_argument("node_id")
+    parser.add_argument("--students", default=None, help="comma separated student ids served by the node")
+    parser.add_argument("--new-token", action="store_true", help="replace the node's sync token")
+    args = parser.parse_args()
+    students = None if args.students is None else [int(s) for s in args.students.split(",") if s.strip()]
+    with db_session() as db:
+        token = register_node(db, args.node_id, students, args.new_token)
+    if token:
+        print(f"EDU_EDGE_SYNC_TOKEN={token}")
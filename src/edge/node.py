@@ -0,0 +1,175 @@
+"""Edge node: the app on a local SQLite database, synced with the central server.
+
+Run the API with ``EDU_EDGE_DB_PATH``, ``EDU_EDGE_NODE_ID``,
+``EDU_EDGE_CENTRAL_URL`` and ``EDU_EDGE_SYNC_TOKEN`` set. The schema is
+created with `create_all` (the Alembic migrations are Postgres specific),
+curriculum is served and answers are recorded locally, and `sync_once`
+runs every EDGE_SYNC_INTERVAL seconds while the app is up. A sync that
+fails (no connectivity) is simply retried on the next tick.
+
+Each sync pushes local submissions after the last acknowledged id in
+batches of EDGE_SYNC_BATCH and applies what the central server returns:
+the curriculum change log entries after the node's version (see
+src/database/curriculum_changes.py), and the students assigned to the node
+on the central server (see src/edge/central.py) with their authoritative
+student_progress. Progress for a student with submissions the central
+server has not acknowledged yet is left alone; it is replaced on the sync
+after they are pushed.
+
+The SQLite file gets a random instance id when it is created. It is sent
+with every push, so if the file is lost and recreated the central server
+knows the local ids have started over.
+"""
+import uuid
+from datetime import datetime
+
+import httpx
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import Session
+
+from src.analytics.parent_dashboard import clear_parent_dashboards
+from src.core.configurations import logger
+from src.core.constants import (
+    EDGE_CENTRAL_URL,
+    EDGE_NODE_ID,
+    EDGE_SYNC_BATCH,
+    EDGE_SYNC_TIMEOUT,
+    EDGE_SYNC_TOKEN,
+)
+from src.database.curriculum_version import invalidate_curriculum_version
+from src.database.curriculum_changes import MODELS
+from src.database.repository import Chapter, CurriculumMeta, EdgeNode, QuizSubmission, Student, StudentProgress
+from src.database.services import Base, db_session, engine
+from src.edge.central import SUBMISSION_FIELDS
+from src.edge.payloads import dict_to_values, pack
+
+
+class EdgeSyncError(Exception):
+    pass
+
+
+def init_edge_database() -> None:
+    if not EDGE_NODE_ID:
+        raise EdgeSyncError("EDU_EDGE_NODE_ID must be set on an edge node")
+    Base.metadata.create_all(engine)
+    if "instance_id" not in {column["name"] for column in inspect(engine).get_columns("edge_nodes")}:
+        # files created before instance ids; create_all does not add columns
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE edge_nodes ADD COLUMN instance_id VARCHAR(36)"))
+    with db_session() as db:
+        if db.get(CurriculumMeta, 1) is None:
+            db.add(CurriculumMeta(id=1, version=0))
+        node = db.get(EdgeNode, EDGE_NODE_ID)
+        if node is None:
+            node = EdgeNode(node_id=EDGE_NODE_ID, last_submission_id=0)
+            db.add(node)
+        if node.instance_id is None:
+            node.instance_id = str(uuid.uuid4())
+        db.commit()
+
+
+def _pending_submissions(db: Session, after_id: int) -> list:
+    rows = (
+        db.query(QuizSubmission)
+        .filter(QuizSubmission.id > after_id)
+        .order_by(QuizSubmission.id)
+        .limit(EDGE_SYNC_BATCH)
+        .all()
+    )
+    return [{"local_id": row.id, **{f: getattr(row, f) for f in SUBMISSION_FIELDS}} for row in rows]
+
+
+def _apply_curriculum(db: Session, changes: dict) -> None:
+    for table in changes["truncated"]:
+        db.query(MODELS[table]).delete(synchronize_session=False)
+    # children first, so cascades never touch rows that are kept
+    for table, model in reversed(MODELS.items()):
+        if changes["deletes"][table]:
+            db.query(model).filter(model.id.in_(changes["deletes"][table])).delete(synchronize_session=False)
+    for table, model in MODELS.items():
+        for data in changes["upserts"][table]:
+            db.merge(model(**dict_to_values(model, data)))
+
+
+def _apply_progress(db: Session, progress: list, acknowledged_id: int) -> None:
+    unacknowledged = set(
+        db.execute(select(QuizSubmission.student_id).where(QuizSubmission.id > acknowledged_id).distinct()).scalars()
+    )
+    # chapters still to come on a later curriculum page; their progress is sent again with it
+    chapters = set(db.execute(select(Chapter.id)).scalars())
+    existing = {(p.student_id, p.chapter_id): p for p in db.query(StudentProgress).all()}
+    for data in progress:
+        if data["student_id"] in unacknowledged or data["chapter_id"] not in chapters:
+            continue
+        values = dict_to_values(StudentProgress, data)
+        row = existing.get((values["student_id"], values["chapter_id"]))
+        if row is None:
+            db.add(StudentProgress(**values))
+        else:
+            for key, value in values.items():
+                setattr(row, key, value)
+
+
+def _apply_pull(db: Session, data: dict) -> None:
+    node = db.get(EdgeNode, EDGE_NODE_ID)
+    node.last_submission_id = data["acknowledged_submission_id"]
+    node.last_synced_at = datetime.utcnow()
+    meta = db.get(CurriculumMeta, 1)
+    curriculum_changed = data["curriculum_version"] != meta.version
+    if curriculum_changed:
+        _apply_curriculum(db, data["curriculum"])
+        meta.version = data["curriculum_version"]
+    for student in data["students"]:
+        db.merge(Student(**dict_to_values(Student, student)))
+    db.flush()
+    _apply_progress(db, data["progress"], node.last_submission_id)
+    db.commit()
+    if curriculum_changed:
+        invalidate_curriculum_version()
+
+
+def _post(client: httpx.Client, body: dict) -> dict:
+    response = client.post(
+        f"{EDGE_CENTRAL_URL.rstrip('/')}/edu/v1/edge/sync",
+        content=pack(body),
+        headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "X-Edge-Node": EDGE_NODE_ID,
+            "X-Edge-Token": EDGE_SYNC_TOKEN,
+        },
+    )
+    envelope = response.json()
+    if response.status_code != 200 or not envelope.get("success"):
+        raise EdgeSyncError(f"Sync rejected ({response.status_code}): {envelope.get('message')}")
+    return envelope["data"]
+
+
+def sync_once() -> dict:
+    """Push every unacknowledged submission and apply the central server's state."""
+    pushed = 0
+    with httpx.Client(timeout=EDGE_SYNC_TIMEOUT) as client:
+        while True:
+            with db_session() as db:
+                node = db.get(EdgeNode, EDGE_NODE_ID)
+                instance_id = node.instance_id
+                submissions = _pending_submissions(db, node.last_submission_id)
+                version = db.get(CurriculumMeta, 1).version
+            data = _post(
+                client,
+                {"instance_id": instance_id, "submissions": submissions, "curriculum_version": version},
+            )
+            with db_session() as db:
+                _apply_pull(db, data)
+            pushed += len(submissions)
+            if len(submissions) < EDGE_SYNC_BATCH and not data["curriculum"]["has_more"]:
+                break
+    clear_parent_dashboards()
+    logger.info(f"Edge sync: pushed {pushed} submissions, curriculum version {data['curriculum_version']}")
+    return {"pushed": pushed, "curriculum_version": data["curriculum_version"]}
+
+
+if __name__ == "__main__":
+    init_edge_database()
+    result = sync_once()
+    print(f"pushed {result['pushed']} submissions, curriculum version {result['curriculum_version']}")
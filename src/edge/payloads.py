@@ -0,0 +1,50 @@
+"""Wire format shared by the edge sync client and the central sync endpoint.
+
+Bodies are gzip-compressed JSON in both directions. Rows travel as plain
+dicts of column values; datetimes as ISO 8601 strings.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import sqlalchemy as sa
+
+GZIP_LEVEL = 6
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def pack(data: dict) -> bytes:
+    return gzip.compress(json.dumps(data, default=_default, separators=(",", ":")).encode(), GZIP_LEVEL)
+
+
+def unpack(body: bytes, content_encoding: str = "gzip") -> dict:
+    if content_encoding == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def row_to_dict(row, exclude=()) -> dict:
+    return {column.name: getattr(row, column.key) for column in row.__table__.columns if column.name not in exclude}
+
+
+def dict_to_values(model, data: dict) -> dict:
+    """Column values for `model` from a `row_to_dict` payload, parsing datetimes back."""
+    values = {}
+    for column in model.__table__.columns:
+        if column.name not in data:
+            continue
+        value = data[column.name]
+        if value is not None and isinstance(column.type, sa.DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column.type, sa.Date):
+            value = date.fromisoformat(value)
+        values[column.key] = value
+    return values
@@ -1,7 +1,15 @@
 from fastapi import APIRouter
 
+from .v1 import admin, analytics, edge, live, media, parent, quiz
 from .v1.storefront import router
 
 # V1 router
 api_v1_router = APIRouter()
 api_v1_router.include_router(router)
+api_v1_router.include_router(quiz.router)
+api_v1_router.include_router(live.router)
+api_v1_router.include_router(analytics.router)
+api_v1_router.include_router(parent.router)
+api_v1_router.include_router(media.router)
+api_v1_router.include_router(edge.router)
+api_v1_router.include_router(admin.router)
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+
+from src.auth.auth_handler import require_admin
+from src.core.metrics import metrics
+from src.database.models import ResponseModel
+from src.database.slow_queries import read_slow_queries
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/metrics", tags=["ADMIN"], response_model=ResponseModel)
+async def get_metrics():
+    return ResponseModel(
+        success=True,
+        message=None,
+        data=metrics.snapshot(),
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@router.get("/slow_queries", tags=["ADMIN"], response_model=ResponseModel)
+def get_slow_queries(
+    route: Optional[str] = Query(default=None, description='e.g. "GET /edu/v1/parent/dashboard"'),
+    min_ms: float = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """Most recent slow statements, newest first, with EXPLAIN plans where one was captured."""
+    return ResponseModel(
+        success=True,
+        message=None,
+        data=read_slow_queries(route=route, min_ms=min_ms, limit=limit),
+        status_code=status.HTTP_200_OK,
+    )
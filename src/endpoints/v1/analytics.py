@@ -0,0 +1,313 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy import Date, Integer, cast, func, literal_column
+from starlette.responses import JSONResponse
+
+from src.analytics.aggregates import aggregates_as_of
+from src.auth.auth_handler import get_current_student
+from src.core.constants import ANALYTICS_MAX_BUCKETS, ANALYTICS_MAX_RANGE_DAYS, ANALYTICS_MAX_STUDENTS
+from src.database.models import ResponseModel
+from src.database.repository import Chapter, ChapterStats, DailyAnalytics, Question, QuestionStats, Student
+from src.database.dialects import in_values
+from src.database.services import RequestSession
+
+# Every route needs a logged in account and only reads its school's data,
+# from its school's database (see RequestContextMiddleware).
+router = APIRouter(prefix="/analytics")
+
+BUCKETS = ("day", "week", "month")
+
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_axis(start: date, end: date, bucket: str) -> List[date]:
+    axis = []
+    current = _bucket_start(start, bucket)
+    while current <= end:
+        axis.append(current)
+        if bucket == "day":
+            current += timedelta(days=1)
+        elif bucket == "week":
+            current += timedelta(weeks=1)
+        else:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return axis
+
+
+def _pick_bucket(start: date, end: date, requested: Optional[str]) -> str:
+    """The requested bucket (finest by default), coarsened until it fits ANALYTICS_MAX_BUCKETS."""
+    candidates = BUCKETS[BUCKETS.index(requested):] if requested else BUCKETS
+    for bucket in candidates:
+        if len(_bucket_axis(start, end, bucket)) <= ANALYTICS_MAX_BUCKETS:
+            return bucket
+    return BUCKETS[-1]
+
+
+def _error(message: str, status_code: int) -> JSONResponse:
+    response = ResponseModel(success=False, message=message, data=None, status_code=status_code)
+    return JSONResponse(content=response.dict(), status_code=status_code)
+
+
+def _freshness(as_of: Optional[datetime]) -> dict:
+    return {
+        "as_of": as_of.isoformat() if as_of else None,
+        "staleness_seconds": round((datetime.now() - as_of).total_seconds()) if as_of else None,
+    }
+
+
+def _totals(row) -> dict:
+    return {
+        "attempts": row.attempts,
+        "correct": row.correct,
+        "accuracy": round(row.correct / row.attempts, 4) if row.attempts else None,
+        "avg_time_seconds": round(row.total_time_seconds / row.timed_attempts, 1) if row.timed_attempts else None,
+        "last_submission_at": row.last_submission_at.isoformat() if row.last_submission_at else None,
+    }
+
+
+def _chapter_totals(row) -> dict:
+    return {
+        **_totals(row),
+        "students": row.students,
+        "avg_mastery_score": float(row.avg_mastery_score) if row.avg_mastery_score is not None else None,
+    }
+
+
+@router.get("/chapters/stats", tags=["ANALYTICS"], response_model=ResponseModel)
+def get_chapters_stats(db: RequestSession, student: Student = Depends(get_current_student)):
+    """Per chapter totals from the precomputed chapter_stats table.
+
+    `as_of` is the newest submission time folded in; anything later shows up
+    after the next refresh (see src/analytics/aggregates.py).
+    """
+    try:
+        as_of = aggregates_as_of(db)
+        rows = (
+            db.query(ChapterStats, Chapter.order, Chapter.name)
+            .join(Chapter, Chapter.id == ChapterStats.chapter_id)
+            .order_by(Chapter.order)
+            .all()
+        )
+        response = ResponseModel(
+            success=True,
+            message=None,
+            data={
+                **_freshness(as_of),
+                "chapters": [
+                    {"chapter_id": stats.chapter_id, "order": order, "name": name, **_chapter_totals(stats)}
+                    for stats, order, name in rows
+                ],
+            },
+            status_code=status.HTTP_200_OK,
+        )
+        return JSONResponse(content=response.dict(), status_code=status.HTTP_200_OK)
+
+    except Exception as e:
+        return _error(f"Unexpected error: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.get("/chapters/{chapter_id}/stats", tags=["ANALYTICS"], response_model=ResponseModel)
+def get_chapter_stats(chapter_id: str, db: RequestSession, student: Student = Depends(get_current_student)):
+    """Totals for one chapter plus a per question breakdown, from the aggregate tables only."""
+    try:
+        chapter = db.query(ChapterStats).filter(ChapterStats.chapter_id == chapter_id).first()
+        if chapter is None:
+            return _error("No statistics for this chapter yet", status.HTTP_404_NOT_FOUND)
+        as_of = aggregates_as_of(db)
+        questions = (
+            db.query(QuestionStats, Question.quiz_id)
+            .join(Question, Question.id == QuestionStats.question_id)
+            .filter(QuestionStats.chapter_id == chapter_id)
+            .order_by(QuestionStats.question_id)
+            .all()
+        )
+        response = ResponseModel(
+            success=True,
+            message=None,
+            data={
+                **_freshness(as_of),
+                "chapter_id": chapter_id,
+                **_chapter_totals(chapter),
+                "questions": [
+                    {"question_id": stats.question_id, "quiz_id": quiz_id, **_totals(stats)}
+                    for stats, quiz_id in questions
+                ],
+            },
+            status_code=status.HTTP_200_OK,
+        )
+        return JSONResponse(content=response.dict(), status_code=status.HTTP_200_OK)
+
+    except Exception as e:
+        return _error(f"Unexpected error: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.get("/students/timeseries", tags=["ANALYTICS"], response_model=ResponseModel)
+def get_students_timeseries(
+    db: RequestSession,
+    student_ids: List[int] = Query(...),
+    start: date = Query(...),
+    end: date = Query(...),
+    bucket: Optional[str] = Query(default=None, description="day, week or month"),
+    student: Student = Depends(get_current_student),
+):
+    """XP, accuracy and time spent per bucket as columnar arrays.
+
+    Every student shares the `buckets` axis; each metric is an array aligned
+    with it (0, or null for accuracy, where nothing was recorded). Only
+    students of the caller's school are read; others come back as zeros.
+    """
+    student_ids = list(dict.fromkeys(student_ids))
+    if bucket is not None and bucket not in BUCKETS:
+        return _error(f"bucket must be one of {', '.join(BUCKETS)}", status.HTTP_400_BAD_REQUEST)
+    if end < start:
+        return _error("end must not be before start", status.HTTP_400_BAD_REQUEST)
+    if (end - start).days > ANALYTICS_MAX_RANGE_DAYS:
+        return _error(f"Range is limited to {ANALYTICS_MAX_RANGE_DAYS} days", status.HTTP_400_BAD_REQUEST)
+    if len(student_ids) > ANALYTICS_MAX_STUDENTS:
+        return _error(f"At most {ANALYTICS_MAX_STUDENTS} students per request", status.HTTP_400_BAD_REQUEST)
+
+    try:
+        bucket = _pick_bucket(start, end, bucket)
+        axis = _bucket_axis(start, end, bucket)
+        position = {bucket_start: i for i, bucket_start in enumerate(axis)}
+
+        # Inlined (bucket is one of BUCKETS): a bound parameter would be a
+        # different placeholder in SELECT and GROUP BY, which Postgres rejects.
+        bucket_start = cast(func.date_trunc(literal_column(f"'{bucket}'"), DailyAnalytics.analytics_date), Date)
+        rows = (
+            db.query(
+                DailyAnalytics.student_id,
+                bucket_start.label("bucket_start"),
+                func.sum(DailyAnalytics.questions_answered).label("answered"),
+                func.sum(DailyAnalytics.questions_correct).label("correct"),
+                func.sum(DailyAnalytics.xp_earned).label("xp"),
+                func.sum(DailyAnalytics.time_spent_minutes).label("time_spent"),
+            )
+            .filter(
+                in_values(DailyAnalytics.student_id, "student_ids", student_ids, Integer),
+                DailyAnalytics.school_id == student.school_id,
+                DailyAnalytics.analytics_date.between(start, end),
+            )
+            .group_by(DailyAnalytics.student_id, bucket_start)
+            .all()
+        )
+
+        size = len(axis)
+        series = {
+            student_id: {
+                "xp": [0] * size,
+                "answered": [0] * size,
+                "accuracy": [None] * size,
+                "time_spent_minutes": [0] * size,
+            }
+            for student_id in student_ids
+        }
+        for row in rows:
+            i = position[row.bucket_start]
+            student = series[row.student_id]
+            student["xp"][i] = int(row.xp)
+            student["answered"][i] = int(row.answered)
+            student["time_spent_minutes"][i] = int(row.time_spent)
+            if row.answered:
+                student["accuracy"][i] = round(row.correct / row.answered, 4)
+
+        response = ResponseModel(
+            success=True,
+            message=None,
+            data={
+                "bucket": bucket,
+                "buckets": [bucket_start.isoformat() for bucket_start in axis],
+                "students": {str(student_id): values for student_id, values in series.items()},
+            },
+            status_code=status.HTTP_200_OK,
+        )
+        return JSONResponse(content=response.dict(), status_code=status.HTTP_200_OK)
+
+    except Exception as e:
+        return _error(f"Unexpected error: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.get("/schools/{school_id}/timeseries", tags=["ANALYTICS"], response_model=ResponseModel)
+def get_school_timeseries(
+    school_id: int,
+    db: RequestSession,
+    start: date = Query(...),
+    end: date = Query(...),
+    bucket: Optional[str] = Query(default=None, description="day, week or month"),
+    student: Student = Depends(get_current_student),
+):
+    """One school's totals per bucket as columnar arrays, read from that school's database.
+
+    `active_students` counts students with any activity on a day, summed
+    over the bucket's days. Only the caller's own school can be read.
+    """
+    if school_id != student.school_id:
+        return _error("Not allowed to read this school's analytics", status.HTTP_403_FORBIDDEN)
+    if bucket is not None and bucket not in BUCKETS:
+        return _error(f"bucket must be one of {', '.join(BUCKETS)}", status.HTTP_400_BAD_REQUEST)
+    if end < start:
+        return _error("end must not be before start", status.HTTP_400_BAD_REQUEST)
+    if (end - start).days > ANALYTICS_MAX_RANGE_DAYS:
+        return _error(f"Range is limited to {ANALYTICS_MAX_RANGE_DAYS} days", status.HTTP_400_BAD_REQUEST)
+
+    try:
+        bucket = _pick_bucket(start, end, bucket)
+        axis = _bucket_axis(start, end, bucket)
+        position = {bucket_start: i for i, bucket_start in enumerate(axis)}
+
+        bucket_start = cast(func.date_trunc(literal_column(f"'{bucket}'"), DailyAnalytics.analytics_date), Date)
+        # idx_daily_analytics_school_date: only this school's rows are read
+        rows = (
+            db.query(
+                bucket_start.label("bucket_start"),
+                func.count().label("active_students"),
+                func.sum(DailyAnalytics.questions_answered).label("answered"),
+                func.sum(DailyAnalytics.questions_correct).label("correct"),
+                func.sum(DailyAnalytics.xp_earned).label("xp"),
+                func.sum(DailyAnalytics.time_spent_minutes).label("time_spent"),
+            )
+            .filter(DailyAnalytics.school_id == school_id, DailyAnalytics.analytics_date.between(start, end))
+            .group_by(bucket_start)
+            .all()
+        )
+
+        size = len(axis)
+        series = {
+            "active_students": [0] * size,
+            "xp": [0] * size,
+            "answered": [0] * size,
+            "accuracy": [None] * size,
+            "time_spent_minutes": [0] * size,
+        }
+        for row in rows:
+            i = position[row.bucket_start]
+            series["active_students"][i] = int(row.active_students)
+            series["xp"][i] = int(row.xp)
+            series["answered"][i] = int(row.answered)
+            series["time_spent_minutes"][i] = int(row.time_spent)
+            if row.answered:
+                series["accuracy"][i] = round(row.correct / row.answered, 4)
+
+        response = ResponseModel(
+            success=True,
+            message=None,
+            data={
+                "school_id": school_id,
+                "bucket": bucket,
+                "buckets": [bucket_start.isoformat() for bucket_start in axis],
+                **series,
+            },
+            status_code=status.HTTP_200_OK,
+        )
+        return JSONResponse(content=response.dict(), status_code=status.HTTP_200_OK)
+
+    except Exception as e:
+        return _error(f"Unexpected error: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Request, status
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from src.core.constants import EDGE_SYNC_BATCH
+from src.database.models import ResponseModel
+from src.database.services import db_session
+from src.edge.central import apply_push, authenticate_node, build_pull
+from src.edge.payloads import pack, unpack
+
+router = APIRouter(prefix="/edge")
+
+
+def _error(message: str, status_code: int) -> JSONResponse:
+    response = ResponseModel(success=False, message=message, data=None, status_code=status_code)
+    return JSONResponse(content=response.dict(), status_code=status_code)
+
+
+def _authenticate(node_id: str, token: str) -> bool:
+    with db_session() as db:
+        return authenticate_node(db, node_id, token)
+
+
+def _sync(node_id: str, payload: dict) -> dict:
+    # one session (one pool checkout) for both halves; the pull also sees the push
+    with db_session() as db:
+        pushed = apply_push(db, node_id, payload["instance_id"], payload.get("submissions", []))
+        pulled = build_pull(db, node_id, payload.get("curriculum_version"))
+    return {**pushed, **pulled}
+
+
+@router.post("/sync", tags=["EDGE"], response_model=ResponseModel)
+async def sync_edge_node(request: Request):
+    """One sync round trip for an edge node (see src/edge/node.py).
+
+    The node identifies itself with the `X-Edge-Node` and `X-Edge-Token`
+    headers. The gzip JSON body carries the node database's `instance_id`,
+    `submissions` recorded on the node since its last acknowledged one (each
+    with its `local_id`) and its `curriculum_version`. The gzip JSON
+    response acknowledges the submissions and returns the curriculum changes
+    after the node's version, the students assigned to the node and their
+    progress.
+    """
+    node_id = request.headers.get("X-Edge-Node", "")
+    token = request.headers.get("X-Edge-Token", "")
+    try:
+        authenticated = bool(node_id and token) and await run_in_threadpool(_authenticate, node_id, token)
+    except Exception as e:
+        return _error(f"Unexpected error: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if not authenticated:
+        return _error("Invalid edge node or token", status.HTTP_401_UNAUTHORIZED)
+    try:
+        payload = unpack(await request.body(), request.headers.get("Content-Encoding", ""))
+    except (OSError, ValueError):
+        return _error("Body must be gzip compressed JSON", status.HTTP_400_BAD_REQUEST)
+    if not payload.get("instance_id"):
+        return _error("instance_id is required", status.HTTP_400_BAD_REQUEST)
+    if len(payload.get("submissions", [])) > EDGE_SYNC_BATCH:
+        return _error(f"At most {EDGE_SYNC_BATCH} submissions per request", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    try:
+        data = await run_in_threadpool(_sync, node_id, payload)
+    except Exception as e:
+        return _error(f"Unexpected error: {str(e)}", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    response = ResponseModel(success=True, message=None, data=data, status_code=status.HTTP_200_OK)
+    return Response(
+        content=pack(response.dict()),
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip"},
+    )
@@ -0,0 +1,103 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Integer
+from starlette.responses import JSONResponse
+
+from src.auth.auth_bearer import school_from_token, verify_student_token
+from src.auth.auth_handler import require_admin
+from src.core.constants import DEFAULT_SCHOOL_ID, LIVE_MAX_QUESTIONS
+from src.database.dialects import in_values
+from src.database.models import LiveSessionCreateRequest, ResponseModel
+from src.database.repository import Question
+from src.database.services import READ, RequestSession, current_school, db_session
+from src.live.sessions import CLOSE_FORBIDDEN, CLOSE_NOT_FOUND, CLOSE_UNAUTHORIZED, LiveQuestion, live_sessions
+
+router = APIRouter(prefix="/live")
+
+
+def _response(success: bool, message, data, status_code: int) -> JSONResponse:
+    response = ResponseModel(success=success, message=message, data=data, status_code=status_code)
+    return JSONResponse(content=response.dict(), status_code=status_code)
+
+
+def _load_questions(db, payload: LiveSessionCreateRequest) -> list:
+    query = db.query(Question).filter(Question.chapter_id == payload.chapter_id)
+    if payload.question_ids:
+        query = query.filter(in_values(Question.id, "question_ids", payload.question_ids, Integer))
+    questions = [LiveQuestion(q) for q in query.order_by(Question.id).limit(LIVE_MAX_QUESTIONS).all()]
+    if payload.question_ids:
+        order = {question_id: i for i, question_id in enumerate(payload.question_ids)}
+        questions.sort(key=lambda q: order[q.id])
+    return questions
+
+
+def _authenticate(token: str):
+    # sockets do not pass through the request context middleware; route by the claim here
+    with db_session(READ, school_id=school_from_token(token)) as db:
+        return verify_student_token(token, db)
+
+
+@router.post("/sessions", tags=["LIVE"], response_model=ResponseModel, dependencies=[Depends(require_admin)])
+async def create_live_session(payload: LiveSessionCreateRequest, db: RequestSession):
+    """Open a live quiz session over a chapter's questions (see src/live/sessions.py).
+
+    Staff only: called with the X-Admin-Token header, since the host sees
+    every answer when it reveals a question. The session belongs to the
+    school named by the X-School-Id header (DEFAULT_SCHOOL_ID without it),
+    whose students can join and whose database receives the answers.
+    Returns the session code students join with and the host key that
+    controls the session; it is handed out here only.
+    """
+    if len(payload.question_ids) > LIVE_MAX_QUESTIONS:
+        return _response(False, f"At most {LIVE_MAX_QUESTIONS} questions per session", None, status.HTTP_400_BAD_REQUEST)
+    try:
+        questions = await run_in_threadpool(_load_questions, db, payload)
+    except Exception as e:
+        return _response(False, f"Unexpected error: {str(e)}", None, status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if not questions:
+        return _response(False, "No questions found for this chapter", None, status.HTTP_404_NOT_FOUND)
+
+    school_id = current_school()
+    session = live_sessions.create(payload.chapter_id, questions, DEFAULT_SCHOOL_ID if school_id is None else school_id)
+    data = {
+        "code": session.code,
+        "host_key": session.host_key,
+        "chapter_id": session.chapter_id,
+        "questions": len(questions),
+    }
+    return _response(True, None, data, status.HTTP_201_CREATED)
+
+
+@router.websocket("/sessions/{code}/host")
+async def live_session_host(websocket: WebSocket, code: str, key: str = ""):
+    # accepted before any refusal, so the client sees the close code
+    await websocket.accept()
+    session = live_sessions.get(code)
+    if session is None:
+        await websocket.close(CLOSE_NOT_FOUND)
+        return
+    if not hmac.compare_digest(key, session.host_key):
+        await websocket.close(CLOSE_UNAUTHORIZED)
+        return
+    await live_sessions.run_host(session, websocket)
+
+
+@router.websocket("/sessions/{code}/student")
+async def live_session_student(websocket: WebSocket, code: str, token: str = ""):
+    """The student token is passed as a query parameter: browsers cannot set headers on a WebSocket."""
+    await websocket.accept()
+    session = live_sessions.get(code)
+    if session is None:
+        await websocket.close(CLOSE_NOT_FOUND)
+        return
+    try:
+        student = await run_in_threadpool(_authenticate, token)
+    except HTTPException:
+        await websocket.close(CLOSE_UNAUTHORIZED)
+        return
+    if session.school_id is not None and student.school_id != session.school_id:
+        await websocket.close(CLOSE_FORBIDDEN)
+        return
+    await live_sessions.run_student(session, websocket, student)
@@ -0,0 +1,87 @@
+from typing import Optional
+
+from fastapi import APIRouter, Path, Query, status
+from starlette.responses import FileResponse, JSONResponse, RedirectResponse
+
+from src.core.constants import IMAGE_CACHE_CONTROL, IMAGE_REDIRECT_CACHE_CONTROL, IMAGE_WIDTHS
+from src.database.models import ResponseModel
+from src.database.repository import Question
+from src.database.services import READ, db_session
+from src.media.image_cache import ImageNotFound, OriginError, digest_for_url, get_image
+
+router = APIRouter(prefix="/media")
+
+
+def _response(success: bool, message, data, status_code: int) -> JSONResponse:
+    response = ResponseModel(success=success, message=message, data=data, status_code=status_code)
+    return JSONResponse(content=response.dict(), status_code=status_code)
+
+
+def _check_width(w: Optional[int]) -> Optional[JSONResponse]:
+    if w is not None and w not in IMAGE_WIDTHS:
+        return _response(
+            False, f"w must be one of {', '.join(map(str, IMAGE_WIDTHS))}", None, status.HTTP_400_BAD_REQUEST
+        )
+    return None
+
+
+@router.get("/questions/{question_id}/image", tags=["MEDIA"])
+def question_image(question_id: int, w: Optional[int] = Query(None)):
+    """Redirect to the cached, content-addressed copy of a question's image."""
+    try:
+        error = _check_width(w)
+        if error is not None:
+            return error
+        with db_session(READ) as db:
+            image_url = db.query(Question.image_url).filter(Question.id == question_id).scalar()
+        if not image_url:
+            return _response(False, "Question image not found", None, status.HTTP_404_NOT_FOUND)
+
+        digest = digest_for_url(image_url)
+        location = router.url_path_for("cached_image", digest=digest)
+        if w is not None:
+            location = f"{location}?w={w}"
+        return RedirectResponse(
+            f"/edu/v1{location}",
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": IMAGE_REDIRECT_CACHE_CONTROL},
+        )
+
+    except ImageNotFound:
+        return _response(False, "Question image not found", None, status.HTTP_404_NOT_FOUND)
+    except OriginError as e:
+        return _response(False, str(e), None, status.HTTP_502_BAD_GATEWAY)
+    except Exception as e:
+        return _response(False, f"Unexpected error: {str(e)}", None, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.get("/images/{digest}", tags=["MEDIA"], name="cached_image")
+def cached_image(digest: str = Path(..., pattern="^[0-9a-f]{64}$"), w: Optional[int] = Query(None)):
+    """Serve a cached image (or its `w` pixels wide variant); supports Range requests.
+
+    The URL names fixed content, so responses may be cached indefinitely.
+    The file is sent with the server's zero-copy path where it offers one.
+    """
+    try:
+        error = _check_width(w)
+        if error is not None:
+            return error
+        image = get_image(digest, w)
+        return FileResponse(
+            image.path,
+            media_type=image.media_type,
+            headers={
+                "Cache-Control": IMAGE_CACHE_CONTROL,
+                "ETag": f'"{digest}-{w or 0}"',
+                "X-Content-Type-Options": "nosniff",
+                # SVG can carry script; never run it in our origin
+                "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox",
+            },
+        )
+
+    except ImageNotFound:
+        return _response(False, "Image not found", None, status.HTTP_404_NOT_FOUND)
+    except OriginError as e:
+        return _response(False, str(e), None, status.HTTP_502_BAD_GATEWAY)
+    except Exception as e:
+        return _response(False, f"Unexpected error: {str(e)}", None, status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, status
+from starlette.responses import JSONResponse
+
+from src.analytics.parent_dashboard import get_parent_dashboard
+from src.auth.auth_handler import get_current_student
+from src.database.models import ResponseModel
+from src.database.repository import Student
+from src.database.services import RequestSession
+
+router = APIRouter(prefix="/parent")
+
+
+@router.get("/dashboard", tags=["PARENT"], response_model=ResponseModel)
+def get_dashboard(db: RequestSession, student: Student = Depends(get_current_student)):
+    """Chapter progress, the last 30 days of activity and recent XP for the logged in student."""
+    try:
+        dashboard = get_parent_dashboard(student.id, db)
+        response = ResponseModel(
+            success=True,
+            message=None,
+            data={
+                **dashboard,
+                "student": {
+                    "first_name": student.first_name,
+                    "last_name": student.last_name,
+                    "standard": student.standard,
+                },
+            },
+            status_code=status.HTTP_200_OK,
+        )
+        return JSONResponse(content=response.dict(), status_code=status.HTTP_200_OK)
+
+    except Exception as e:
+        response = ResponseModel(
+            success=False,
+            message=f"Unexpected error: {str(e)}",
+            data=None,
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+        return JSONResponse(content=response.dict(), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,261 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse, Response
+
+from src.analytics.mastery import answered_pairs, apply_answers, lock_progress
+from src.auth.auth_handler import get_current_student
+from src.common.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from src.common.single_flight import single_flight
+from src.common.ttl_cache import TTLCache
+from src.core.constants import QUIZ_CACHE_SIZE, QUIZ_CACHE_TTL, QUIZ_XP_PER_CORRECT
+from src.database.curriculum_version import cached_curriculum_version, read_curriculum_version
+from src.database.models import QuizAnswerRequest, QuizSheetRequest, ResponseModel
+from src.database.repository import Question, QuizSubmission, Student
+from src.database.services import READ, RequestSession, database_key, db_session
+
+router = APIRouter(prefix="/quiz")
+
+
+def _response(success: bool, message, data, status_code: int) -> JSONResponse:
+    response = ResponseModel(success=success, message=message, data=data, status_code=status_code)
+    return JSONResponse(content=response.dict(), status_code=status_code)
+
+
+class ChapterQuiz:
+    """A chapter's questions at one curriculum version of one database.
+
+    `body` is the rendered start-quiz response, without answers or
+    explanations; `answer_key` maps question id to (correct_answer_index,
+    option count, explanation) for grading.
+    """
+
+    __slots__ = ("chapter_id", "version", "etag", "body", "answer_key")
+
+    def __init__(self, database: str, chapter_id: str, version: int, questions: list):
+        self.chapter_id = chapter_id
+        self.version = version
+        self.etag = make_etag("quiz", database, chapter_id, version)
+        data = {
+            "chapter_id": chapter_id,
+            "curriculum_version": version,
+            "questions": [
+                {
+                    "question_id": q.id,
+                    "question_text": q.question_text,
+                    "options": q.options,
+                    "image_url": q.image_url,
+                }
+                for q in questions
+            ],
+        }
+        self.body = _response(True, None, data, status.HTTP_200_OK).body
+        self.answer_key = {q.id: (q.correct_answer_index, len(q.options), q.explanation) for q in questions}
+
+
+# keyed by (database, chapter_id, curriculum version), so content changes never need an invalidation
+_quizzes = TTLCache("chapter_quiz", QUIZ_CACHE_TTL, QUIZ_CACHE_SIZE)
+
+
+def _read_quiz(db: Session, chapter_id: str) -> Optional[ChapterQuiz]:
+    database = database_key(db.get_bind())
+    version = read_curriculum_version(db)
+    questions = db.query(Question).filter(Question.chapter_id == chapter_id).order_by(Question.id).all()
+    quiz = ChapterQuiz(database, chapter_id, version, questions) if questions else None
+    if quiz is not None:
+        _quizzes.set((database, chapter_id, version), quiz)
+    return quiz
+
+
+@single_flight("chapter_quiz", key=lambda chapter_id, db=None: (database_key(), chapter_id))
+def _load_quiz(chapter_id: str, db: Optional[Session] = None) -> Optional[ChapterQuiz]:
+    if db is not None:
+        return _read_quiz(db, chapter_id)
+    with db_session(READ) as db:
+        return _read_quiz(db, chapter_id)
+
+
+def _cached_quiz(chapter_id: str) -> Optional[ChapterQuiz]:
+    database = database_key()
+    version = cached_curriculum_version(database)
+    return None if version is None else _quizzes.get((database, chapter_id, version))
+
+
+def get_chapter_quiz(chapter_id: str, db: Optional[Session] = None) -> Optional[ChapterQuiz]:
+    """The chapter's quiz at the current curriculum version, or None if it has no questions.
+
+    On a miss it is loaded with `db` (e.g. the request's session) if given.
+    """
+    return _cached_quiz(chapter_id) or _load_quiz(chapter_id, db=db)
+
+
+@router.get("/chapters/{chapter_id}", tags=["QUIZ"], response_model=ResponseModel)
+async def start_quiz(chapter_id: str, request: Request):
+    """All of a chapter's questions and options in one response, without answers or explanations.
+
+    The response is rendered once per chapter and curriculum version and
+    served from memory; answer it with POST /quiz/chapters/{chapter_id}/submit.
+    """
+    try:
+        quiz = _cached_quiz(chapter_id)
+        if quiz is None:
+            quiz = await run_in_threadpool(_load_quiz, chapter_id)
+        if quiz is None:
+            return _response(False, "Chapter has no questions", None, status.HTTP_404_NOT_FOUND)
+        if etag_matches(request, quiz.etag):
+            return not_modified("chapter_quiz", quiz.etag)
+        return Response(
+            content=quiz.body,
+            status_code=status.HTTP_200_OK,
+            media_type="application/json",
+            headers=cache_headers("chapter_quiz", quiz.etag),
+        )
+
+    except Exception as e:
+        return _response(False, f"Unexpected error: {str(e)}", None, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.post("/chapters/{chapter_id}/submit", tags=["QUIZ"], response_model=ResponseModel)
+def submit_quiz(
+    chapter_id: str, payload: QuizSheetRequest, db: RequestSession, student: Student = Depends(get_current_student)
+):
+    """Grade and record a whole answer sheet for the logged in student.
+
+    Answers are graded against the cached answer key, inserted in one batch
+    and applied to the student's chapter progress with one row lookup.
+    Returns each answer's result with the explanation, and the XP earned.
+    Only a student's first answer to a question earns XP and counts towards
+    mastery; answers to questions answered before (e.g. after seeing their
+    explanation) are recorded and graded with xp_earned 0.
+    """
+    try:
+        quiz = get_chapter_quiz(chapter_id, db=db)
+        if quiz is None:
+            return _response(False, "Chapter has no questions", None, status.HTTP_404_NOT_FOUND)
+
+        seen = set()
+        for answer in payload.answers:
+            key = quiz.answer_key.get(answer.question_id)
+            if key is None:
+                message = f"Question {answer.question_id} is not in chapter {chapter_id}"
+                return _response(False, message, None, status.HTTP_400_BAD_REQUEST)
+            if answer.question_id in seen:
+                message = f"Question {answer.question_id} is answered more than once"
+                return _response(False, message, None, status.HTTP_400_BAD_REQUEST)
+            if answer.selected_answer_index >= key[1]:
+                message = f"selected_answer_index is out of range for question {answer.question_id}"
+                return _response(False, message, None, status.HTTP_400_BAD_REQUEST)
+            seen.add(answer.question_id)
+
+        # the progress row lock serializes this student's sheets for the chapter,
+        # so two concurrent submissions cannot both count as first answers
+        progress = lock_progress(db, student.id, chapter_id)
+        answered_before = {question_id for _, question_id in answered_pairs(db, [(student.id, q) for q in seen])}
+
+        submitted_at = datetime.utcnow()
+        rows, results, first_answers = [], [], []
+        for answer in payload.answers:
+            correct_answer_index, _, explanation = quiz.answer_key[answer.question_id]
+            is_correct = answer.selected_answer_index == correct_answer_index
+            first_attempt = answer.question_id not in answered_before
+            xp_earned = QUIZ_XP_PER_CORRECT if is_correct and first_attempt else 0
+            if first_attempt:
+                first_answers.append(is_correct)
+            rows.append(
+                {
+                    "student_id": student.id,
+                    "question_id": answer.question_id,
+                    "selected_answer_index": answer.selected_answer_index,
+                    "is_correct": is_correct,
+                    "xp_earned": xp_earned,
+                    "time_taken_seconds": answer.time_taken_seconds,
+                    "submitted_at": submitted_at,
+                    "school_id": student.school_id,
+                }
+            )
+            results.append(
+                {
+                    "question_id": answer.question_id,
+                    "is_correct": is_correct,
+                    "first_attempt": first_attempt,
+                    "correct_answer_index": correct_answer_index,
+                    "explanation": explanation,
+                    "xp_earned": xp_earned,
+                }
+            )
+        db.bulk_insert_mappings(QuizSubmission, rows)
+        if first_answers:
+            apply_answers(db, progress, first_answers, submitted_at)
+        db.flush()
+
+        data = {
+            "chapter_id": chapter_id,
+            "curriculum_version": quiz.version,
+            "answered": len(results),
+            "correct": sum(result["is_correct"] for result in results),
+            "xp_earned": sum(result["xp_earned"] for result in results),
+            "mastery_score": float(progress.mastery_score),
+            "results": results,
+        }
+        return _response(True, None, data, status.HTTP_201_CREATED)
+
+    except Exception as e:
+        db.rollback()
+        return _response(False, f"Unexpected error: {str(e)}", None, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.post("/answer", tags=["QUIZ"], response_model=ResponseModel)
+def submit_answer(payload: QuizAnswerRequest, db: RequestSession, student: Student = Depends(get_current_student)):
+    """Grade and record one answer for the logged in student.
+
+    Works the same on the central server and on an edge node; answers given
+    on an edge node reach the central server with the next sync. The answer
+    is committed with the request's session after this returns. As with
+    whole sheets, only the student's first answer to a question earns XP
+    and counts towards mastery.
+    """
+    try:
+        question = db.query(Question).filter(Question.id == payload.question_id).first()
+        if question is None:
+            return _response(False, "Question not found", None, status.HTTP_404_NOT_FOUND)
+        if payload.selected_answer_index >= len(question.options):
+            return _response(False, "selected_answer_index is out of range", None, status.HTTP_400_BAD_REQUEST)
+
+        # held until commit, so a concurrent answer to the same question waits and is not first
+        progress = lock_progress(db, student.id, question.chapter_id)
+        first_attempt = not answered_pairs(db, [(student.id, question.id)])
+        is_correct = payload.selected_answer_index == question.correct_answer_index
+        submitted_at = datetime.utcnow()
+        submission = QuizSubmission(
+            student_id=student.id,
+            question_id=question.id,
+            selected_answer_index=payload.selected_answer_index,
+            is_correct=is_correct,
+            xp_earned=QUIZ_XP_PER_CORRECT if is_correct and first_attempt else 0,
+            time_taken_seconds=payload.time_taken_seconds,
+            submitted_at=submitted_at,
+            school_id=student.school_id,
+        )
+        db.add(submission)
+        if first_attempt:
+            apply_answers(db, progress, [is_correct], submitted_at)
+        db.flush()
+
+        data = {
+            "question_id": question.id,
+            "is_correct": is_correct,
+            "first_attempt": first_attempt,
+            "correct_answer_index": question.correct_answer_index,
+            "explanation": question.explanation,
+            "xp_earned": submission.xp_earned,
+            "chapter_id": question.chapter_id,
+            "mastery_score": float(progress.mastery_score),
+        }
+        return _response(True, None, data, status.HTTP_201_CREATED)
+
+    except Exception as e:
+        db.rollback()
+        return _response(False, f"Unexpected error: {str(e)}", None, status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,21 +1,47 @@
 
 # from sqlalchemy import text
+from typing import Optional
+
 from fastapi.encoders import jsonable_encoder
 
 from fastapi import (
     APIRouter,
+    Depends,
+    Request,
     status,
     Query
 )
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Integer, String, or_
 from starlette.responses import JSONResponse
+from src.common.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from src.common.single_flight import single_flight
+from src.core.constants import (
+    CURRICULUM_SYNC_DEFAULT_LIMIT,
+    CURRICULUM_SYNC_HIDDEN_FIELDS,
+    CURRICULUM_SYNC_MAX_LIMIT,
+    DEFAULT_SCHOOL_ID,
+    MAX_STUDENT_BATCH_LOOKUP,
+)
 from src.database.models import (
     ChapterCreate,
     ResponseModel,
+    StudentBatchLookupRequest,
     StudentCreateRequest,StudentLoginRequest
 )
-from src.database.repository import Chapter,Student,Parent
-from src.database.services import db_session
+from src.database.repository import Chapter,School,Student,Parent
+from src.database.curriculum_changes import read_changes
+from src.database.curriculum_version import (
+    cached_curriculum_version,
+    invalidate_curriculum_version,
+    read_curriculum_version,
+)
+from src.database.dialects import in_values
+from src.database.fast_queries import chapter_by_order, student_summary
+from src.database.services import IS_EDGE, READ, RequestSession, current_school, database_key, db_session
+from src.database.tenants import find_student_by_email
 from src.auth.auth_bearer import (verify_password,hash_password,create_student_token)
+from src.auth.auth_handler import get_current_student
 
 
 router = APIRouter(prefix="/storefront")
@@ -24,16 +50,27 @@ router = APIRouter(prefix="/storefront")
 @router.post(
     "/Regiater_Student",tags=["STUDENT"],response_model=ResponseModel
 )
-async def Register_Student(
+def Register_Student(
     student_obj: StudentCreateRequest,
+    db: RequestSession,
 ):
+    if IS_EDGE:
+        # ids are assigned centrally; edge nodes receive students through sync
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "message": "Registration is only available on the central server",
+                "data": None,
+                "status_code": status.HTTP_503_SERVICE_UNAVAILABLE
+            }
+        )
     try:
-        with db_session() as db:
-            existing_student = (
-                db.query(Student)
-                .filter(Student.email == student_obj.email)
-                .first()
-            )
+        existing_student = (
+            db.query(Student)
+            .filter(Student.email == student_obj.email)
+            .first()
+        )
         if existing_student:
             return JSONResponse(
                 status_code=400,
@@ -46,6 +83,21 @@ async def Register_Student(
             )
         name=student_obj.first_name + " " + student_obj.last_name
 
+        # the school named by the X-School-Id header, whose database this session uses
+        school_id = current_school()
+        if school_id is None:
+            school_id = DEFAULT_SCHOOL_ID
+        elif db.get(School, school_id) is None:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "success": False,
+                    "message": "Unknown school",
+                    "data": None,
+                    "status_code": status.HTTP_400_BAD_REQUEST
+                }
+            )
+
 
         student = Student(
             first_name=student_obj.first_name,
@@ -55,7 +107,8 @@ async def Register_Student(
             email=student_obj.email,
             gender=student_obj.gender,
             standard=student_obj.standard,
-            password_hash=hash_password(student_obj.password))
+            password_hash=hash_password(student_obj.password),
+            school_id=school_id)
         
 
         if student_obj.parent_details:
@@ -73,6 +126,7 @@ async def Register_Student(
                 "phone": student.phone,
                 "gender": student.gender,
                 "standard": student.standard,
+                "school_id": student.school_id,
                 "parent": {
                     "name": student.parent.name,
                     "phone": student.parent.phone,
@@ -80,9 +134,9 @@ async def Register_Student(
                 } if student.parent else None
             }
 
+        # committed by the request's session once the response is built
         db.add(student)
-        db.commit()
-        db.refresh(student)
+        db.flush()
 
         return {
             "success": True,
@@ -111,6 +165,7 @@ async def Register_Student(
 )
 def login_student(
     payload: StudentLoginRequest,
+    db: RequestSession,
 ):
     try:
         if payload.email and payload.password is None:
@@ -123,9 +178,11 @@ def login_student(
                     "status_code": status.HTTP_400_BAD_REQUEST
                 }
             )
-        with db_session() as db:
-            student = db.query(Student).filter(Student.email == payload.email).first()
-        
+        student = db.query(Student).filter(Student.email == payload.email).first()
+        if student is None and current_school() is None:
+            # no X-School-Id: the student may be in a school with its own database
+            student = find_student_by_email(payload.email)
+
         if not student or not verify_password(payload.password, student.password_hash):
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -171,6 +228,7 @@ def login_student(
     response_model=ResponseModel
 )
 def get_student(
+    db: RequestSession,
     student_id: int | None = Query(default=None),
     email: str | None = Query(default=None),
     phone: str | None = Query(default=None),
@@ -183,16 +241,7 @@ def get_student(
             status_code=status.HTTP_400_BAD_REQUEST,
         )
                        
-    with db_session() as db:
-        query = db.query(Student.email, Student.phone,Student.id,Student.first_name,Student.standard)
-        if student_id:
-            query = query.filter(Student.id == student_id)
-        if email:
-            query = query.filter(Student.email == email)
-        if phone:
-            query = query.filter(Student.phone == phone)
-
-        student = query.first()
+    student = student_summary(db, student_id=student_id, email=email, phone=phone)
 
     if not student:
         return ResponseModel(
@@ -202,14 +251,7 @@ def get_student(
             status_code=status.HTTP_404_NOT_FOUND,
         )
 
-    student_data = {
-        "Id": student.id,
-        "First_name": student.first_name,
-        "Class": student.standard,
-        "Email": student.email,
-        "Phone": student.phone,
-        
-    }
+    student_data = _student_summary(student)
 
     return ResponseModel(
         success=True,
@@ -219,20 +261,98 @@ def get_student(
     )
 
 
+@router.post(
+    "/get_students/batch",
+    tags=["STUDENT"],
+    response_model=ResponseModel
+)
+def get_students_batch(
+    payload: StudentBatchLookupRequest, db: RequestSession, caller: Student = Depends(get_current_student)
+):
+    """Look up to MAX_STUDENT_BATCH_LOOKUP students by id, email or phone.
+
+    Needs a logged in student and only finds students of the caller's
+    school; anyone else is reported under not_found.
+    """
+    student_ids = list(dict.fromkeys(payload.student_ids))
+    emails = list(dict.fromkeys(payload.emails))
+    phones = list(dict.fromkeys(payload.phones))
+    requested = len(student_ids) + len(emails) + len(phones)
+
+    if not requested:
+        return ResponseModel(
+            success=False,
+            message="Please provide student_ids, emails, or phones",
+            data=None,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+    if requested > MAX_STUDENT_BATCH_LOOKUP:
+        return ResponseModel(
+            success=False,
+            message=f"At most {MAX_STUDENT_BATCH_LOOKUP} lookups are allowed per request",
+            data=None,
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # One round trip: each key list is bound as a single array parameter,
+    # so the statement text is identical regardless of how many keys are sent.
+    conditions = []
+    if student_ids:
+        conditions.append(in_values(Student.id, "student_ids", student_ids, Integer))
+    if emails:
+        conditions.append(in_values(Student.email, "emails", emails, String))
+    if phones:
+        conditions.append(in_values(Student.phone, "phones", phones, String))
+
+    students = (
+        db.query(Student.email, Student.phone, Student.id, Student.first_name, Student.standard)
+        .filter(or_(*conditions), Student.school_id == caller.school_id)
+        .all()
+    )
+
+    found_ids = {student.id for student in students}
+    found_emails = {student.email for student in students}
+    found_phones = {student.phone for student in students}
+
+    return ResponseModel(
+        success=True,
+        message=None,
+        data={
+            "students": [_student_summary(student) for student in students],
+            "not_found": {
+                "student_ids": [i for i in student_ids if i not in found_ids],
+                "emails": [e for e in emails if e not in found_emails],
+                "phones": [p for p in phones if p not in found_phones],
+            },
+        },
+        status_code=status.HTTP_200_OK,
+    )
+
+
+def _student_summary(student) -> dict:
+    return {
+        "Id": student.id,
+        "First_name": student.first_name,
+        "Class": student.standard,
+        "Email": student.email,
+        "Phone": student.phone,
+    }
+
+
 
 @router.post(
     "/add_chapter",tags=["CHAPTER"],
 )
-async def create_Chapter(
+def create_Chapter(
     chapter_create: ChapterCreate,
+    db: RequestSession,
 ):
     try:
-
-        with db_session() as db:
-            chapter = Chapter(**chapter_create.dict())
-            data=chapter.name
-            db.add(chapter)
-            db.commit()
+        chapter = Chapter(**chapter_create.dict())
+        data=chapter.name
+        db.add(chapter)
+        db.flush()
+        invalidate_curriculum_version(db)
 
         response = ResponseModel(
             success=True,
@@ -243,6 +363,7 @@ async def create_Chapter(
         return JSONResponse(content=response.dict(),status_code=200)
 
     except Exception as e:
+        db.rollback()
         error = ResponseModel(
             success=False,
             message="Unexpected error: " + str(e),
@@ -252,20 +373,59 @@ async def create_Chapter(
         return JSONResponse(content=error.dict(),status_code=500)
 
 
+# Loaders read the curriculum version before the content, in the same session,
+# so the ETag they return is never newer than the data it labels. Calls are
+# only shared between requests served by the same database.
+@single_flight("all_chapters", key=lambda: database_key())
+def _load_all_chapters() -> tuple:
+    with db_session(READ) as db:
+        version = read_curriculum_version(db)
+        chapters = db.query(Chapter).all()
+        return version, jsonable_encoder(chapters)
+
+
+@single_flight("chapter_by_number", key=lambda chapter_no: (database_key(), chapter_no))
+def _load_chapter_by_number(chapter_no: int) -> tuple:
+    with db_session(READ) as db:
+        version = read_curriculum_version(db)
+        chapter = chapter_by_order(db, chapter_no)
+        return version, jsonable_encoder(chapter._asdict()) if chapter else None
+
+
+def _cached_etag(*parts) -> Optional[str]:
+    """ETag for the cached curriculum version, or None once the cache has expired.
+
+    The version is not read on its own when it has expired: the loader reads
+    it together with the content, which takes one pool checkout instead of two.
+    """
+    database = database_key()
+    version = cached_curriculum_version(database)
+    # every database numbers its curriculum versions on its own
+    return None if version is None else make_etag(parts[0], database, *parts[1:], version)
+
+
 @router.get("/all_chapters",tags=["CHAPTER"], response_model=ResponseModel)
-async def get_all_chapters():
+async def get_all_chapters(request: Request):
     try:
-        with db_session() as db:
-            chapters = db.query(Chapter).all()
-        datas = [(ch) for ch in chapters]
-        datas = jsonable_encoder(datas)
+        etag = _cached_etag("chapters")
+        if etag and etag_matches(request, etag):
+            return not_modified("all_chapters", etag)
+
+        version, datas = await run_in_threadpool(_load_all_chapters)
+        etag = make_etag("chapters", database_key(), version)
+        if etag_matches(request, etag):
+            return not_modified("all_chapters", etag)
         response = ResponseModel(
             success=True,
             message=None,
             data=datas,
             status_code=status.HTTP_200_OK,
         )
-        return JSONResponse(content=response.dict(),status_code=200)
+        return JSONResponse(
+            content=response.dict(),
+            status_code=200,
+            headers=cache_headers("all_chapters", etag),
+        )
 
     except Exception as e:
         response = ResponseModel(
@@ -282,14 +442,18 @@ async def get_all_chapters():
 
 
 @router.get("/chapters/{chapter_no}", tags=["CHAPTER"],response_model=ResponseModel)
-async def get_chapter_by_number(chapter_no: int):
+async def get_chapter_by_number(chapter_no: int, request: Request):
     try:
-        with db_session() as db:
-            chapter = (
-                db.query(Chapter).filter(Chapter.sequence_order == chapter_no).first()
-            )
+        etag = _cached_etag("chapter", chapter_no)
+        if etag and etag_matches(request, etag):
+            return not_modified("chapter_by_number", etag)
 
-        if not chapter:
+        version, chapter_data = await run_in_threadpool(_load_chapter_by_number, chapter_no)
+        etag = make_etag("chapter", database_key(), chapter_no, version)
+        if chapter_data and etag_matches(request, etag):
+            return not_modified("chapter_by_number", etag)
+
+        if not chapter_data:
             response = ResponseModel(
                 success=False,
                 message=f"Chapter {chapter_no} not found.",
@@ -300,14 +464,70 @@ async def get_chapter_by_number(chapter_no: int):
                 content=response.dict(), status_code=status.HTTP_404_NOT_FOUND
             )
 
-        chapter_data = jsonable_encoder(chapter)
-
         response = ResponseModel(
             success=True,
             message=f"Chapter {chapter_no} fetched successfully.",
             data=chapter_data,
             status_code=status.HTTP_200_OK,
         )
+        return JSONResponse(
+            content=response.dict(),
+            status_code=status.HTTP_200_OK,
+            headers=cache_headers("chapter_by_number", etag),
+        )
+
+    except Exception as e:
+        error = ResponseModel(
+            success=False,
+            message=f"Unexpected error: {str(e)}",
+            data=None,
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+        return JSONResponse(
+            content=error.dict(), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+def _sync_record(table: str, row) -> dict:
+    hidden = CURRICULUM_SYNC_HIDDEN_FIELDS.get(table, ())
+    return {
+        column.name: getattr(row, column.key)
+        for column in row.__table__.columns
+        if column.name not in hidden
+    }
+
+
+def _read_curriculum_changes(since: int, limit: int) -> dict:
+    with db_session(READ) as db:
+        page = read_changes(db, since, limit)
+        return jsonable_encoder(
+            {
+                **page,
+                "upserts": {
+                    table: [_sync_record(table, row) for row in rows]
+                    for table, rows in page["upserts"].items()
+                },
+            }
+        )
+
+
+@router.get("/sync", tags=["CHAPTER"], response_model=ResponseModel)
+async def sync_curriculum(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=CURRICULUM_SYNC_DEFAULT_LIMIT, ge=1, le=CURRICULUM_SYNC_MAX_LIMIT),
+):
+    """Curriculum changes after version `since` (0 for everything).
+
+    Empty the tables listed in `truncated`, apply `deletes` and `upserts`,
+    store `version`, and call again with it while `has_more` is true.
+    """
+    try:
+        data = await run_in_threadpool(_read_curriculum_changes, since, limit)
+        response = ResponseModel(
+            success=True,
+            message=None,
+            data=data,
+            status_code=status.HTTP_200_OK,
+        )
         return JSONResponse(content=response.dict(), status_code=status.HTTP_200_OK)
 
     except Exception as e:
@@ -319,4 +539,4 @@ async def get_chapter_by_number(chapter_no: int):
         )
         return JSONResponse(
             content=error.dict(), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
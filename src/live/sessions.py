@@ -0,0 +1,365 @@
+"""Live classroom quiz sessions: a host runs a set of questions, students answer over WebSockets.
+
+Staff create a session for a chapter (POST /live/sessions, with the admin
+token) and get its code and a host key. Hosts connect to ``/live/sessions/{code}/host?key=``,
+students to ``/live/sessions/{code}/student?token=<student token>``.
+Messages are JSON objects with a ``type``:
+
+* host -> server: ``next`` opens the next question, ``reveal`` closes it
+  and shows the answer, ``end`` finishes the session.
+* server -> students: ``question`` (without the answer), ``answer_received``,
+  ``reveal`` (correct answer and explanation), ``ended``.
+* student -> server: ``answer`` with question_id, selected_answer_index and
+  optionally time_taken_seconds. The first answer per question counts.
+* server -> hosts: ``tally`` with per option counts, answered and connected
+  students, and ``ended`` with per question results.
+
+Answers are graded and counted in memory; a student's answer costs no
+database round trip. Tallies are sent to hosts by one ticker for all
+sessions, at most every LIVE_BROADCAST_INTERVAL seconds and only for
+sessions that changed, so 40 students answering at once produce one
+message rather than 40. Messages sent to many sockets are encoded once and
+sent concurrently; a socket that cannot take one within LIVE_SEND_TIMEOUT
+is dropped. Graded answers are written to quiz_submissions in batches by
+`AnswerBuffer` (src/live/submissions.py).
+
+Sessions live in the memory of the worker process that created them: with
+several workers, every socket of a session must reach the same worker
+(route on the session code at the load balancer), or live sessions must be
+served by a single worker. A session without activity for
+LIVE_SESSION_IDLE_TIMEOUT is ended.
+"""
+import asyncio
+import json
+import secrets
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from src.core.configurations import logger
+from src.core.constants import (
+    LIVE_BROADCAST_INTERVAL,
+    LIVE_MAX_STUDENTS,
+    LIVE_SEND_TIMEOUT,
+    LIVE_SESSION_IDLE_TIMEOUT,
+)
+from src.core.metrics import metrics
+from src.live.submissions import AnswerBuffer
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # no 0/O, 1/I
+CODE_LENGTH = 6
+MAX_TIME_TAKEN_SECONDS = 3_600
+
+# raised by a socket the client has gone away from
+_GONE = (WebSocketDisconnect, RuntimeError, OSError)
+
+# WebSocket close codes (4000-4999 are free for applications)
+CLOSE_ENDED = 1000
+CLOSE_UNSUPPORTED = 1003  # a binary frame; the protocol is JSON text
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+CLOSE_FULL = 4409
+
+
+class LiveQuestion:
+    __slots__ = ("id", "chapter_id", "correct_answer_index", "explanation", "options", "public")
+
+    def __init__(self, question):
+        self.id = question.id
+        self.chapter_id = question.chapter_id
+        self.correct_answer_index = question.correct_answer_index
+        self.explanation = question.explanation
+        self.options = len(question.options)
+        # what students see; the answer stays on the server until `reveal`
+        self.public = {
+            "question_id": question.id,
+            "question_text": question.question_text,
+            "options": question.options,
+            "image_url": question.image_url,
+        }
+
+
+class LiveSession:
+    def __init__(self, code: str, host_key: str, chapter_id: str, questions: List[LiveQuestion], school_id):
+        self.code = code
+        self.host_key = host_key
+        self.chapter_id = chapter_id
+        self.questions = questions
+        self.school_id = school_id
+        self.hosts = set()
+        self.students: Dict[int, WebSocket] = {}  # one socket per student; a reconnect replaces it
+        self.current = -1  # index of the current question, -1 before the first
+        self.open = False  # the current question takes answers
+        self.counts: List[int] = []
+        self.answers: Dict[int, int] = {}  # student id -> selected option, current question
+        self.results = []  # per question: answered, correct
+        self.changed = False  # tally to send on the next tick
+        self.ended = False
+        self.last_activity = time.monotonic()
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+        self.changed = True
+
+    def tally(self) -> dict:
+        return {
+            "type": "tally",
+            "question_index": self.current,
+            "open": self.open,
+            "counts": self.counts,
+            "answered": len(self.answers),
+            "connected": len(self.students),
+        }
+
+    def _close_question(self) -> None:
+        if self.current >= 0 and len(self.results) == self.current:
+            correct = self.counts[self.questions[self.current].correct_answer_index] if self.counts else 0
+            self.results.append({"answered": len(self.answers), "correct": correct})
+        self.open = False
+
+    def next_question(self) -> Optional[str]:
+        """Open the next question; returns the message for students, or None when there is none."""
+        if self.current + 1 >= len(self.questions):
+            return None
+        self._close_question()
+        self.current += 1
+        self.open = True
+        self.counts = [0] * self.questions[self.current].options
+        self.answers = {}
+        self.touch()
+        return self.current_question_message()
+
+    def current_question_message(self) -> Optional[str]:
+        if not self.open:
+            return None
+        question = self.questions[self.current]
+        return json.dumps(
+            {"type": "question", "index": self.current, "total": len(self.questions), "question": question.public}
+        )
+
+    def reveal(self) -> Optional[str]:
+        if self.current < 0:
+            return None
+        self._close_question()
+        self.touch()
+        question = self.questions[self.current]
+        return json.dumps(
+            {
+                "type": "reveal",
+                "index": self.current,
+                "question_id": question.id,
+                "correct_answer_index": question.correct_answer_index,
+                "explanation": question.explanation,
+                "counts": self.counts,
+            }
+        )
+
+    def answer(self, student, message: dict) -> Optional[dict]:
+        """Grade and count a student's answer. Returns the graded submission, or None if it does not count."""
+        if not self.open:
+            return None
+        question = self.questions[self.current]
+        selected = message.get("selected_answer_index")
+        if message.get("question_id") != question.id or student.id in self.answers:
+            return None
+        if not isinstance(selected, int) or not 0 <= selected < question.options:
+            return None
+        time_taken = message.get("time_taken_seconds")
+        if not isinstance(time_taken, int) or not 0 <= time_taken <= MAX_TIME_TAKEN_SECONDS:
+            time_taken = None
+
+        self.answers[student.id] = selected
+        self.counts[selected] += 1
+        self.touch()
+        is_correct = selected == question.correct_answer_index
+        return {
+            "student_id": student.id,
+            "question_id": question.id,
+            "chapter_id": question.chapter_id,
+            "selected_answer_index": selected,
+            "is_correct": is_correct,
+            "time_taken_seconds": time_taken,
+            "submitted_at": datetime.utcnow(),
+            "school_id": student.school_id,
+        }
+
+    def summary(self) -> dict:
+        self._close_question()
+        return {"type": "ended", "code": self.code, "questions": self.results}
+
+
+async def _send(socket: WebSocket, message: str) -> bool:
+    try:
+        await asyncio.wait_for(socket.send_text(message), LIVE_SEND_TIMEOUT)
+        return True
+    except Exception:
+        return False
+
+
+class LiveSessions:
+    """The worker's live sessions, the tally ticker and the answer buffer."""
+
+    def __init__(self, broadcast_interval: float = LIVE_BROADCAST_INTERVAL):
+        self.broadcast_interval = broadcast_interval
+        self.sessions: Dict[str, LiveSession] = {}
+        self.answers = AnswerBuffer()
+        self._ticker = None
+        metrics.set_gauge("live_sessions", lambda: len(self.sessions))
+        metrics.set_gauge(
+            "live_sockets", lambda: sum(len(s.students) + len(s.hosts) for s in list(self.sessions.values()))
+        )
+
+    def start(self) -> None:
+        self.answers.start()
+        self._ticker = asyncio.get_running_loop().create_task(self._tick())
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        for session in list(self.sessions.values()):
+            await self.end(session)
+        await self.answers.stop()
+
+    def create(self, chapter_id: str, questions: List[LiveQuestion], school_id) -> LiveSession:
+        code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        while code in self.sessions:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        session = LiveSession(code, secrets.token_urlsafe(24), chapter_id, questions, school_id)
+        self.sessions[code] = session
+        metrics.inc("live_sessions_created_total")
+        return session
+
+    def get(self, code: str) -> Optional[LiveSession]:
+        return self.sessions.get(code.upper())
+
+    async def broadcast(self, sockets, message: str) -> None:
+        """Send one encoded message to many sockets at once; sockets that fail are closed."""
+        sockets = list(sockets)
+        if not sockets:
+            return
+        sent = await asyncio.gather(*(_send(socket, message) for socket in sockets))
+        for socket, ok in zip(sockets, sent):
+            if not ok:
+                metrics.inc("live_send_failures_total")
+                await self._close(socket, CLOSE_ENDED)
+
+    @staticmethod
+    async def _close(socket: WebSocket, code: int) -> None:
+        try:
+            await socket.close(code)
+        except Exception:
+            pass  # already closed by the client
+
+    async def end(self, session: LiveSession) -> None:
+        if session.ended:
+            return
+        session.ended = True
+        self.sessions.pop(session.code, None)
+        message = json.dumps(session.summary())
+        await self.broadcast([*session.hosts, *session.students.values()], message)
+        for socket in [*session.hosts, *session.students.values()]:
+            await self._close(socket, CLOSE_ENDED)
+        session.hosts.clear()
+        session.students.clear()
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.broadcast_interval)
+            try:
+                now = time.monotonic()
+                sends = []
+                for session in list(self.sessions.values()):
+                    if now - session.last_activity > LIVE_SESSION_IDLE_TIMEOUT:
+                        logger.info(f"Live session {session.code} ended after inactivity")
+                        sends.append(self.end(session))
+                    elif session.changed and session.hosts:
+                        session.changed = False
+                        sends.append(self.broadcast(session.hosts, json.dumps(session.tally())))
+                        metrics.inc("live_tallies_sent_total")
+                # concurrently, so one slow host does not hold back the others
+                await asyncio.gather(*sends)
+            except Exception as e:
+                logger.error(f"Live session ticker failed: {e}")
+
+    # ------------------------------------------------------------------------
+    # socket loops; the caller has accepted and authenticated the socket
+
+    async def run_host(self, session: LiveSession, socket: WebSocket) -> None:
+        session.hosts.add(socket)
+        session.touch()  # the new host gets a tally on the next tick
+        try:
+            while not session.ended:
+                message = await _receive(socket)
+                kind = message.get("type")
+                if kind == "next":
+                    outgoing = session.next_question()
+                    if outgoing is None:
+                        await socket.send_text(json.dumps({"type": "error", "message": "No more questions"}))
+                        continue
+                    await self.broadcast(session.students.values(), outgoing)
+                elif kind == "reveal":
+                    outgoing = session.reveal()
+                    if outgoing is not None:
+                        await self.broadcast([*session.hosts, *session.students.values()], outgoing)
+                elif kind == "end":
+                    await self.end(session)
+                else:
+                    await socket.send_text(json.dumps({"type": "error", "message": f"Unknown message type {kind!r}"}))
+        except _GONE:
+            pass
+        finally:
+            session.hosts.discard(socket)
+
+    async def run_student(self, session: LiveSession, socket: WebSocket, student) -> None:
+        if student.id not in session.students and len(session.students) >= LIVE_MAX_STUDENTS:
+            await socket.close(CLOSE_FULL)
+            return
+        previous = session.students.get(student.id)
+        session.students[student.id] = socket
+        session.touch()
+        if previous is not None:
+            await self._close(previous, CLOSE_ENDED)
+        current = session.current_question_message()
+        if current is not None:
+            await socket.send_text(current)
+        try:
+            while not session.ended:
+                message = await _receive(socket)
+                if message.get("type") != "answer":
+                    continue
+                graded = session.answer(student, message)
+                if graded is None:
+                    metrics.inc("live_answers_total", outcome="ignored")
+                    continue
+                self.answers.add(graded)
+                metrics.inc("live_answers_total", outcome="accepted")
+                await socket.send_text(json.dumps({"type": "answer_received", "question_id": graded["question_id"]}))
+        except _GONE:
+            pass
+        finally:
+            if session.students.get(student.id) is socket:
+                del session.students[student.id]
+                session.touch()
+
+
+async def _receive(socket: WebSocket) -> dict:
+    frame = await socket.receive()
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", CLOSE_ENDED))
+    text = frame.get("text")
+    if text is None:
+        await LiveSessions._close(socket, CLOSE_UNSUPPORTED)
+        raise WebSocketDisconnect(CLOSE_UNSUPPORTED)
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+live_sessions = LiveSessions()
@@ -0,0 +1,209 @@
+"""Batched writes of live session answers to quiz_submissions.
+
+Live answers are graded in memory when they arrive (src/live/sessions.py)
+and queued here. One task writes them every LIVE_FLUSH_INTERVAL seconds,
+or as soon as LIVE_FLUSH_BATCH are waiting: per school database, one
+transaction with a bulk insert into quiz_submissions and, per student and
+chapter, one `mastery.update` outbox event carrying the answers in order.
+The outbox workers apply those to student_progress; an edge node has no
+workers and applies them in the same transaction instead. XP is awarded
+here rather than when the answer is graded: as for answers over HTTP, only a
+student's first answer to a question earns XP and counts towards mastery,
+decided with the answers' progress rows locked.
+
+A batch that fails is written again one answer per transaction. Answers
+the database rejects (a deleted student, a bad value) are appended to
+LIVE_DEAD_LETTER_FILE and counted in `live_answers_dead_lettered_total`,
+so one bad answer cannot hold up the rest. When the database cannot be
+reached at all (OperationalError), the remaining answers are put back and
+retried on the next tick. While the database stays unavailable at most
+LIVE_FLUSH_MAX_PENDING answers are held; the oldest beyond that are
+dropped and counted in `live_answers_dropped_total`.
+
+`stop()` writes whatever is still queued, so a clean shutdown loses
+nothing; a crash loses at most the answers of the last interval.
+"""
+import asyncio
+import json
+from collections import deque
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import OperationalError
+
+from src.analytics.mastery import answered_pairs, apply_answers, lock_progress_many
+from src.background.handlers import MASTERY_UPDATE
+from src.background.outbox import enqueue
+from src.core.configurations import logger
+from src.core.constants import (
+    LIVE_DEAD_LETTER_FILE,
+    LIVE_FLUSH_BATCH,
+    LIVE_FLUSH_INTERVAL,
+    LIVE_FLUSH_MAX_PENDING,
+    QUIZ_XP_PER_CORRECT,
+)
+from src.core.metrics import metrics
+from src.database.repository import QuizSubmission
+from src.database.services import IS_EDGE, db_session
+
+SUBMISSION_COLUMNS = (
+    "student_id",
+    "question_id",
+    "selected_answer_index",
+    "is_correct",
+    "time_taken_seconds",
+    "submitted_at",
+    "school_id",
+)
+
+
+def write_answers(school_id: Optional[int], answers: list) -> None:
+    """Insert one school's answers (in answer order) and queue their progress updates, in one transaction."""
+    with db_session(school_id=school_id) as db:
+        progress = lock_progress_many(db, {(a["student_id"], a["chapter_id"]) for a in answers})
+        answered = answered_pairs(db, {(a["student_id"], a["question_id"]) for a in answers})
+        rows, by_progress = [], {}
+        for answer in answers:
+            pair = (answer["student_id"], answer["question_id"])
+            first_attempt = pair not in answered
+            answered.add(pair)
+            xp_earned = QUIZ_XP_PER_CORRECT if answer["is_correct"] and first_attempt else 0
+            rows.append({**{c: answer[c] for c in SUBMISSION_COLUMNS}, "xp_earned": xp_earned})
+            if first_attempt:
+                by_progress.setdefault((answer["student_id"], answer["chapter_id"]), []).append(answer)
+        db.bulk_insert_mappings(QuizSubmission, rows)
+        for (student_id, chapter_id), group in by_progress.items():
+            is_correct = [a["is_correct"] for a in group]
+            answered_at = group[-1]["submitted_at"]
+            if IS_EDGE:
+                apply_answers(db, progress[student_id, chapter_id], is_correct, answered_at)
+            else:
+                enqueue(
+                    db,
+                    MASTERY_UPDATE,
+                    {
+                        "student_id": student_id,
+                        "chapter_id": chapter_id,
+                        "answers": is_correct,
+                        "answered_at": answered_at.isoformat(),
+                    },
+                )
+        db.commit()
+
+
+def dead_letter(answer: dict, error: Exception) -> None:
+    """Append an answer the database rejected to LIVE_DEAD_LETTER_FILE."""
+    path = Path(LIVE_DEAD_LETTER_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        f.write(json.dumps({**answer, "error": f"{type(error).__name__}: {error}"}, default=str) + "\n")
+
+
+def write_answers_one_by_one(school_id: Optional[int], answers: list) -> Tuple[int, list]:
+    """Write answers one per transaction, after their batch failed.
+
+    Returns the number written and the answers to retry: those not tried
+    because the database could not be reached. Answers it rejects are
+    dead-lettered.
+    """
+    written = 0
+    for i, answer in enumerate(answers):
+        try:
+            write_answers(school_id, [answer])
+        except OperationalError:
+            return written, answers[i:]
+        except Exception as e:
+            logger.error(
+                f"Live answer of student {answer['student_id']} to question {answer['question_id']} "
+                f"was rejected and dead-lettered: {e}"
+            )
+            metrics.inc("live_answers_dead_lettered_total")
+            dead_letter(answer, e)
+            continue
+        written += 1
+    return written, []
+
+
+class AnswerBuffer:
+    def __init__(
+        self,
+        interval: float = LIVE_FLUSH_INTERVAL,
+        batch_size: int = LIVE_FLUSH_BATCH,
+        max_pending: int = LIVE_FLUSH_MAX_PENDING,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._wake = asyncio.Event()
+        self._task = None
+        metrics.set_gauge("live_answers_pending", lambda: len(self._pending))
+
+    def add(self, answer: dict) -> None:
+        """Queue a graded answer; `answer` holds SUBMISSION_COLUMNS plus its question's chapter_id."""
+        self._pending.append(answer)
+        self._trim()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _trim(self) -> None:
+        dropped = 0
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            dropped += 1
+        if dropped:
+            metrics.inc("live_answers_dropped_total", dropped)
+            logger.error(f"Live answer buffer full, dropped {dropped} answers")
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything queued so far. Returns the number of answers written."""
+        written = 0
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            batch.sort(key=lambda a: (a["school_id"], a["submitted_at"]))
+            failed = []
+            for school_id, answers in groupby(batch, key=itemgetter("school_id")):
+                answers = list(answers)
+                try:
+                    await run_in_threadpool(write_answers, school_id, answers)
+                except Exception as e:
+                    logger.error(f"Could not write {len(answers)} live answers for school {school_id}: {e}")
+                    metrics.inc("live_flush_errors_total")
+                    if isinstance(e, OperationalError):
+                        failed.extend(answers)
+                        continue
+                    count, retry = await run_in_threadpool(write_answers_one_by_one, school_id, answers)
+                    written += count
+                    metrics.inc("live_answers_written_total", count)
+                    failed.extend(retry)
+                    continue
+                written += len(answers)
+                metrics.inc("live_answers_written_total", len(answers))
+            if failed:
+                # retried on the next tick, ahead of newer answers
+                self._pending.extendleft(reversed(failed))
+                self._trim()
+                break
+        return written
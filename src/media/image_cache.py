@@ -0,0 +1,288 @@
+"""Content-addressed on-disk cache and resizer for question images.
+
+`Question.image_url` is resolved against IMAGE_ORIGIN by its path, fetched
+once and stored under the SHA-256 of its bytes:
+
+    objects/ab/ab12...        original
+    objects/ab/ab12....w320   variant resized to 320px wide
+    refs/<sha256(path)>       origin path -> digest
+    sources/<digest>          digest -> origin path (to refetch after eviction)
+
+Because a digest names fixed content, files under it are served with an
+immutable Cache-Control. Files are written to a temporary name and renamed,
+so readers never see partial files and concurrent workers can share the
+directory. Serving a file bumps its mtime (at most once a minute); when
+objects/ outgrows IMAGE_CACHE_MAX_BYTES the least recently served files are
+deleted until it is back under 90% of the limit; files used within the
+last minute are kept even if that leaves it over. refs/ and sources/ hold a
+few bytes per image and are never evicted.
+"""
+import hashlib
+import io
+import os
+import posixpath
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import quote, unquote, urlsplit
+
+import httpx
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from src.common.single_flight import single_flight
+from src.core.configurations import logger
+from src.core.constants import (
+    IMAGE_CACHE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_ORIGIN,
+    IMAGE_ORIGIN_MAX_BYTES,
+    IMAGE_ORIGIN_TIMEOUT,
+)
+from src.core.metrics import metrics
+
+_ROOT = Path(IMAGE_CACHE_DIR)
+_OBJECTS = _ROOT / "objects"
+_REFS = _ROOT / "refs"
+_SOURCES = _ROOT / "sources"
+
+EVICT_TO = 0.9  # fraction of IMAGE_CACHE_MAX_BYTES left after an eviction pass
+TOUCH_INTERVAL = 60  # seconds; a file served more often keeps its mtime
+
+# Formats that are resized; anything else (SVG, animated GIF, ...) is served as is.
+_SAVE_OPTIONS = {
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 80, "method": 4},
+}
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class ImageNotFound(Exception):
+    pass
+
+
+class OriginError(Exception):
+    """The origin answered with an error or an image over IMAGE_ORIGIN_MAX_BYTES."""
+
+
+class CachedImage(NamedTuple):
+    digest: str
+    path: Path
+    media_type: str
+
+
+def _shard(directory: Path, name: str) -> Path:
+    return directory / name[:2] / name
+
+
+def _write_atomic(path: Path, data: bytes) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def _media_type(path: Path) -> str:
+    with open(path, "rb") as f:
+        head = f.read(512)
+    for signature, media_type in _SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if b"<svg" in head:
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
+def origin_key(image_url: str) -> str:
+    """The origin path of an image_url; scheme, host and query are ignored."""
+    key = posixpath.normpath("/" + unquote(urlsplit(image_url).path)).lstrip("/")
+    if not key:
+        raise ImageNotFound(image_url)
+    return key
+
+
+def _read_origin(key: str) -> bytes:
+    if IMAGE_ORIGIN.startswith(("http://", "https://")):
+        url = f"{IMAGE_ORIGIN.rstrip('/')}/{quote(key)}"
+        with httpx.stream("GET", url, timeout=IMAGE_ORIGIN_TIMEOUT, follow_redirects=True) as response:
+            if response.status_code == 404:
+                raise ImageNotFound(key)
+            if response.status_code != 200:
+                raise OriginError(f"Origin answered {response.status_code} for {key}")
+            data = bytearray()
+            for chunk in response.iter_bytes():
+                data += chunk
+                if len(data) > IMAGE_ORIGIN_MAX_BYTES:
+                    raise OriginError(f"{key} is larger than {IMAGE_ORIGIN_MAX_BYTES} bytes")
+            return bytes(data)
+
+    root = Path(IMAGE_ORIGIN).resolve()
+    path = (root / key).resolve()
+    if root not in path.parents or not path.is_file():
+        raise ImageNotFound(key)
+    if path.stat().st_size > IMAGE_ORIGIN_MAX_BYTES:
+        raise OriginError(f"{key} is larger than {IMAGE_ORIGIN_MAX_BYTES} bytes")
+    return path.read_bytes()
+
+
+class _Usage:
+    """Approximate bytes under objects/, counted once per process and kept up to date on writes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._evicting = threading.Lock()
+        self.total = None
+
+    @staticmethod
+    def _scan():
+        files = []
+        for directory, _, names in os.walk(_OBJECTS):
+            for name in names:
+                if name.startswith("."):
+                    continue  # being written
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            if self.total is None:
+                self.total = sum(size for _, size, _ in self._scan())
+            else:
+                self.total += size
+            over = self.total > IMAGE_CACHE_MAX_BYTES
+        if over and self._evicting.acquire(blocking=False):
+            try:
+                self._evict()
+            finally:
+                self._evicting.release()
+
+    def _evict(self) -> None:
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        target = IMAGE_CACHE_MAX_BYTES * EVICT_TO
+        # files written or served in the last TOUCH_INTERVAL may be about to be sent
+        protected_after = time.time() - TOUCH_INTERVAL
+        evicted = 0
+        for mtime, size, path in files:
+            if total <= target or mtime > protected_after:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.total = total
+        metrics.inc("image_cache_evicted_total", evicted)
+        logger.info(f"Image cache: evicted {evicted} files, {total} bytes left")
+
+
+_usage = _Usage()
+metrics.set_gauge("image_cache_bytes", lambda: _usage.total or 0)
+
+
+def _touch(path: Path) -> None:
+    try:
+        if time.time() - path.stat().st_mtime > TOUCH_INTERVAL:
+            os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+@single_flight("image_fetch")
+def _fetch(key: str) -> str:
+    data = _read_origin(key)
+    digest = hashlib.sha256(data).hexdigest()
+    path = _shard(_OBJECTS, digest)
+    if not path.exists():
+        _usage.add(_write_atomic(path, data))
+    _write_atomic(_shard(_SOURCES, digest), key.encode())
+    _write_atomic(_shard(_REFS, hashlib.sha256(key.encode()).hexdigest()), digest.encode())
+    return digest
+
+
+def digest_for_url(image_url: str) -> str:
+    """Digest of the image behind `image_url`, fetching it from the origin on first use."""
+    key = origin_key(image_url)
+    ref = _shard(_REFS, hashlib.sha256(key.encode()).hexdigest())
+    try:
+        digest = ref.read_text()
+    except FileNotFoundError:
+        digest = None
+    if digest and _shard(_OBJECTS, digest).exists():
+        metrics.inc("image_cache_requests_total", kind="original", outcome="hit")
+        return digest
+    metrics.inc("image_cache_requests_total", kind="original", outcome="miss")
+    return _fetch(key)
+
+
+def _resize(source: Path, width: int) -> Optional[bytes]:
+    try:
+        with Image.open(source) as img:
+            fmt = img.format
+            if fmt not in _SAVE_OPTIONS or getattr(img, "is_animated", False):
+                return None
+            img = ImageOps.exif_transpose(img)
+            if img.width <= width:
+                return None
+            if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, fmt, **_SAVE_OPTIONS[fmt])
+            return out.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.warning(f"Image cache: cannot resize {source.name}: {e}")
+        return None
+
+
+@single_flight("image_resize")
+def _variant(digest: str, width: int) -> Path:
+    original = _shard(_OBJECTS, digest)
+    path = original.with_name(f"{digest}.w{width}")
+    if path.exists():
+        return path
+    data = _resize(original, width)
+    if data is None:
+        return original  # not resizable, or already narrower than `width`
+    _usage.add(_write_atomic(path, data))
+    return path
+
+
+def get_image(digest: str, width: Optional[int] = None) -> CachedImage:
+    """The cached file for `digest`, resized to `width` if given. Refetches an evicted original."""
+    original = _shard(_OBJECTS, digest)
+    if not original.exists():
+        try:
+            key = _shard(_SOURCES, digest).read_text()
+        except FileNotFoundError:
+            raise ImageNotFound(digest)
+        if _fetch(key) != digest:
+            raise ImageNotFound(digest)  # the origin file has changed since
+
+    path = original
+    if width is not None:
+        variant = original.with_name(f"{digest}.w{width}")
+        if variant.exists():
+            metrics.inc("image_cache_requests_total", kind="variant", outcome="hit")
+            path = variant
+        else:
+            metrics.inc("image_cache_requests_total", kind="variant", outcome="miss")
+            path = _variant(digest, width)
+    _touch(path)
+    return CachedImage(digest, path, _media_type(path))
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import status
+from starlette.responses import JSONResponse
+
+from src.core.constants import ADMISSION_LIMITS, ADMISSION_MAX_BODY_BYTES
+from src.core.metrics import metrics
+
+MAX_TRACKED_BUCKET_KEYS = 100_000
+
+
+class TokenBuckets:
+    """Token bucket per key, keeping at most `max_keys` least recently used keys."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = MAX_TRACKED_BUCKET_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def consume(self, key: str) -> float:
+        """Take one token for `key`. Returns 0 on success, else seconds until a token is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RouteAdmission:
+    """Concurrency limit with a bounded wait queue for one route."""
+
+    def __init__(self, path: str, config: dict):
+        self.path = path
+        self.max_concurrency = config["max_concurrency"]
+        self.max_queue = config["max_queue"]
+        self.queue_timeout = config["queue_timeout"]
+        self.retry_after = config["retry_after"]
+        self.ip_buckets = TokenBuckets(config["ip_rate"], config["ip_burst"]) if config.get("ip_rate") else None
+        self.email_buckets = (
+            TokenBuckets(config["email_rate"], config["email_burst"]) if config.get("email_rate") else None
+        )
+        self.in_flight = 0
+        self.queued = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        metrics.set_gauge("admission_in_flight", lambda: self.in_flight, route=path)
+        metrics.set_gauge("admission_queued", lambda: self.queued, route=path)
+
+    async def acquire(self) -> bool:
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            return False
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.queued -= 1
+        metrics.observe("admission_wait_seconds", time.perf_counter() - started, route=self.path)
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+async def _read_body(scope, receive, max_bytes: int = ADMISSION_MAX_BODY_BYTES) -> Optional[bytes]:
+    """The request body, or None once it is known to exceed `max_bytes`."""
+    for name, value in scope.get("headers", ()):
+        if name == b"content-length" and value.isdigit() and int(value) > max_bytes:
+            return None
+    body = bytearray()
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if len(body) > max_bytes:
+            return None
+        more_body = message.get("more_body", False)
+    return bytes(body)
+
+
+def _replay(body: bytes):
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Nothing left to read; wait like a real receive() until disconnect.
+        await asyncio.Event().wait()
+
+    return receive
+
+
+def _login_email(body: bytes):
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class AdmissionControlMiddleware:
+    """Shed load on expensive routes before it reaches the handler.
+
+    Requests for paths in `ADMISSION_LIMITS` first pass per-IP and per-email
+    token buckets (429 when empty; a body over ADMISSION_MAX_BODY_BYTES is
+    refused with 413), then wait for one of `max_concurrency` slots. When `max_queue` requests are already waiting, or a slot does not
+    free up within `queue_timeout`, the request is rejected with 503 and a
+    Retry-After header. Everything else passes straight through, so cheap
+    endpoints keep their latency while the expensive ones are saturated.
+    """
+
+    def __init__(self, app, limits: dict = ADMISSION_LIMITS):
+        self.app = app
+        self.routes = {path: RouteAdmission(path, config) for path, config in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        route = self.routes.get(scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        if route.ip_buckets is not None:
+            client_ip = scope["client"][0] if scope.get("client") else "unknown"
+            wait = route.ip_buckets.consume(client_ip)
+            if wait:
+                await self._reject(route, "ip_rate", status.HTTP_429_TOO_MANY_REQUESTS, wait, scope, receive, send)
+                return
+
+        if route.email_buckets is not None:
+            body = await _read_body(scope, receive)
+            if body is None:
+                await self._too_large(route, scope, receive, send)
+                return
+            receive = _replay(body)
+            email = _login_email(body)
+            wait = route.email_buckets.consume(email) if email else 0
+            if wait:
+                await self._reject(route, "email_rate", status.HTTP_429_TOO_MANY_REQUESTS, wait, scope, receive, send)
+                return
+
+        if not await route.acquire():
+            await self._reject(
+                route, "overloaded", status.HTTP_503_SERVICE_UNAVAILABLE, route.retry_after, scope, receive, send
+            )
+            return
+
+        metrics.inc("admission_admitted_total", route=route.path)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route.release()
+
+    @staticmethod
+    async def _too_large(route, scope, receive, send):
+        metrics.inc("admission_rejected_total", route=route.path, reason="body_too_large")
+        status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        response = JSONResponse(
+            status_code=status_code,
+            content={"success": False, "message": "Request body too large", "data": None, "status_code": status_code},
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _reject(route, reason, status_code, retry_after, scope, receive, send):
+        metrics.inc("admission_rejected_total", route=route.path, reason=reason)
+        response = JSONResponse(
+            status_code=status_code,
+            content={
+                "success": False,
+                "message": "Too many requests, please retry later",
+                "data": None,
+                "status_code": status_code,
+            },
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,47 @@
+import time
+from typing import Optional
+
+from src.auth.auth_bearer import school_from_token
+from src.core.constants import SCHOOL_HEADER
+from src.core.metrics import metrics
+from src.database.services import begin_request_scope, end_request_scope
+
+
+def _school(scope) -> Optional[int]:
+    """The token's school_id claim; the X-School-Id header only when there is no token."""
+    headers = dict(scope["headers"])
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return school_from_token(token)
+    school_id = headers.get(SCHOOL_HEADER.encode(), b"")
+    return int(school_id) if school_id.isdigit() else None
+
+
+class RequestContextMiddleware:
+    """Give every HTTP request its own `request_state` for database routing and the slow query log.
+
+    The request's school is resolved here, before any dependency opens a
+    session, so its queries go to the school's database. Request latency
+    is observed per school as `request_seconds{school}`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        school_id = _school(scope)
+        token = begin_request_scope(scope, school_id)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            metrics.observe(
+                "request_seconds",
+                time.perf_counter() - started,
+                school=school_id if school_id is not None else "none",
+            )
+            end_request_scope(token)